@@ -4,7 +4,10 @@ from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from app.db.models import Advert, User, AdvertPhoto, AutotekaReport
 from app.admin_panel.keyboards.admin_kbs import admin_adverts_kb, back_to_admin_kb
+from app.db.crud_advert import get_advert_card
+from app.db.pagination import paginate
 from app.other import _format_price
+from app.services.advert_events import advert_approved, advert_status_changed
 from decimal import Decimal
 
 router = Router()
@@ -14,23 +17,6 @@ class ModerationState(StatesGroup):
     waiting_reason = State()
 
 
-class Pagination:
-    def __init__(self, items, page_size=5):
-        self.items = items
-        self.page_size = page_size
-        self.total_pages = (len(items) + page_size - 1) // page_size
-        self.current_page = 0
-
-    def get_page(self, page):
-        self.current_page = max(0, min(page, self.total_pages - 1))
-        start = self.current_page * self.page_size
-        end = start + self.page_size
-        return self.items[start:end]
-
-    def get_page_info(self):
-        return f"Страница {self.current_page + 1}/{self.total_pages}"
-
-
 @router.callback_query(F.data == "admin_adverts")
 async def admin_adverts(callback: CallbackQuery):
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
@@ -46,7 +32,7 @@ async def admin_adverts(callback: CallbackQuery):
 
 async def show_adverts_page(callback: CallbackQuery, status_filter: str = None, page: int = 0):
     if status_filter:
-        adverts = await Advert.filter(status=status_filter).order_by("-created_at").prefetch_related('owner').all()
+        query = Advert.filter(status=status_filter)
         status_name = {
             "active": "✅ Активные",
             "pending": "⏳ На модерации",
@@ -54,10 +40,15 @@ async def show_adverts_page(callback: CallbackQuery, status_filter: str = None,
             "archived": "📁 Архивные"
         }.get(status_filter, "Все")
     else:
-        adverts = await Advert.all().order_by("-created_at").prefetch_related('owner').all()
+        query = Advert.all()
         status_name = "📋 Все"
 
-    if not adverts:
+    pagination = await paginate(
+        f"adverts:{status_filter or 'all'}", query, page,
+        ("id", "name", "price", "status", "created_at", "owner_id", "owner__fullname"),
+    )
+
+    if not pagination.total:
         text = f"{status_name} объявления\n\nНет объявлений."
         keyboard = InlineKeyboardMarkup(inline_keyboard=[
             [InlineKeyboardButton(text="◀️ Назад", callback_data="admin_adverts")]
@@ -66,25 +57,22 @@ async def show_adverts_page(callback: CallbackQuery, status_filter: str = None,
         await callback.answer()
         return
 
-    pagination = Pagination(adverts, page_size=5)
-    page_adverts = pagination.get_page(page)
-
     text = f"{status_name} объявления\n\n"
     text += f"{pagination.get_page_info()}\n"
-    text += f"Всего: {len(adverts)}\n\n"
+    text += f"Всего: {pagination.total}\n\n"
 
     keyboard_buttons = []
 
-    for advert in page_adverts:
-        owner_name = advert.owner.fullname or f"ID: {advert.owner.id}"
-        date_str = advert.created_at.strftime("%d.%m.%Y")
+    for advert in pagination.items:
+        owner_name = advert["owner__fullname"] or f"ID: {advert['owner_id']}"
+        date_str = advert["created_at"].strftime("%d.%m.%Y")
 
-        advert_name = advert.name
+        advert_name = advert["name"]
         if len(advert_name) > 25:
             advert_name = advert_name[:22] + "..."
 
-        btn_text = f"🚗 {advert_name} | {_format_price(advert.price)}"
-        callback_data = f"view_admin_advert_{advert.id}"
+        btn_text = f"🚗 {advert_name} | {_format_price(advert['price'])}"
+        callback_data = f"view_admin_advert_{advert['id']}"
         keyboard_buttons.append([InlineKeyboardButton(text=btn_text, callback_data=callback_data)])
 
         status_icon = {
@@ -92,7 +80,7 @@ async def show_adverts_page(callback: CallbackQuery, status_filter: str = None,
             "pending": "⏳",
             "rejected": "❌",
             "archived": "📁"
-        }.get(advert.status, "📄")
+        }.get(advert["status"], "📄")
 
         text += f"{status_icon} {owner_name} | {date_str}\n"
 
@@ -175,13 +163,13 @@ async def admin_adverts_rejected(callback: CallbackQuery):
 @router.callback_query(F.data.startswith("view_admin_advert_"))
 async def admin_advert_detail(callback: CallbackQuery):
     advert_id = int(callback.data.replace("view_admin_advert_", ""))
-    advert = await Advert.get(id=advert_id).prefetch_related('owner')
-
-    photos = await AdvertPhoto.filter(advert=advert).order_by("position").all()
-    photo_ids = [photo.file_id for photo in photos]
+    advert = await get_advert_card(advert_id)
+    if not advert:
+        await callback.answer("❌ Объявление не найдено")
+        return
+    photo_ids = advert.photo_ids
 
-    autoteka_report = await AutotekaReport.filter(advert=advert).first()
-    autoteka_info = "✅ Куплен" if autoteka_report else "❌ Нет"
+    autoteka_info = "✅ Куплен" if advert.has_autoteka_report else "❌ Нет"
 
     text = f"📢 <b>Объявление #{advert.id}</b>\n\n"
     text += f"🚗 <b>{advert.name}</b>\n"
@@ -199,7 +187,7 @@ async def admin_advert_detail(callback: CallbackQuery):
     text += f"🚘 Гос номер: {advert.license_plate}\n"
     text += f"🌍 Город: {advert.city}\n"
     text += f"📞 Контакты: {advert.contacts}\n"
-    text += f"👤 Владелец: {advert.owner.fullname or 'Не указано'} (ID: {advert.owner.id})\n"
+    text += f"👤 Владелец: {advert.owner_fullname or 'Не указано'} (ID: {advert.owner_id})\n"
 
     status_text = {
         "active": "✅ Активно",
@@ -282,6 +270,7 @@ async def restore_advert(callback: CallbackQuery):
     advert = await Advert.get(id=advert_id)
     advert.status = "active"
     await advert.save()
+    await advert_status_changed(advert)
 
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(text="◀️ Назад", callback_data=f"view_admin_advert_{advert_id}")]
@@ -298,6 +287,7 @@ async def approve_advert(callback: CallbackQuery):
     advert = await Advert.get(id=advert_id)
     advert.status = "active"
     await advert.save()
+    await advert_approved(callback.bot, advert)
 
     try:
         await callback.bot.send_message(
@@ -346,6 +336,7 @@ async def process_hide_reason(message: Message, state: FSMContext):
         notify_text = f"❌ Ваше объявление #{advert.id} отклонено\nПричина: {reason}"
 
     await advert.save()
+    await advert_status_changed(advert)
 
     try:
         await message.bot.send_message(
@@ -1,9 +1,13 @@
+from datetime import datetime, timedelta
+
 from aiogram import Router, F
-from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
+from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from app.db.models import User
-from app.admin_panel.keyboards.admin_kbs import back_to_admin_kb
+from app.admin_panel.keyboards.admin_kbs import back_to_admin_kb, broadcast_segment_kb
+from app.services.broadcast import start_broadcast
+from app.services.broadcast_segments import SEGMENT_ROLES, count_segment, describe_segment
+from app.services.cities import normalize_city
 
 router = Router()
 
@@ -12,6 +16,8 @@ class BroadcastState(StatesGroup):
     waiting_text = State()
     waiting_media = State()
     confirm = State()
+    waiting_segment_city = State()
+    waiting_segment_registered = State()
 
 
 @router.callback_query(F.data == "admin_broadcast")
@@ -43,46 +49,154 @@ async def process_broadcast_media(message: Message, state: FSMContext):
         await message.answer("Отправьте фото, документ или 'нет'")
         return
 
-    await state.update_data(media_type=media_type, media_file_id=media_file_id)
+    await state.update_data(media_type=media_type, media_file_id=media_file_id, segment={})
     await state.set_state(BroadcastState.confirm)
 
+    text, keyboard = await _preview(await state.get_data())
+    await message.answer(text, reply_markup=keyboard)
+
+
+async def _preview(data: dict):
+    segment = data.get('segment') or {}
+    total = await count_segment(segment)
+    text = (f"📢 Предпросмотр:\n\n{data['text']}\n\n"
+            f"👥 Получатели: {describe_segment(segment)}\n"
+            f"Всего: {total}")
+    return text, broadcast_segment_kb(segment, total)
+
+
+async def _update_segment(callback: CallbackQuery, state: FSMContext, **changes):
     data = await state.get_data()
-    preview = f"📢 Предпросмотр:\n\n{data['text']}"
+    segment = dict(data.get('segment') or {})
+    for key, value in changes.items():
+        if value is None:
+            segment.pop(key, None)
+        else:
+            segment[key] = value
+    await state.update_data(segment=segment)
+    text, keyboard = await _preview({**data, 'segment': segment})
+    await callback.message.edit_text(text, reply_markup=keyboard)
 
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="✅ Отправить всем", callback_data="confirm_broadcast")],
-        [InlineKeyboardButton(text="❌ Отмена", callback_data="cancel_broadcast")]
-    ])
 
-    await message.answer(preview, reply_markup=keyboard)
+@router.callback_query(BroadcastState.confirm, F.data == "bseg_subscription")
+async def segment_subscription(callback: CallbackQuery, state: FSMContext):
+    segment = (await state.get_data()).get('segment') or {}
+    next_value = {None: "active", "active": "none"}.get(segment.get("subscription"))
+    await _update_segment(callback, state, subscription=next_value)
 
 
-@router.callback_query(F.data == "confirm_broadcast")
-async def confirm_broadcast(callback: CallbackQuery, state: FSMContext):
+@router.callback_query(BroadcastState.confirm, F.data == "bseg_role")
+async def segment_role(callback: CallbackQuery, state: FSMContext):
+    segment = (await state.get_data()).get('segment') or {}
+    roles = [None] + list(SEGMENT_ROLES)
+    next_value = roles[(roles.index(segment.get("role")) + 1) % len(roles)]
+    await _update_segment(callback, state, role=next_value)
+
+
+@router.callback_query(BroadcastState.confirm, F.data == "bseg_favorites")
+async def segment_favorites(callback: CallbackQuery, state: FSMContext):
+    segment = (await state.get_data()).get('segment') or {}
+    await _update_segment(callback, state, has_favorites=None if segment.get("has_favorites") else True)
+
+
+@router.callback_query(BroadcastState.confirm, F.data == "bseg_reset")
+async def segment_reset(callback: CallbackQuery, state: FSMContext):
+    await state.update_data(segment={})
+    text, keyboard = await _preview(await state.get_data())
+    await callback.message.edit_text(text, reply_markup=keyboard)
+
+
+@router.callback_query(BroadcastState.confirm, F.data == "bseg_city")
+async def segment_city(callback: CallbackQuery, state: FSMContext):
+    await state.set_state(BroadcastState.waiting_segment_city)
+    await callback.message.answer("Введите город (или 'нет', чтобы не ограничивать):")
+    await callback.answer()
+
+
+@router.message(BroadcastState.waiting_segment_city)
+async def segment_city_set(message: Message, state: FSMContext):
     data = await state.get_data()
-    users = await User.all()
+    segment = dict(data.get('segment') or {})
+    if message.text and message.text.strip().lower() == "нет":
+        segment.pop("city_id", None)
+    else:
+        city_id, _ = normalize_city(message.text)
+        if city_id is None:
+            await message.answer("Город не найден в справочнике. Введите другой город или 'нет':")
+            return
+        segment["city_id"] = city_id
+
+    await state.update_data(segment=segment)
+    await state.set_state(BroadcastState.confirm)
+    text, keyboard = await _preview({**data, 'segment': segment})
+    await message.answer(text, reply_markup=keyboard)
+
+
+@router.callback_query(BroadcastState.confirm, F.data == "bseg_registered")
+async def segment_registered(callback: CallbackQuery, state: FSMContext):
+    await state.set_state(BroadcastState.waiting_segment_registered)
+    await callback.message.answer(
+        "Введите дату регистрации: 01.01.2026 (с этой даты) или 01.01.2026-31.03.2026 (период).\n"
+        "'нет' - не ограничивать:"
+    )
+    await callback.answer()
 
-    await callback.message.edit_text(f"📤 Рассылка начата... 0/{len(users)}")
 
-    sent = 0
-    for user in users:
+@router.message(BroadcastState.waiting_segment_registered)
+async def segment_registered_set(message: Message, state: FSMContext):
+    data = await state.get_data()
+    segment = dict(data.get('segment') or {})
+    value = (message.text or "").strip()
+    segment.pop("registered_from", None)
+    segment.pop("registered_to", None)
+
+    if value.lower() != "нет":
         try:
-            if data.get('media_type') == "photo":
-                await callback.bot.send_photo(user.id, data['media_file_id'], caption=data['text'])
-            elif data.get('media_type') == "document":
-                await callback.bot.send_document(user.id, data['media_file_id'], caption=data['text'])
-            else:
-                await callback.bot.send_message(user.id, data['text'])
-            sent += 1
-        except:
-            pass
-
-        if sent % 10 == 0:
-            await callback.message.edit_text(f"📤 Рассылка... {sent}/{len(users)}")
-
-    await callback.message.edit_text(f"✅ Рассылка завершена\nУспешно: {sent}/{len(users)}")
+            parts = [datetime.strptime(part.strip(), "%d.%m.%Y") for part in value.split("-")]
+        except ValueError:
+            await message.answer("Неверный формат. Пример: 01.01.2026 или 01.01.2026-31.03.2026")
+            return
+        if len(parts) > 2:
+            await message.answer("Неверный формат. Пример: 01.01.2026 или 01.01.2026-31.03.2026")
+            return
+        segment["registered_from"] = parts[0].date().isoformat()
+        if len(parts) == 2:
+            # конец периода включительно
+            segment["registered_to"] = (parts[1] + timedelta(days=1)).date().isoformat()
+
+    await state.update_data(segment=segment)
+    await state.set_state(BroadcastState.confirm)
+    text, keyboard = await _preview({**data, 'segment': segment})
+    await message.answer(text, reply_markup=keyboard)
+
+
+@router.callback_query(BroadcastState.confirm, F.data == "confirm_broadcast")
+async def confirm_broadcast(callback: CallbackQuery, state: FSMContext):
+    data = await state.get_data()
+    if not data.get('text') and not data.get('media_file_id'):
+        await callback.answer("Рассылка пустая, создайте её заново", show_alert=True)
+        return
     await state.clear()
 
+    await callback.message.edit_text("📤 Рассылка начата...")
+    # рассылка идёт в фоне и переживает перезапуск бота, см. services/broadcast.py
+    await start_broadcast(
+        callback.bot,
+        created_by_id=callback.from_user.id,
+        text=data.get('text'),
+        media_type=data.get('media_type'),
+        media_file_id=data.get('media_file_id'),
+        progress_chat_id=callback.message.chat.id,
+        progress_message_id=callback.message.message_id,
+        segment=data.get('segment'),
+    )
+
+
+@router.callback_query(F.data == "confirm_broadcast")
+async def confirm_broadcast_stale(callback: CallbackQuery):
+    # повторное нажатие или кнопка старого предпросмотра - рассылка уже запущена или отменена
+    await callback.answer("Эта рассылка уже запущена или отменена", show_alert=True)
+
 
 @router.callback_query(F.data == "cancel_broadcast")
 async def cancel_broadcast(callback: CallbackQuery, state: FSMContext):
@@ -5,6 +5,7 @@ from aiogram.fsm.state import State, StatesGroup
 from datetime import datetime, timedelta
 from decimal import Decimal
 from app.db.models import Coupon
+from app.db.pagination import paginate
 
 router = Router()
 
@@ -32,9 +33,12 @@ async def admin_coupons(callback: CallbackQuery):
 async def admin_coupons_list(callback: CallbackQuery):
     page = int(callback.data.replace("admin_coupons_list_page_", ""))
 
-    coupons = await Coupon.all().order_by("-created_at").all()
+    pagination = await paginate(
+        "coupons", Coupon.all(), page,
+        ("id", "code", "discount_percent", "used_count", "max_uses", "valid_to", "is_active", "description"),
+    )
 
-    if not coupons:
+    if not pagination.total:
         text = "🎫 <b>Список купонов</b>\n\n"
         text += "Нет созданных купонов.\n"
 
@@ -47,59 +51,53 @@ async def admin_coupons_list(callback: CallbackQuery):
         await callback.answer()
         return
 
-    page_size = 5
-    total_pages = (len(coupons) + page_size - 1) // page_size
-    current_page = max(0, min(page, total_pages - 1))
-
-    start_idx = current_page * page_size
-    end_idx = start_idx + page_size
-    page_coupons = coupons[start_idx:end_idx]
+    current_page, total_pages = pagination.current_page, pagination.total_pages
 
     text = "🎫 <b>Список купонов</b>\n\n"
     text += f"📄 Страница {current_page + 1}/{total_pages}\n"
-    text += f"🎫 Всего купонов: {len(coupons)}\n\n"
+    text += f"🎫 Всего купонов: {pagination.total}\n\n"
 
     keyboard_buttons = []
 
-    for coupon in page_coupons:
-        is_active = coupon.is_active
+    for coupon in pagination.items:
+        is_active = coupon["is_active"]
         status = "✅ Активен" if is_active else "❌ Неактивен"
 
         validity = ""
-        if coupon.valid_to:
-            valid_to_naive = coupon.valid_to.replace(tzinfo=None)
+        if coupon["valid_to"]:
+            valid_to_naive = coupon["valid_to"].replace(tzinfo=None)
             current_time_naive = datetime.now()
 
             if valid_to_naive < current_time_naive:
                 status = "⏰ Истек"
-                validity = f"до {coupon.valid_to.strftime('%d.%m.%Y')}"
+                validity = f"до {coupon['valid_to'].strftime('%d.%m.%Y')}"
             else:
-                validity = f"до {coupon.valid_to.strftime('%d.%m.%Y')}"
+                validity = f"до {coupon['valid_to'].strftime('%d.%m.%Y')}"
 
         uses_info = ""
-        if coupon.max_uses:
-            uses_left = coupon.max_uses - coupon.used_count
-            uses_info = f"({coupon.used_count}/{coupon.max_uses})"
+        if coupon["max_uses"]:
+            uses_left = coupon["max_uses"] - coupon["used_count"]
+            uses_info = f"({coupon['used_count']}/{coupon['max_uses']})"
         else:
             uses_left = "∞"
-            uses_info = f"({coupon.used_count} использовано)"
+            uses_info = f"({coupon['used_count']} использовано)"
 
-        text += f"<b>🎫 {coupon.code}</b>\n"
-        text += f"📊 Скидка: {coupon.discount_percent}%\n"
+        text += f"<b>🎫 {coupon['code']}</b>\n"
+        text += f"📊 Скидка: {coupon['discount_percent']}%\n"
         text += f"📈 Использований: {uses_info}\n"
         if validity:
             text += f"📅 {validity}\n"
         text += f"📊 Статус: {status}\n"
 
-        if coupon.description:
-            text += f"📝 Описание: {coupon.description[:30]}...\n"
+        if coupon["description"]:
+            text += f"📝 Описание: {coupon['description'][:30]}...\n"
 
         text += "─" * 25 + "\n"
 
         keyboard_buttons.append([
             InlineKeyboardButton(
-                text=f"🎫 {coupon.code} | {coupon.discount_percent}%",
-                callback_data=f"coupon_detail_{coupon.id}"
+                text=f"🎫 {coupon['code']} | {coupon['discount_percent']}%",
+                callback_data=f"coupon_detail_{coupon['id']}"
             )
         ])
 
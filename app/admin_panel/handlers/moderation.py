@@ -4,8 +4,10 @@ from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from app.db.models import Advert, User, AdvertPhoto, AutotekaReport
 from app.admin_panel.keyboards.admin_kbs import admin_moderation_kb, back_to_admin_kb
-from app.db.crud_advert import reject_advert_and_refund
+from app.db.crud_advert import get_advert_card, reject_advert_and_refund
+from app.db.pagination import paginate
 from app.other import _format_price
+from app.services.advert_events import advert_approved, advert_status_changed
 
 router = Router()
 
@@ -14,32 +16,18 @@ class ModerationState(StatesGroup):
     waiting_reject_reason = State()
 
 
-class Pagination:
-    def __init__(self, items, page_size=5):
-        self.items = items
-        self.page_size = page_size
-        self.total_pages = (len(items) + page_size - 1) // page_size
-        self.current_page = 0
-
-    def get_page(self, page):
-        self.current_page = max(0, min(page, self.total_pages - 1))
-        start = self.current_page * self.page_size
-        end = start + self.page_size
-        return self.items[start:end]
-
-    def get_page_info(self):
-        return f"Страница {self.current_page + 1}/{self.total_pages}"
-
-
 @router.callback_query(F.data == "admin_moderation")
 async def admin_moderation(callback: CallbackQuery):
     await show_moderation_page(callback, page=0)
 
 
 async def show_moderation_page(callback: CallbackQuery, page: int):
-    adverts = await Advert.filter(status="pending").order_by("-created_at").prefetch_related('owner').all()
+    pagination = await paginate(
+        "adverts:pending", Advert.filter(status="pending"), page,
+        ("id", "name", "price", "created_at", "owner_id", "owner__fullname"),
+    )
 
-    if not adverts:
+    if not pagination.total:
         text = "📝 <b>Объявления на модерации</b>\n\n"
         text += "✅ Нет объявлений, ожидающих проверки."
 
@@ -55,25 +43,22 @@ async def show_moderation_page(callback: CallbackQuery, page: int):
         await callback.answer()
         return
 
-    pagination = Pagination(adverts, page_size=5)
-    page_adverts = pagination.get_page(page)
-
     text = "📝 <b>Объявления на модерации</b>\n\n"
     text += f"{pagination.get_page_info()}\n"
-    text += f"Всего на проверке: {len(adverts)}\n\n"
+    text += f"Всего на проверке: {pagination.total}\n\n"
 
     keyboard_buttons = []
 
-    for advert in page_adverts:
-        owner_name = advert.owner.fullname or f"ID: {advert.owner.id}"
-        date_str = advert.created_at.strftime("%d.%m.%Y")
+    for advert in pagination.items:
+        owner_name = advert["owner__fullname"] or f"ID: {advert['owner_id']}"
+        date_str = advert["created_at"].strftime("%d.%m.%Y")
 
-        advert_name = advert.name
+        advert_name = advert["name"]
         if len(advert_name) > 25:
             advert_name = advert_name[:22] + "..."
 
-        btn_text = f"🚗 {advert_name} | {_format_price(advert.price)}"
-        callback_data = f"moderate_advert_detail_{advert.id}"
+        btn_text = f"🚗 {advert_name} | {_format_price(advert['price'])}"
+        callback_data = f"moderate_advert_detail_{advert['id']}"
         keyboard_buttons.append([InlineKeyboardButton(text=btn_text, callback_data=callback_data)])
 
         text += f"⏳ {owner_name} | 📅 {date_str}\n"
@@ -123,10 +108,11 @@ async def handle_moderation_page(callback: CallbackQuery):
 @router.callback_query(F.data.regexp(r'^moderate_advert_detail_\d+$'))
 async def moderate_advert_detail(callback: CallbackQuery):
     advert_id = int(callback.data.replace("moderate_advert_detail_", ""))
-    advert = await Advert.get(id=advert_id).prefetch_related('owner')
-
-    photos = await AdvertPhoto.filter(advert=advert).order_by("position").all()
-    photo_ids = [photo.file_id for photo in photos]
+    advert = await get_advert_card(advert_id)
+    if not advert:
+        await callback.answer("❌ Объявление не найдено")
+        return
+    photo_ids = advert.photo_ids
 
     text = f"📝 <b>Модерация объявления #{advert.id}</b>\n\n"
     text += f"🚗 <b>{advert.name}</b>\n"
@@ -143,7 +129,7 @@ async def moderate_advert_detail(callback: CallbackQuery):
     text += f"🚘 Гос номер: {advert.license_plate}\n"
     text += f"🌍 Город: {advert.city}\n"
     text += f"📞 Контакты: {advert.contacts}\n"
-    text += f"👤 Владелец: {advert.owner.fullname or 'Не указано'} (ID: {advert.owner.id})\n"
+    text += f"👤 Владелец: {advert.owner_fullname or 'Не указано'} (ID: {advert.owner_id})\n"
     text += f"📅 Дата подачи: {advert.created_at.strftime('%d.%m.%Y %H:%M')}\n\n"
 
     text += f"📝 <b>Описание:</b>\n{advert.description}\n"
@@ -186,6 +172,7 @@ async def approve_advert(callback: CallbackQuery):
 
     advert.status = "active"
     await advert.save()
+    await advert_approved(callback.bot, advert)
 
     try:
         await callback.bot.send_message(
@@ -248,6 +235,7 @@ async def process_reject_reason(message: Message, state: FSMContext):
     await reject_advert_and_refund(advert_id, reason, message.bot)
 
     advert = await Advert.get(id=advert_id)
+    await advert_status_changed(advert)
 
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(text="◀️ Назад к модерации", callback_data="admin_moderation")]
@@ -3,7 +3,7 @@ from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from decimal import Decimal
-from app.db.crud_admin import get_settings
+from app.db.crud_admin import get_settings, update_settings
 from app.admin_panel.keyboards.admin_kbs import admin_prices_kb, back_to_admin_kb
 from app.other import _format_price
 
@@ -46,9 +46,7 @@ async def process_subscription_price(message: Message, state: FSMContext):
         if price < 0:
             await message.answer("Цена не может быть отрицательной. Введите корректное значение:")
             return
-        settings = await get_settings()
-        settings.subscription_price = price
-        await settings.save()
+        await update_settings(subscription_price=price)
         await message.answer(f"✅ Цена подписки изменена на {_format_price(price)} руб", reply_markup=back_to_admin_kb())
         await state.clear()
 
@@ -62,9 +60,7 @@ async def process_advert_price(message: Message, state: FSMContext):
         if price < 0:
             await message.answer("Цена не может быть отрицательной. Введите корректное значение:")
             return
-        settings = await get_settings()
-        settings.advert_publish_price = price
-        await settings.save()
+        await update_settings(advert_publish_price=price)
         await message.answer(f"✅ Цена размещения объявления изменена на {_format_price(price)} руб", reply_markup=back_to_admin_kb())
         await state.clear()
 
@@ -78,9 +74,7 @@ async def process_autoteka_price(message: Message, state: FSMContext):
         if price < 0:
             await message.answer("Цена не может быть отрицательной. Введите корректное значение:")
             return
-        settings = await get_settings()
-        settings.autoteka_price = price
-        await settings.save()
+        await update_settings(autoteka_price=price)
         await message.answer(f"✅ Цена отчёта автотеки изменена на {_format_price(price)} руб", reply_markup=back_to_admin_kb())
         await state.clear()
 
@@ -3,7 +3,9 @@ from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKe
 from aiogram.filters import StateFilter
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
+from app.db.crud_user import user_access_changed
 from app.db.models import User
+from app.db.pagination import paginate
 from app.services.autoteca_no_api import get_remaining_reports_async
 
 router = Router(name=__name__)
@@ -15,7 +17,9 @@ class RoleChangeState(StatesGroup):
 
 @router.callback_query(F.data == "admin_roles_menu")
 async def manage_roles_menu(callback: CallbackQuery):
-    admins = await User.filter(role__in=["admin", "owner", "moderator"]).order_by("-created_at").all()
+    admins = await User.filter(role__in=["admin", "owner", "moderator"]).order_by("-created_at").values(
+        "id", "fullname", "role"
+    )
 
     keyboard_buttons = []
 
@@ -28,16 +32,17 @@ async def manage_roles_menu(callback: CallbackQuery):
                 "owner": "👑",
                 "admin": "⚡",
                 "moderator": "🛡️"
-            }.get(admin_user.role, "👤")
+            }.get(admin_user["role"], "👤")
+            admin_id = admin_user["id"]
 
-            text += f"{i}. {role_icon} {admin_user.fullname or 'Без имени'}\n"
-            text += f"   🆔 ID: <code>{admin_user.id}</code>\n"
-            text += f"   📊 Роль: {admin_user.role}\n"
+            text += f"{i}. {role_icon} {admin_user['fullname'] or 'Без имени'}\n"
+            text += f"   🆔 ID: <code>{admin_id}</code>\n"
+            text += f"   📊 Роль: {admin_user['role']}\n"
             text += "─" * 25 + "\n"
 
             keyboard_buttons.append([InlineKeyboardButton(
-                text=f"{role_icon} Изменить {admin_user.fullname or f'ID {admin_user.id}'}",
-                callback_data=f"roles_change_user_{admin_user.id}"
+                text=f"{role_icon} Изменить {admin_user['fullname'] or f'ID {admin_id}'}",
+                callback_data=f"roles_change_user_{admin_id}"
             )])
 
     else:
@@ -174,6 +179,7 @@ async def set_user_role(callback: CallbackQuery):
         target_user.status = "active"
 
     await target_user.save()
+    await user_access_changed(target_id)
 
     role_names = {
         "user": "👤 Пользователь",
@@ -217,9 +223,9 @@ async def set_user_role(callback: CallbackQuery):
 async def all_users_for_roles(callback: CallbackQuery):
     page = int(callback.data.replace("roles_all_users_page_", ""))
 
-    users = await User.all().order_by("-created_at").all()
+    pagination = await paginate("users:all", User.all(), page, ("id", "fullname", "role", "created_at"))
 
-    if not users:
+    if not pagination.total:
         await callback.message.edit_text(
             "👥 Нет пользователей в базе.",
             reply_markup=InlineKeyboardMarkup(inline_keyboard=[
@@ -229,33 +235,28 @@ async def all_users_for_roles(callback: CallbackQuery):
         await callback.answer()
         return
 
-    page_size = 5
-    total_pages = (len(users) + page_size - 1) // page_size
-    current_page = max(0, min(page, total_pages - 1))
-
-    start_idx = current_page * page_size
-    end_idx = start_idx + page_size
-    page_users = users[start_idx:end_idx]
+    current_page, total_pages = pagination.current_page, pagination.total_pages
 
     text = f"👥 <b>Все пользователи</b>\n\n"
     text += f"📄 Страница {current_page + 1}/{total_pages}\n"
-    text += f"👤 Всего пользователей: {len(users)}\n\n"
+    text += f"👤 Всего пользователей: {pagination.total}\n\n"
 
     keyboard_buttons = []
 
-    for user in page_users:
+    for user in pagination.items:
         role_icon = {
             "owner": "👑",
             "admin": "⚡",
             "moderator": "🛡️",
             "user": "👤"
-        }.get(user.role, "👤")
+        }.get(user["role"], "👤")
+        user_id = user["id"]
 
-        btn_text = f"{role_icon} {user.fullname or f'ID {user.id}'}"
-        callback_data = f"roles_change_user_{user.id}"
+        btn_text = f"{role_icon} {user['fullname'] or f'ID {user_id}'}"
+        callback_data = f"roles_change_user_{user_id}"
         keyboard_buttons.append([InlineKeyboardButton(text=btn_text, callback_data=callback_data)])
 
-        text += f"• {user.fullname or 'Без имени'} | 🆔 {user.id} | {role_icon} {user.role}\n"
+        text += f"• {user['fullname'] or 'Без имени'} | 🆔 {user_id} | {role_icon} {user['role']}\n"
 
     nav_buttons = []
     if current_page > 0:
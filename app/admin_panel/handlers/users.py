@@ -5,7 +5,12 @@ from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from datetime import datetime
 from decimal import Decimal
-from app.db.models import User, Advert, Transaction, Referral, AutotekaReport, Settings, AdvertPhoto
+from tortoise.functions import Count
+from app.db.models import User, Advert, Transaction, Referral, AutotekaReport, AdvertPhoto
+from app.db.crud_admin import get_settings
+from app.db.crud_transaction import get_income_stats, get_autoteka_buyers, get_autoteka_totals
+from app.db.crud_advert import get_advert_card
+from app.db.pagination import paginate
 from app.other import _format_price
 
 router = Router()
@@ -18,23 +23,6 @@ class UserSearch(StatesGroup):
     waiting_for_user_input = State()
 
 
-class Pagination:
-    def __init__(self, items, page_size=5):
-        self.items = items
-        self.page_size = page_size
-        self.total_pages = (len(items) + page_size - 1) // page_size
-        self.current_page = 0
-
-    def get_page(self, page):
-        self.current_page = max(0, min(page, self.total_pages - 1))
-        start = self.current_page * self.page_size
-        end = start + self.page_size
-        return self.items[start:end]
-
-    def get_page_info(self):
-        return f"Страница {self.current_page + 1}/{self.total_pages}"
-
-
 @router.callback_query(F.data == "admin_users")
 async def admin_users(callback: CallbackQuery):
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
@@ -255,9 +243,12 @@ async def show_user_adverts(callback: CallbackQuery):
         page = int(data_parts[4])
 
         user = await User.get(id=user_id)
-        adverts = await Advert.filter(owner=user).order_by("-created_at").all()
+        pagination = await paginate(
+            f"user_adverts:{user_id}", Advert.filter(owner_id=user_id), page,
+            ("id", "name", "price", "created_at", "status"),
+        )
 
-        if not adverts:
+        if not pagination.total:
             text = f"📢 <b>Объявления пользователя {user.fullname or user.id}</b>\n\n"
             text += "Нет объявлений."
 
@@ -269,20 +260,17 @@ async def show_user_adverts(callback: CallbackQuery):
             await callback.answer()
             return
 
-        pagination = Pagination(adverts, page_size=5)
-        page_adverts = pagination.get_page(page)
-
         text = f"📢 <b>Объявления пользователя {user.fullname or user.id}</b>\n\n"
         text += f"{pagination.get_page_info()}\n\n"
 
         keyboard_buttons = []
 
-        for advert in page_adverts:
-            advert_date = advert.created_at.strftime("%d.%m.%Y")
-            advert_status = "✅ Активно" if advert.status == "active" else "⏳ На модерации" if advert.status == "pending" else "❌ Отклонено"
+        for advert in pagination.items:
+            advert_date = advert["created_at"].strftime("%d.%m.%Y")
+            advert_status = "✅ Активно" if advert["status"] == "active" else "⏳ На модерации" if advert["status"] == "pending" else "❌ Отклонено"
 
-            btn_text = f"🚗 {advert.name[:15]}... | {_format_price(advert.price)} | {advert_date}"
-            callback_data = f"view_advert_{advert.id}"
+            btn_text = f"🚗 {advert['name'][:15]}... | {_format_price(advert['price'])} | {advert_date}"
+            callback_data = f"view_advert_{advert['id']}"
             keyboard_buttons.append([InlineKeyboardButton(text=btn_text, callback_data=callback_data)])
 
         nav_buttons = []
@@ -329,9 +317,12 @@ async def show_user_transactions(callback: CallbackQuery):
         page = int(data_parts[4])
 
         user = await User.get(id=user_id)
-        transactions = await Transaction.filter(user=user).order_by("-created_at").all()
+        pagination = await paginate(
+            f"user_transactions:{user_id}", Transaction.filter(user_id=user_id), page,
+            ("type", "amount", "created_at"),
+        )
 
-        if not transactions:
+        if not pagination.total:
             text = f"💰 <b>Транзакции пользователя {user.fullname or user.id}</b>\n\n"
             text += "Нет транзакций."
 
@@ -343,14 +334,11 @@ async def show_user_transactions(callback: CallbackQuery):
             await callback.answer()
             return
 
-        pagination = Pagination(transactions, page_size=5)
-        page_transactions = pagination.get_page(page)
-
         text = f"💰 <b>Транзакции пользователя {user.fullname or user.id}</b>\n\n"
         text += f"{pagination.get_page_info()}\n\n"
 
-        for i, trans in enumerate(page_transactions, 1):
-            trans_date = trans.created_at.strftime("%d.%m.%Y %H:%M")
+        for i, trans in enumerate(pagination.items, 1):
+            trans_date = trans["created_at"].strftime("%d.%m.%Y %H:%M")
             trans_type = {
                 "subscription": "🔔 Подписка",
                 "advert": "📢 Публикация",
@@ -359,11 +347,11 @@ async def show_user_transactions(callback: CallbackQuery):
                 "topup": "💰 Пополнение",
                 "referral_bonus": "👥 Реферал",
                 "other": "📊 Другое"
-            }.get(trans.type, trans.type)
+            }.get(trans["type"], trans["type"])
 
-            amount_color = "🟢 +" if trans.amount > 0 else "🔴 "
+            amount_color = "🟢 +" if trans["amount"] > 0 else "🔴 "
             text += f"{i}. {trans_type}\n"
-            text += f"   {amount_color}{_format_price(trans.amount)}\n"
+            text += f"   {amount_color}{_format_price(trans['amount'])}\n"
             text += f"   📅 {trans_date}\n"
             text += "─" * 25 + "\n"
 
@@ -409,15 +397,10 @@ async def show_user_transactions(callback: CallbackQuery):
 async def view_advert_detail(callback: CallbackQuery):
     try:
         advert_id = int(callback.data.replace("view_advert_", ""))
-        advert = await Advert.get(id=advert_id)
-
-        photos = await AdvertPhoto.filter(advert=advert).order_by("position").all()
-        photo_ids = [photo.file_id for photo in photos]
-
-        owner = await User.get(id=advert.owner_id)
+        advert = await get_advert_card(advert_id)
+        photo_ids = advert.photo_ids
 
-        autoteka_report = await AutotekaReport.filter(advert=advert).first()
-        autoteka_info = "✅ Куплен" if autoteka_report else "❌ Нет"
+        autoteka_info = "✅ Куплен" if advert.has_autoteka_report else "❌ Нет"
 
         preview_text = f"""
 🚗 {advert.name or 'Не указано'}
@@ -436,7 +419,7 @@ async def view_advert_detail(callback: CallbackQuery):
 🌍 Город: {advert.city or 'Не указано'}
 📞 Контакты: {advert.contacts or 'Не указано'}
 
-👤 Владелец: {owner.fullname or 'Не указано'} (ID: {owner.id})
+👤 Владелец: {advert.owner_fullname or 'Не указано'} (ID: {advert.owner_id})
 📊 Статус: {advert.status}
 📅 Дата создания: {advert.created_at.strftime('%d.%m.%Y %H:%M')}
 
@@ -480,9 +463,12 @@ async def stats_adverts(callback: CallbackQuery):
 
 
 async def show_adverts_page(callback: CallbackQuery, page: int):
-    adverts = await Advert.filter(status="active").order_by("-created_at").all()
+    pagination = await paginate(
+        "adverts:active", Advert.filter(status="active"), page,
+        ("id", "name", "price", "created_at", "owner__fullname"),
+    )
 
-    if not adverts:
+    if not pagination.total:
         text = "📢 <b>Опубликованные объявления</b>\n\nНет активных объявлений."
         keyboard = InlineKeyboardMarkup(inline_keyboard=[
             [InlineKeyboardButton(text="◀️ Назад", callback_data="admin_stats_menu")]
@@ -490,26 +476,19 @@ async def show_adverts_page(callback: CallbackQuery, page: int):
         await callback.message.edit_text(text, reply_markup=keyboard)
         return
 
-    pagination = Pagination(adverts, page_size=5)
-    page_adverts = pagination.get_page(page)
-
     text = "📢 <b>Опубликованные объявления</b>\n\n"
     text += f"{pagination.get_page_info()}\n"
-    text += f"Всего активных: {len(adverts)}\n\n"
+    text += f"Всего активных: {pagination.total}\n\n"
 
     keyboard_buttons = []
 
-    for advert in page_adverts:
-        try:
-            owner = await User.get(id=advert.owner_id)
-            owner_info = f"{owner.fullname or 'Без имени'}" if owner else "Не найден"
-        except:
-            owner_info = "Не найден"
+    for advert in pagination.items:
+        owner_info = advert["owner__fullname"] or "Без имени"
 
-        date_str = advert.created_at.strftime("%d.%m.%Y")
+        date_str = advert["created_at"].strftime("%d.%m.%Y")
 
-        btn_text = f"🚗 {advert.name[:20]}... | {_format_price(advert.price)}"
-        callback_data = f"view_advert_{advert.id}"
+        btn_text = f"🚗 {advert['name'][:20]}... | {_format_price(advert['price'])}"
+        callback_data = f"view_advert_{advert['id']}"
         keyboard_buttons.append([InlineKeyboardButton(text=btn_text, callback_data=callback_data)])
 
         text += f"• {owner_info} | {date_str}\n"
@@ -562,9 +541,9 @@ async def stats_users(callback: CallbackQuery):
 
 
 async def show_users_page(callback: CallbackQuery, page: int):
-    users = await User.all().order_by("-created_at").all()
+    pagination = await paginate("users:all", User.all(), page, ("id", "fullname", "role", "created_at"))
 
-    if not users:
+    if not pagination.total:
         text = "👤 <b>Пользователи в боте</b>\n\nНет пользователей."
         keyboard = InlineKeyboardMarkup(inline_keyboard=[
             [InlineKeyboardButton(text="◀️ Назад", callback_data="admin_stats_menu")]
@@ -572,14 +551,12 @@ async def show_users_page(callback: CallbackQuery, page: int):
         await callback.message.edit_text(text, reply_markup=keyboard)
         return
 
-    pagination = Pagination(users, page_size=5)
-    page_users = pagination.get_page(page)
-
-    total_users = len(users)
-    owners = await User.filter(role="owner").count()
-    admins = await User.filter(role="admin").count()
-    moderators = await User.filter(role="moderator").count()
-    users_count = await User.filter(role="user").count()
+    total_users = pagination.total
+    roles = dict(await User.annotate(count=Count("id")).group_by("role").values_list("role", "count"))
+    owners = roles.get("owner", 0)
+    admins = roles.get("admin", 0)
+    moderators = roles.get("moderator", 0)
+    users_count = roles.get("user", 0)
 
     text = "👤 <b>Пользователи в боте</b>\n\n"
     text += f"<b>Общая статистика:</b>\n"
@@ -593,14 +570,15 @@ async def show_users_page(callback: CallbackQuery, page: int):
 
     keyboard_buttons = []
 
-    for user in page_users:
-        date_str = user.created_at.strftime("%d.%m.%Y")
+    for user in pagination.items:
+        date_str = user["created_at"].strftime("%d.%m.%Y")
 
-        btn_text = f"👤 {user.fullname or f'ID: {user.id}'}"
-        callback_data = f"admin_user_{user.id}"
+        user_id = user["id"]
+        btn_text = f"👤 {user['fullname'] or f'ID: {user_id}'}"
+        callback_data = f"admin_user_{user_id}"
         keyboard_buttons.append([InlineKeyboardButton(text=btn_text, callback_data=callback_data)])
 
-        text += f"• {user.fullname or 'Без имени'} | 🆔 {user.id} | 👑 {user.role} | 📅 {date_str}\n"
+        text += f"• {user['fullname'] or 'Без имени'} | 🆔 {user['id']} | 👑 {user['role']} | 📅 {date_str}\n"
 
     nav_buttons = []
     if pagination.current_page > 0:
@@ -650,47 +628,25 @@ async def stats_autoteka_spent(callback: CallbackQuery):
 
 
 async def show_autoteka_spent_page(callback: CallbackQuery, page: int):
-    settings = await Settings.first()
+    settings = await get_settings()
     if not settings:
         await callback.answer("❌ Настройки не найдены")
         return
 
     autoteka_price_user = settings.autoteka_price
 
-    autoteka_transactions = await Transaction.filter(type__in=["autoteka", "autoteka2"]).all()
-
-    user_reports = {}
-
-    for transaction in autoteka_transactions:
-        user_id = transaction.user_id
-
-        if user_id not in user_reports:
-            user_reports[user_id] = {
-                'reports_count': 0,
-                'user': None
-            }
-
-        amount_spent = abs(transaction.amount)
-        if autoteka_price_user > 0:
-            reports_from_transaction = int(amount_spent / autoteka_price_user)
-        else:
-            reports_from_transaction = 1
-
-        user_reports[user_id]['reports_count'] += reports_from_transaction
+    page_size = 10
+    totals = await get_autoteka_totals()
+    total_users = totals["buyers"]
+    total_pages = max(1, (total_users + page_size - 1) // page_size)
+    page = max(0, min(page, total_pages - 1))
+    rows = await get_autoteka_buyers(limit=page_size, offset=page * page_size)
 
-    for user_id in user_reports.keys():
-        user = await User.get_or_none(id=user_id)
-        user_reports[user_id]['user'] = user
-
-    users_list = []
-    for user_id, data in user_reports.items():
-        users_list.append({
-            'user_id': user_id,
-            'reports_count': data['reports_count'],
-            'user': data['user']
-        })
-
-    users_list.sort(key=lambda x: x['reports_count'], reverse=True)
+    users = {user.id: user for user in await User.filter(id__in=[row["user_id"] for row in rows])}
+    users_list = [
+        {'user_id': row["user_id"], 'reports_count': row["reports"], 'user': users.get(row["user_id"])}
+        for row in rows
+    ]
 
     if not users_list:
         text = "💰 <b>Купленные отчёты автотеки</b>\n\n"
@@ -704,19 +660,16 @@ async def show_autoteka_spent_page(callback: CallbackQuery, page: int):
         await callback.answer()
         return
 
-    pagination = Pagination(users_list, page_size=10)
-    page_users = pagination.get_page(page)
-
     text = "💰 <b>Купленные отчёты автотеки</b>\n\n"
 
     text += f"<b>Общая статистика:</b>\n"
     text += f"🔍 Цена отчета: <b>{_format_price(autoteka_price_user)}</b>\n"
-    text += f"📊 Всего отчетов куплено: <b>{sum(u['reports_count'] for u in users_list)} шт</b>\n"
-    text += f"👤 Пользователей купили: <b>{len(users_list)}</b>\n\n"
+    text += f"📊 Всего отчетов куплено: <b>{totals['reports']} шт</b>\n"
+    text += f"👤 Пользователей купили: <b>{total_users}</b>\n\n"
 
-    text += f"{pagination.get_page_info()}\n\n"
+    text += f"Страница {page + 1}/{total_pages}\n\n"
 
-    for i, user_data in enumerate(page_users, 1):
+    for i, user_data in enumerate(users_list, 1):
         user = user_data['user']
         user_id = user_data['user_id']
 
@@ -731,21 +684,21 @@ async def show_autoteka_spent_page(callback: CallbackQuery, page: int):
     keyboard_buttons = []
 
     nav_buttons = []
-    if pagination.current_page > 0:
+    if page > 0:
         nav_buttons.append(InlineKeyboardButton(
             text="⬅️ Назад",
-            callback_data=f"autoteka_spent_page_{pagination.current_page - 1}"
+            callback_data=f"autoteka_spent_page_{page - 1}"
         ))
 
     nav_buttons.append(InlineKeyboardButton(
-        text=f"📄 {pagination.current_page + 1}/{pagination.total_pages}",
+        text=f"📄 {page + 1}/{total_pages}",
         callback_data="noop"
     ))
 
-    if pagination.current_page < pagination.total_pages - 1:
+    if page < total_pages - 1:
         nav_buttons.append(InlineKeyboardButton(
             text="Вперед ➡️",
-            callback_data=f"autoteka_spent_page_{pagination.current_page + 1}"
+            callback_data=f"autoteka_spent_page_{page + 1}"
         ))
 
     if nav_buttons:
@@ -775,7 +728,7 @@ async def handle_autoteka_spent_page(callback: CallbackQuery):
 
 @router.callback_query(F.data == "stats_income")
 async def stats_income(callback: CallbackQuery):
-    settings = await Settings.first()
+    settings = await get_settings()
     if not settings:
         await callback.answer("❌ Настройки не найдены")
         return
@@ -783,63 +736,16 @@ async def stats_income(callback: CallbackQuery):
     autoteka_price_user = settings.autoteka_price
     AUTOTEKA_COST = Decimal('99')
 
-    income_transactions = await Transaction.filter(
-        type__in=["subscription", "advert", "autoteka", "autoteka2"]
-    ).all()
-
-    topup_transactions = await Transaction.filter(type="topup").all()
-
-    income_by_type_all_time = {
-        "subscription": Decimal('0'),
-        "advert": Decimal('0'),
-        "autoteka": Decimal('0'),
-        "autoteka2": Decimal('0'),
-        "total": Decimal('0')
-    }
-
-    income_by_type_month = {
-        "subscription": Decimal('0'),
-        "advert": Decimal('0'),
-        "autoteka": Decimal('0'),
-        "autoteka2": Decimal('0'),
-        "total": Decimal('0')
-    }
+    stats = await get_income_stats()
+    all_time, month = stats["all"], stats["month"]
 
-    current_month = datetime.now().month
-    current_year = datetime.now().year
+    income_by_type_all_time = {type_: all_time[type_]["income"] for type_ in ("subscription", "advert")}
+    income_by_type_month = {type_: month[type_]["income"] for type_ in ("subscription", "advert")}
+    total_topup_all_time = all_time["topup"]["income"]
+    total_topup_month = month["topup"]["income"]
 
-    total_topup_all_time = Decimal('0')
-    total_topup_month = Decimal('0')
-
-    for transaction in topup_transactions:
-        if transaction.amount > 0:
-            total_topup_all_time += transaction.amount
-
-            if (transaction.created_at.month == current_month and
-                    transaction.created_at.year == current_year):
-                total_topup_month += transaction.amount
-
-    for transaction in income_transactions:
-        if transaction.amount > 0:
-            income_by_type_all_time[transaction.type] += transaction.amount
-            income_by_type_all_time["total"] += transaction.amount
-
-            if (transaction.created_at.month == current_month and
-                    transaction.created_at.year == current_year):
-                income_by_type_month[transaction.type] += transaction.amount
-                income_by_type_month["total"] += transaction.amount
-
-    autoteka_transactions_all_time = await Transaction.filter(type__in=["autoteka", "autoteka2"]).all()
-    total_autoteka_reports_all_time = 0
-    total_autoteka_income = Decimal('0')
-
-    for transaction in autoteka_transactions_all_time:
-        if transaction.amount < 0:
-            amount_spent = abs(transaction.amount)
-            total_autoteka_income += amount_spent
-
-            if autoteka_price_user > 0:
-                total_autoteka_reports_all_time += int(amount_spent / autoteka_price_user)
+    total_autoteka_income = all_time["autoteka"]["spent"] + all_time["autoteka2"]["spent"]
+    total_autoteka_reports_all_time = all_time["autoteka"]["reports"] + all_time["autoteka2"]["reports"]
 
     total_autoteka_expenses = Decimal('0')
     if total_autoteka_reports_all_time > 0:
@@ -877,19 +783,8 @@ async def stats_income(callback: CallbackQuery):
     text += f"🔔 Подписки: <b>{_format_price(income_by_type_month['subscription'])}</b>\n"
     text += f"📢 Публикации: <b>{_format_price(income_by_type_month['advert'])}</b>\n"
 
-    autoteka_income_month = Decimal('0')
-    autoteka_reports_month = 0
-
-    for transaction in autoteka_transactions_all_time:
-        if (transaction.amount < 0 and
-                transaction.created_at.month == current_month and
-                transaction.created_at.year == current_year):
-
-            amount_spent = abs(transaction.amount)
-            autoteka_income_month += amount_spent
-
-            if autoteka_price_user > 0:
-                autoteka_reports_month += int(amount_spent / autoteka_price_user)
+    autoteka_income_month = month["autoteka"]["spent"] + month["autoteka2"]["spent"]
+    autoteka_reports_month = month["autoteka"]["reports"] + month["autoteka2"]["reports"]
 
     autoteka_expenses_month = autoteka_reports_month * AUTOTEKA_COST
     net_autoteka_profit_month = autoteka_income_month - autoteka_expenses_month
@@ -77,4 +77,19 @@ def admin_roles_kb():
 def back_to_admin_kb():
     return InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(text="🔙 Назад", callback_data="admin_back")]
-    ])
\ No newline at end of file
+    ])
+
+def broadcast_segment_kb(segment: dict, total: int):
+    subscription = {"active": "активная", "none": "нет"}.get(segment.get("subscription"), "любая")
+    role = segment.get("role") or "все"
+    favorites = "есть" if segment.get("has_favorites") else "неважно"
+    return InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text="🏙 Город", callback_data="bseg_city"),
+         InlineKeyboardButton(text="📅 Регистрация", callback_data="bseg_registered")],
+        [InlineKeyboardButton(text=f"💳 Подписка: {subscription}", callback_data="bseg_subscription"),
+         InlineKeyboardButton(text=f"🛡 Роль: {role}", callback_data="bseg_role")],
+        [InlineKeyboardButton(text=f"⭐ Избранное: {favorites}", callback_data="bseg_favorites")],
+        [InlineKeyboardButton(text="♻️ Сбросить условия", callback_data="bseg_reset")],
+        [InlineKeyboardButton(text=f"✅ Отправить ({total})", callback_data="confirm_broadcast")],
+        [InlineKeyboardButton(text="❌ Отмена", callback_data="cancel_broadcast")]
+    ])
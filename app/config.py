@@ -12,6 +12,36 @@ AUTOTEKA_PASSWORD = os.getenv("AUTOTEKA_PASSWORD")
 YOOKASSA_SHOP_ID = os.getenv("YOOKASSA_SHOP_ID")
 YOOKASSA_SECRET_KEY = os.getenv("YOOKASSA_SECRET_KEY")
 
+# индекс активных объявлений в памяти (нужен numpy), см. services/advert_index.py
+ADVERT_INDEX_ENABLED = os.getenv("ADVERT_INDEX") == "1"
+
+# хранилище FSM: db - таблица fsm_storage (по умолчанию), memory - в памяти процесса
+FSM_STORAGE = os.getenv("FSM_STORAGE", "db")
+
+# режим получения обновлений: polling или webhook, см. app/webhook.py
+BOT_MODE = os.getenv("BOT_MODE", "polling")
+# публичный адрес вебхука; без него сервер поднимается без setWebhook - для локальной проверки
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8080"))
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "32"))
+WEBHOOK_QUEUE_SIZE = int(os.getenv("WEBHOOK_QUEUE_SIZE", "1000"))
+WEBHOOK_DRAIN_TIMEOUT = float(os.getenv("WEBHOOK_DRAIN_TIMEOUT", "30"))
+
+# больше 1 - обновления принимает один процесс и раздаёт их воркерам по user_id, см. app/supervisor.py
+WORKER_PROCESSES = int(os.getenv("WORKER_PROCESSES", "1"))
+# каталог для unix-сокетов между процессами; по умолчанию временный
+IPC_DIR = os.getenv("IPC_DIR")
+
+# потолок сообщений рассылки в секунду на бота. Общий лимит Telegram - около 30
+# в секунду на все сообщения бота, и в него же идут ответы пользователям,
+# оповещения и повторный проход рассылки, поэтому по умолчанию запас - 25.
+# Ловите RetryAfter - уменьшайте, выше 30 не поднимайте. При 25/с рассылка на
+# 100 тыс. пользователей идёт около 67 минут, на 10 тыс. - около 7 минут
+BROADCAST_RATE = float(os.getenv("BROADCAST_RATE", "25"))
+
 TORTOISE_ORM = {
     "connections": {
         "default": DB_URL
@@ -1,3 +1,6 @@
+from typing import Optional
+
+from app.services.invalidation import notify, on_invalidate
 
 from .models import (
     User,
@@ -8,7 +11,35 @@ from .models import (
     AutotekaReport, SearchFilter,
 )
 
+# Цены читаются почти в каждом платёжном сценарии, а меняются только из
+# админки, поэтому строка настроек держится в памяти процесса. Загружается
+# при старте (load_settings), меняется только через update_settings - он же
+# рассылает сброс остальным процессам.
+_settings: Optional[Settings] = None
+
+
+async def load_settings() -> Settings:
+    global _settings
+    _settings, _ = await Settings.get_or_create(id=1)
+    return _settings
+
 
 async def get_settings():
-    settings, _ = await Settings.get_or_create(id=1)
-    return settings
\ No newline at end of file
+    if _settings is None:
+        return await load_settings()
+    return _settings
+
+
+async def update_settings(**fields) -> Settings:
+    settings = await load_settings()
+    settings.update_from_dict(fields)
+    await settings.save(update_fields=list(fields))
+    await notify("settings")
+    return settings
+
+
+async def _on_settings_changed(payload):
+    await load_settings()
+
+
+on_invalidate("settings", _on_settings_changed)
@@ -1,6 +1,15 @@
+import bisect
+import hashlib
+import json
+import random
+import time
+from collections import OrderedDict
+from datetime import datetime
 from decimal import Decimal
-from typing import Iterable, Optional, Dict, Any, List
+from typing import Iterable, Optional, Dict, Any, List, Tuple
 from tortoise.exceptions import DoesNotExist
+from tortoise.expressions import Q
+from tortoise.queryset import QuerySet
 from pathlib import Path
 
 from .models import (
@@ -11,18 +20,26 @@ from .models import (
     AutotekaReport, SearchFilter, Transaction,
 )
 from app.services.car_generation import apply_generation_filter, BRAND_TRANSLATIONS
-from ..other import _format_price
+from app.services.cars_data import car_name_keys
+from app.services.cities import city_id_by_name
+from app.services.invalidation import notify, on_invalidate
+from ..other import _format_price, parse_engine_volume
 
 
 async def create_advert_from_state(user_id: int, data: Dict[str, Any]) -> Advert:
+    name = data.get("name", "")
+    brand_key, model_key = car_name_keys(name)
     advert = await Advert.create(
         owner_id=user_id,
-        name=data.get("name", ""),
+        name=name,
+        brand_key=brand_key,
+        model_key=model_key,
         year=data.get("year", 2015),
         mileage=int(data.get("mileage") or 0),
         condition=data.get("condition", ""),
         fuel_type=data.get("fuel_type", ""),
         engine_volume=str(data.get("engine_volume", "")),
+        engine_volume_liters=parse_engine_volume(data.get("engine_volume")),
         transmission=data.get("transmission", ""),
         body_type=data.get("body_type", ""),
         color=data.get("color", ""),
@@ -30,6 +47,7 @@ async def create_advert_from_state(user_id: int, data: Dict[str, Any]) -> Advert
         license_plate=data.get("license_plate", ""),
         contacts=data.get("contacts", ""),
         city=data.get("city", ""),
+        city_id=data.get("city_id") or city_id_by_name(data.get("city")),
         description=data.get("description", ""),
         price=data.get("price") or 0,
         autoteka_purchased=bool(data.get("autoteka_purchased")),
@@ -65,6 +83,52 @@ async def get_advert_by_id(advert_id: int) -> Optional[Advert]:
     return advert
 
 
+# Карточка объявления одним запросом: поля объявления, имя владельца, наличие
+# отчёта Автотеки и file_id фото по position. В Postgres фото собираются через
+# array_agg, в SQLite - через json_group_array.
+_CARD_SQL = """
+SELECT a.*, u.fullname AS owner_fullname,
+       EXISTS(SELECT 1 FROM autoteka_reports r WHERE r.advert_id = a.id) AS has_autoteka_report,
+       {photos} AS photo_ids
+FROM adverts a
+JOIN users u ON u.id = a.owner_id
+WHERE a.id = {advert_id}{status}
+"""
+_CARD_PHOTOS_POSTGRES = (
+    "COALESCE((SELECT array_agg(p.file_id ORDER BY p.position) "
+    "FROM advert_photos p WHERE p.advert_id = a.id), '{}')"
+)
+_CARD_PHOTOS_SQLITE = (
+    "(SELECT json_group_array(file_id) FROM "
+    "(SELECT file_id FROM advert_photos p WHERE p.advert_id = a.id ORDER BY p.position))"
+)
+
+
+async def get_advert_card(advert_id: int, status: Optional[str] = None) -> Optional[Advert]:
+    conn = Advert._meta.db
+    postgres = conn.capabilities.dialect == "postgres"
+    placeholders = ("$1", "$2") if postgres else ("?", "?")
+
+    sql = _CARD_SQL.format(
+        photos=_CARD_PHOTOS_POSTGRES if postgres else _CARD_PHOTOS_SQLITE,
+        advert_id=placeholders[0],
+        status=f" AND a.status = {placeholders[1]}" if status else "",
+    )
+    params = [advert_id, status] if status else [advert_id]
+
+    rows = await conn.execute_query_dict(sql, params)
+    if not rows:
+        return None
+
+    row = rows[0]
+    advert = Advert._init_from_db(**row)
+    photo_ids = row["photo_ids"]
+    advert.photo_ids = list(photo_ids) if postgres else json.loads(photo_ids)
+    advert.owner_fullname = row["owner_fullname"]
+    advert.has_autoteka_report = bool(row["has_autoteka_report"])
+    return advert
+
+
 async def add_favorite_advert(user_id: int, advert_id: int) -> FavoriteAdvert:
     fav, _ = await FavoriteAdvert.get_or_create(
         user_id=user_id,
@@ -73,10 +137,7 @@ async def add_favorite_advert(user_id: int, advert_id: int) -> FavoriteAdvert:
     return fav
 
 
-async def get_random_advert_with_filters(
-        filters: Dict[str, Any],
-        exclude_ids: Optional[Iterable[int]] = None,
-) -> Optional[Advert]:
+def _normalize_filters(filters: Dict[str, Any]) -> Dict[str, Any]:
     name = filters.get("name")
     brand = None
     model = None
@@ -102,14 +163,35 @@ async def get_random_advert_with_filters(
         if 'year_from' in filters_copy and 'year_to' in filters_copy:
             filters = filters_copy
 
+    return filters
+
+
+def _build_adverts_queryset(
+        filters: Dict[str, Any],
+        exclude_ids: Optional[Iterable[int]] = None,
+) -> QuerySet:
+    filters = _normalize_filters(filters)
     qs = Advert.filter(status="active")
 
     city = filters.get("city")
     if city:
-        qs = qs.filter(city__iexact=city)
+        city_id = filters.get("city_id") or city_id_by_name(city)
+        if city_id:
+            qs = qs.filter(city_id=city_id)
+        else:
+            # города нет в справочнике - сравниваем текст
+            qs = qs.filter(city__iexact=city)
 
+    name = filters.get("name")
     if name:
-        qs = qs.filter(name__icontains=name)
+        brand_key, model_key = car_name_keys(name)
+        if brand_key:
+            qs = qs.filter(brand_key=brand_key)
+            if model_key:
+                qs = qs.filter(model_key=model_key)
+        else:
+            # одна модель без марки - ключей нет, ищем по названию
+            qs = qs.filter(name__icontains=name.strip())
 
     if 'year' in filters:
         year = filters.get("year")
@@ -172,9 +254,9 @@ async def get_random_advert_with_filters(
         except (ValueError, TypeError):
             pass
 
-    engine_volume_max = filters.get("engine_volume_max")
+    engine_volume_max = parse_engine_volume(filters.get("engine_volume_max"))
     if engine_volume_max:
-        qs = qs.filter(engine_volume__icontains=str(engine_volume_max))
+        qs = qs.filter(engine_volume_liters__lte=engine_volume_max)
 
     transmission = filters.get("transmission")
     if transmission:
@@ -196,22 +278,219 @@ async def get_random_advert_with_filters(
         except Exception:
             pass
 
-    count = await qs.count()
-    if count == 0:
-        return None
+    return qs
+
+
+# Кэш подходящих под фильтры объявлений: одинаковые фильтры у многих пользователей,
+# поэтому список (random_key, id) считается один раз и живёт FILTER_CACHE_TTL секунд.
+# Если подходящих больше FILTER_CACHE_MAX_IDS, запоминаем None и выбираем по индексу в базе.
+FILTER_CACHE_TTL = 60
+FILTER_CACHE_SIZE = 1000
+FILTER_CACHE_MAX_IDS = 5000
+
+_filter_cache: "OrderedDict[str, Tuple[float, Optional[List[tuple]]]]" = OrderedDict()
+_filter_cache_generation = 0
+
 
-    import random
-    random_offset = random.randint(0, max(0, count - 1))
+def filters_signature(filters: Dict[str, Any]) -> str:
+    canonical = {key: value for key, value in (filters or {}).items() if value not in (None, "")}
+    if canonical.get("city"):
+        canonical["city"] = str(canonical["city"]).strip().upper()
+    raw = json.dumps(canonical, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(raw.encode()).hexdigest()
 
-    advert = await qs.offset(random_offset).prefetch_related("photos").first()
+
+def invalidate_filter_cache():
+    global _filter_cache_generation
+    _filter_cache_generation += 1
+    _filter_cache.clear()
+
+
+async def _cached_matches(filters: Dict[str, Any]) -> Optional[List[tuple]]:
+    signature = filters_signature(filters)
+    now = time.monotonic()
+
+    entry = _filter_cache.get(signature)
+    if entry and now - entry[0] < FILTER_CACHE_TTL:
+        _filter_cache.move_to_end(signature)
+        return entry[1]
+
+    generation = _filter_cache_generation
+    rows = await _build_adverts_queryset(filters).order_by("random_key").limit(
+        FILTER_CACHE_MAX_IDS + 1
+    ).values_list("random_key", "id")
+    if len(rows) > FILTER_CACHE_MAX_IDS:
+        rows = None
+
+    # пока шёл запрос, статус какого-то объявления поменялся - результат мог устареть
+    if generation == _filter_cache_generation:
+        _filter_cache[signature] = (now, rows)
+        _filter_cache.move_to_end(signature)
+        while len(_filter_cache) > FILTER_CACHE_SIZE:
+            _filter_cache.popitem(last=False)
+
+    return rows
+
+
+async def get_random_advert_with_filters(
+        filters: Dict[str, Any],
+        exclude_ids: Optional[Iterable[int]] = None,
+) -> Optional[Advert]:
+    rows = await _cached_matches(filters)
+    if rows is not None:
+        excluded = set(exclude_ids or ())
+        candidates = [advert_id for _, advert_id in rows if advert_id not in excluded]
+        if not candidates:
+            return None
+        return await get_active_advert(random.choice(candidates))
+
+    qs = _build_adverts_queryset(filters, exclude_ids)
+
+    # Берём первое объявление после случайной точки по random_key,
+    # если после неё ничего нет - с начала. Два поиска по индексу
+    # вместо COUNT + OFFSET, время не зависит от размера таблицы.
+    pivot = random.random()
+    advert = await qs.filter(random_key__gte=pivot).order_by("random_key").prefetch_related("photos").first()
+    if advert is None:
+        advert = await qs.filter(random_key__lt=pivot).order_by("random_key").prefetch_related("photos").first()
     return advert
 
+async def get_advert_ids_batch(
+        filters: Dict[str, Any],
+        after_key: Optional[float] = None,
+        before_key: Optional[float] = None,
+        limit: int = 50,
+) -> List[tuple]:
+    rows = await _cached_matches(filters)
+    if rows is not None:
+        start = 0
+        end = len(rows)
+        if after_key is not None:
+            start = bisect.bisect_right(rows, after_key, key=lambda row: row[0])
+        if before_key is not None:
+            end = bisect.bisect_left(rows, before_key, key=lambda row: row[0])
+        return [(advert_id, key) for key, advert_id in rows[start:min(end, start + limit)]]
+
+    qs = _build_adverts_queryset(filters)
+    if after_key is not None:
+        qs = qs.filter(random_key__gt=after_key)
+    if before_key is not None:
+        qs = qs.filter(random_key__lt=before_key)
+
+    return await qs.order_by("random_key").limit(limit).values_list("id", "random_key")
+
+
+# Поиск по словам. В Postgres - по колонке search_vector (tsvector с русской
+# конфигурацией car_russian, её ведёт триггер из миграции 5_...), ранжирование
+# ts_rank_cd и постраничный вывод по ключу (rank, id). В SQLite полнотекстового
+# поиска нет: каждое слово ищем в названии или описании, порядок - новые сначала.
+_WORDS_SEARCH_SQL = """
+SELECT a.id, ts_rank_cd(a.search_vector, q.query) AS rank
+FROM adverts a, websearch_to_tsquery('car_russian', $1) AS q(query)
+WHERE a.search_vector @@ q.query
+  AND a.status = 'active'
+  AND a.id IN ({filtered})
+  AND ($2::real IS NULL OR (ts_rank_cd(a.search_vector, q.query), a.id) < ($2::real, $3::int))
+ORDER BY rank DESC, a.id DESC
+LIMIT $4
+"""
+
+
+async def search_adverts_by_words(
+        query: str,
+        filters: Dict[str, Any],
+        after: Optional[tuple] = None,
+        limit: int = 10,
+) -> List[tuple]:
+    # результат - [(id, rank)], after - последняя пара предыдущей страницы
+    qs = _build_adverts_queryset(filters)
+    conn = Advert._meta.db
+
+    if conn.capabilities.dialect == "postgres":
+        # параметры фильтров подставлены pypika с экранированием, текст запроса - параметром
+        filtered = qs.values_list("id", flat=True).sql(params_inline=True)
+        rank, last_id = after if after else (None, None)
+        _, rows = await conn.execute_query(
+            _WORDS_SEARCH_SQL.format(filtered=filtered), [query, rank, last_id, limit]
+        )
+        return [(row["id"], float(row["rank"])) for row in rows]
+
+    for word in query.split():
+        qs = qs.filter(Q(name__icontains=word) | Q(description__icontains=word))
+    if after:
+        qs = qs.filter(id__lt=after[1])
+    ids = await qs.order_by("-id").limit(limit).values_list("id", flat=True)
+    return [(advert_id, 0.0) for advert_id in ids]
+
+
+# сортировки списка объявлений: поле и порядок по убыванию;
+# страницы по ключу (поле, id), под них частичные индексы на активных объявлениях
+ADVERT_SORTS = {
+    "cheap": ("price", False),
+    "new": ("created_at", True),
+    "mileage": ("mileage", False),
+}
+
+
+def _sort_cursor_value(field: str, value):
+    # значение ключа сортировки хранится в данных FSM, поэтому в JSON-виде
+    if field == "price":
+        return str(value)
+    if field == "created_at":
+        return value.isoformat()
+    return value
+
+
+def _sort_value(field: str, value):
+    if field == "price":
+        return Decimal(value)
+    if field == "created_at":
+        return datetime.fromisoformat(value)
+    return value
+
+
+async def get_sorted_advert_page(
+        filters: Dict[str, Any],
+        sort: str,
+        after: Optional[tuple] = None,
+        limit: int = 10,
+) -> List[tuple]:
+    # результат - [(id, курсор)], after - курсор последней строки предыдущей страницы
+    field, descending = ADVERT_SORTS[sort]
+    qs = _build_adverts_queryset(filters)
+
+    if after:
+        value, last_id = _sort_value(field, after[0]), after[1]
+        # (field, id) > (value, last_id) в виде, который использует индекс по field
+        if descending:
+            qs = qs.filter(**{f"{field}__lte": value}).filter(
+                Q(**{f"{field}__lt": value}) | Q(id__lt=last_id)
+            )
+        else:
+            qs = qs.filter(**{f"{field}__gte": value}).filter(
+                Q(**{f"{field}__gt": value}) | Q(id__gt=last_id)
+            )
+
+    order = (f"-{field}", "-id") if descending else (field, "id")
+    rows = await qs.order_by(*order).limit(limit).values_list("id", field)
+    return [(advert_id, [_sort_cursor_value(field, value), advert_id]) for advert_id, value in rows]
+
+
+async def get_advert_summaries(advert_ids: List[int]) -> List[dict]:
+    # короткие строки для списков объявлений в порядке advert_ids
+    rows = await Advert.filter(id__in=advert_ids).values("id", "name", "price", "city", "year", "mileage")
+    by_id = {row["id"]: row for row in rows}
+    return [by_id[advert_id] for advert_id in advert_ids if advert_id in by_id]
+
+
+async def get_active_advert(advert_id: int) -> Optional[Advert]:
+    return await Advert.filter(id=advert_id, status="active").prefetch_related("photos").first()
+
+
 async def get_user_favorites(user_id: int) -> List[FavoriteAdvert]:
+    # сами карточки грузятся через get_advert_card, здесь нужен только порядок
     return await FavoriteAdvert.filter(
         user_id=user_id
-    ).prefetch_related(
-        "advert",
-        "advert__photos"
     ).order_by("-created_at")
 
 async def remove_from_favorites(user_id: int, advert_id: int) -> bool:
@@ -223,57 +502,169 @@ async def remove_from_favorites(user_id: int, advert_id: int) -> bool:
 
 
 
+FILTER_FIELDS = (
+    'city', 'city_id', 'name', 'year', 'condition', 'fuel_type',
+    'mileage_from', 'mileage_to', 'price_from', 'price_to',
+    'engine_volume_max', 'transmission', 'body_type', 'color'
+)
+MAX_SAVED_SEARCHES = 5
+
+# растёт при любом изменении сохранённых поисков, по нему индекс оповещений
+# понимает, что его пора пересобрать; остальные процессы узнают об изменении
+# через notify("saved_searches")
+saved_searches_version = 0
+
+
+def _bump_local_saved_searches():
+    global saved_searches_version
+    saved_searches_version += 1
+
+
+async def _bump_saved_searches():
+    _bump_local_saved_searches()
+    await notify("saved_searches")
+
+
+async def _on_saved_searches_changed(payload):
+    _bump_local_saved_searches()
+
+
+on_invalidate("saved_searches", _on_saved_searches_changed)
+
+
+# Кэш текущих фильтров пользователей: фильтр читается на каждом свайпе, а меняется
+# только через save_or_update_user_filter / delete_user_filter, которые сразу
+# обновляют кэш. None в кэше - фильтра у пользователя нет.
+USER_FILTER_CACHE_SIZE = 10000
+
+_user_filter_cache: "OrderedDict[int, Optional[Dict[str, Any]]]" = OrderedDict()
+
+
+def _remember_user_filter(user_id: int, filter_data: Optional[Dict[str, Any]]):
+    _user_filter_cache[user_id] = filter_data or None
+    _user_filter_cache.move_to_end(user_id)
+    while len(_user_filter_cache) > USER_FILTER_CACHE_SIZE:
+        _user_filter_cache.popitem(last=False)
+
+
+def _filter_data(filter_obj: SearchFilter) -> Dict[str, Any]:
+    filter_data = {}
+    for field in FILTER_FIELDS:
+        value = getattr(filter_obj, field)
+        if value is not None:
+            filter_data[field] = value
+    return filter_data
+
+
 async def save_or_update_user_filter(
         user_id: int,
         update_fields: Dict[str, Any]
 ) -> SearchFilter:
 
+    # текущий фильтр ленты - строка с is_default, остальные строки - сохранённые поиски
     try:
-        filter_obj = await SearchFilter.get(user_id=user_id)
+        filter_obj = await SearchFilter.get(user_id=user_id, is_default=True)
 
         for field, value in update_fields.items():
             if hasattr(filter_obj, field):
                 setattr(filter_obj, field, value)
 
         await filter_obj.save()
-        return filter_obj
 
     except DoesNotExist:
         filter_obj = await SearchFilter.create(
             user_id=user_id,
+            is_default=True,
             **update_fields
         )
-        return filter_obj
 
+    _remember_user_filter(user_id, _filter_data(filter_obj))
+    return filter_obj
 
-async def get_user_filter(user_id: int) -> Optional[Dict[str, Any]]:
-    try:
-        filter_obj = await SearchFilter.get(user_id=user_id)
 
-        filter_data = {}
-        fields = [
-            'city', 'name', 'year', 'condition', 'fuel_type',
-            'mileage_from', 'mileage_to', 'price_from', 'price_to',
-            'engine_volume_max', 'transmission', 'body_type', 'color'
-        ]
+async def get_user_filter(user_id: int) -> Optional[Dict[str, Any]]:
+    if user_id in _user_filter_cache:
+        _user_filter_cache.move_to_end(user_id)
+        filter_data = _user_filter_cache[user_id]
+        # копия - вызывающий код может менять словарь
+        return dict(filter_data) if filter_data else None
 
-        for field in fields:
-            value = getattr(filter_obj, field)
-            if value is not None:
-                filter_data[field] = value
+    filter_obj = await SearchFilter.get_or_none(user_id=user_id, is_default=True)
+    filter_data = _filter_data(filter_obj) if filter_obj else None
 
-        return filter_data if filter_data else None
-
-    except DoesNotExist:
-        return None
+    # пока шёл запрос, фильтр могли изменить - тогда в кэше уже свежее значение
+    if user_id not in _user_filter_cache:
+        _remember_user_filter(user_id, filter_data)
+    return dict(filter_data) if filter_data else None
 
 async def delete_user_filter(user_id: int) -> bool:
     try:
-        filter_obj = await SearchFilter.get(user_id=user_id)
+        filter_obj = await SearchFilter.get(user_id=user_id, is_default=True)
         await filter_obj.delete()
         return True
     except DoesNotExist:
         return False
+    finally:
+        _remember_user_filter(user_id, None)
+
+
+async def get_saved_searches(user_id: int) -> List[SearchFilter]:
+    return await SearchFilter.filter(user_id=user_id, is_default=False).order_by("id")
+
+
+async def save_current_search(user_id: int, title: str) -> Optional[SearchFilter]:
+    # None - нечего сохранять или достигнут лимит
+    filter_data = await get_user_filter(user_id)
+    if not filter_data:
+        return None
+
+    if await SearchFilter.filter(user_id=user_id, is_default=False).count() >= MAX_SAVED_SEARCHES:
+        return None
+
+    saved = await SearchFilter.create(
+        user_id=user_id,
+        is_default=False,
+        title=title[:128],
+        alerts_enabled=True,
+        **filter_data
+    )
+    await _bump_saved_searches()
+    return saved
+
+
+async def apply_saved_search(user_id: int, search_id: int) -> bool:
+    saved = await SearchFilter.get_or_none(id=search_id, user_id=user_id, is_default=False)
+    if not saved:
+        return False
+
+    await save_or_update_user_filter(
+        user_id, {field: getattr(saved, field) for field in FILTER_FIELDS}
+    )
+    return True
+
+
+async def toggle_saved_search_alerts(user_id: int, search_id: int) -> Optional[bool]:
+    saved = await SearchFilter.get_or_none(id=search_id, user_id=user_id, is_default=False)
+    if not saved:
+        return None
+
+    saved.alerts_enabled = not saved.alerts_enabled
+    await saved.save(update_fields=["alerts_enabled", "updated_at"])
+    await _bump_saved_searches()
+    return saved.alerts_enabled
+
+
+async def delete_saved_search(user_id: int, search_id: int) -> bool:
+    deleted = await SearchFilter.filter(id=search_id, user_id=user_id, is_default=False).delete()
+    if deleted:
+        await _bump_saved_searches()
+    return bool(deleted)
+
+
+async def get_alert_searches() -> List[Dict[str, Any]]:
+    return await SearchFilter.filter(is_default=False, alerts_enabled=True).values(
+        "id", "user_id", "title", *FILTER_FIELDS
+    )
 
 
 
@@ -98,7 +98,7 @@ async def handle_autoteka_purchase(obj: Message | CallbackQuery, advert_id: int
         return
 
     if user_balance >= price:
-        await down_user_balance(user_id, settings.autoteka_price)
+        await down_user_balance(user_id, settings.autoteka_price, type="autoteka")
 
     else:
         from app.handlers.payment_handler import create_payment_flow
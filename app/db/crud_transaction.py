@@ -1,5 +1,10 @@
 from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, Optional
+from uuid import uuid4
 
+from tortoise.functions import Count
+from tortoise.transactions import in_transaction
 
 from .models import (
     User,
@@ -8,7 +13,7 @@ from .models import (
     Advert,
     AdvertPhoto,
     FavoriteAdvert,
-    AutotekaReport, SearchFilter, UserCoupon, Coupon,
+    AutotekaReport, SearchFilter, UserCoupon, Coupon, DailyRevenue,
 )
 
 
@@ -26,13 +31,22 @@ async def check_active_subscription(user_id: int):
 
 async def create_transaction(user_id: int, payment_id: str, amount: float, payment_url: str, type: str):
     user = await User.get(id=user_id)
+    async with in_transaction() as conn:
+        return await add_transaction(user, amount, type, conn, payment_id=payment_id, payment_url=payment_url)
+
+
+async def add_transaction(user: User, amount, type: str, conn, payment_id: Optional[str] = None,
+                          payment_url: Optional[str] = None) -> Transaction:
+    # транзакция и её строка в сводке daily_revenue пишутся в одной транзакции базы
     transaction = await Transaction.create(
         user=user,
-        payment_id=payment_id,
+        payment_id=payment_id or str(uuid4()),
         amount=amount,
         type=type,
-        payment_url=payment_url
+        payment_url=payment_url,
+        using_db=conn,
     )
+    await record_revenue(transaction, conn)
     return transaction
 
 
@@ -114,4 +128,160 @@ async def mark_coupon_as_used(user_coupon_id: int):
     coupon.used_count += 1
     await coupon.save()
 
-    return user_coupon
\ No newline at end of file
+    return user_coupon
+
+# Сводка daily_revenue: строка на (день, тип транзакции). Каждая новая
+# транзакция прибавляется к своей строке одним upsert, статистика в админке
+# читает только сводку - несколько сотен строк при любом числе транзакций.
+_REVENUE_UPSERT_SQL = {
+    "postgres": (
+        'INSERT INTO "daily_revenue" ("day", "type", "count", "total", "positive_sum", "negative_sum", '
+        '"negative_count") VALUES ($1, $2, 1, $3, $4, $5, $6) '
+        'ON CONFLICT ("day", "type") DO UPDATE SET "count" = "daily_revenue"."count" + 1, '
+        '"total" = "daily_revenue"."total" + EXCLUDED."total", '
+        '"positive_sum" = "daily_revenue"."positive_sum" + EXCLUDED."positive_sum", '
+        '"negative_sum" = "daily_revenue"."negative_sum" + EXCLUDED."negative_sum", '
+        '"negative_count" = "daily_revenue"."negative_count" + EXCLUDED."negative_count"'
+    ),
+    # в SQLite Decimal хранится строкой - складываем как числа
+    "sqlite": (
+        'INSERT INTO "daily_revenue" ("day", "type", "count", "total", "positive_sum", "negative_sum", '
+        '"negative_count") VALUES (?, ?, 1, ?, ?, ?, ?) '
+        'ON CONFLICT ("day", "type") DO UPDATE SET "count" = "daily_revenue"."count" + 1, '
+        '"total" = CAST("daily_revenue"."total" AS REAL) + CAST(excluded."total" AS REAL), '
+        '"positive_sum" = CAST("daily_revenue"."positive_sum" AS REAL) + CAST(excluded."positive_sum" AS REAL), '
+        '"negative_sum" = CAST("daily_revenue"."negative_sum" AS REAL) + CAST(excluded."negative_sum" AS REAL), '
+        '"negative_count" = "daily_revenue"."negative_count" + excluded."negative_count"'
+    ),
+}
+
+_REVENUE_REBUILD_SQL = {
+    "postgres": (
+        'INSERT INTO "daily_revenue" ("day", "type", "count", "total", "positive_sum", "negative_sum", '
+        '"negative_count") '
+        'SELECT t.created_at::date, t.type, COUNT(*), SUM(t.amount), '
+        'SUM(CASE WHEN t.amount > 0 THEN t.amount ELSE 0 END), '
+        'SUM(CASE WHEN t.amount < 0 THEN -t.amount ELSE 0 END), '
+        'COUNT(*) FILTER (WHERE t.amount < 0) '
+        'FROM "transactions" t GROUP BY 1, 2'
+    ),
+    "sqlite": (
+        'INSERT INTO "daily_revenue" ("day", "type", "count", "total", "positive_sum", "negative_sum", '
+        '"negative_count") '
+        'SELECT date(t.created_at), t.type, COUNT(*), SUM(CAST(t.amount AS REAL)), '
+        'SUM(CASE WHEN CAST(t.amount AS REAL) > 0 THEN CAST(t.amount AS REAL) ELSE 0 END), '
+        'SUM(CASE WHEN CAST(t.amount AS REAL) < 0 THEN -CAST(t.amount AS REAL) ELSE 0 END), '
+        'SUM(CASE WHEN CAST(t.amount AS REAL) < 0 THEN 1 ELSE 0 END) '
+        'FROM "transactions" t GROUP BY 1, 2'
+    ),
+}
+
+
+async def record_revenue(transaction: Transaction, conn):
+    amount = Decimal(str(transaction.amount))
+    postgres = conn.capabilities.dialect == "postgres"
+    values = [
+        transaction.created_at.date(),
+        transaction.type,
+        amount,
+        max(amount, Decimal(0)),
+        max(-amount, Decimal(0)),
+        1 if amount < 0 else 0,
+    ]
+    if not postgres:
+        values = [str(value) if isinstance(value, Decimal) else value for value in values]
+    await conn.execute_query(_REVENUE_UPSERT_SQL["postgres" if postgres else "sqlite"], values)
+
+
+async def rebuild_daily_revenue() -> int:
+    # пересчёт сводки с нуля по всем транзакциям, одной транзакцией базы
+    async with in_transaction() as conn:
+        await conn.execute_query('DELETE FROM "daily_revenue"')
+        await conn.execute_query(_REVENUE_REBUILD_SQL[conn.capabilities.dialect])
+    return await DailyRevenue.all().count()
+
+
+# Статистика заработка по сводке: в Python приходит строка на (тип, месяц).
+# Отчёт автотеки - одно списание с баланса, поэтому число отчётов - это
+# negative_count по типам autoteka и autoteka2.
+INCOME_TYPES = ("subscription", "advert", "autoteka", "autoteka2", "topup")
+
+_INCOME_SQL = """
+SELECT r.type AS type,
+       {month} AS month,
+       SUM({positive_sum}) AS income,
+       SUM({negative_sum}) AS spent,
+       SUM(r.negative_count) AS reports
+FROM daily_revenue r
+WHERE r.type IN ({types})
+GROUP BY 1, 2
+"""
+
+
+def _month_key(value) -> str:
+    # Postgres отдаёт datetime из date_trunc, SQLite - строку 'YYYY-MM'
+    return value.strftime("%Y-%m") if hasattr(value, "strftime") else str(value)
+
+
+def _money(value) -> Decimal:
+    return Decimal(str(value or 0)).quantize(Decimal("0.01"))
+
+
+async def get_income_stats() -> Dict[str, Dict[str, Dict[str, Any]]]:
+    # {"all": {type: {...}}, "month": {type: {...}}}, где {...} - income, spent, reports
+    conn = DailyRevenue._meta.db
+    postgres = conn.capabilities.dialect == "postgres"
+    placeholders = [f"${i}" if postgres else "?" for i in range(1, len(INCOME_TYPES) + 1)]
+
+    sql = _INCOME_SQL.format(
+        month="date_trunc('month', r.day)" if postgres else "strftime('%Y-%m', r.day)",
+        positive_sum="r.positive_sum" if postgres else "CAST(r.positive_sum AS REAL)",
+        negative_sum="r.negative_sum" if postgres else "CAST(r.negative_sum AS REAL)",
+        types=", ".join(placeholders),
+    )
+    rows = await conn.execute_query_dict(sql, list(INCOME_TYPES))
+
+    current_month = datetime.now().strftime("%Y-%m")
+    empty = {"income": Decimal("0"), "spent": Decimal("0"), "reports": 0}
+    stats = {
+        "all": {type_: dict(empty) for type_ in INCOME_TYPES},
+        "month": {type_: dict(empty) for type_ in INCOME_TYPES},
+    }
+    for row in rows:
+        periods = ["all", "month"] if _month_key(row["month"]) == current_month else ["all"]
+        for period in periods:
+            item = stats[period][row["type"]]
+            item["income"] += _money(row["income"])
+            item["spent"] += _money(row["spent"])
+            item["reports"] += int(row["reports"] or 0)
+    return stats
+
+
+def _autoteka_purchases():
+    # покупки отчётов: списания с баланса (amount < 0) и оплаты картой (amount > 0) -
+    # знак не важен, одна транзакция - один отчёт. Идут по индексу idx_transactions_type_user
+    return Transaction.filter(type__in=["autoteka", "autoteka2"])
+
+
+async def get_autoteka_totals() -> Dict[str, int]:
+    # {"buyers", "reports"} по тем же строкам, что и get_autoteka_buyers
+    row = await (
+        _autoteka_purchases()
+        .annotate(buyers=Count("user_id", distinct=True), reports=Count("id"))
+        .first()
+        .values("buyers", "reports")
+    )
+    return {"buyers": row["buyers"] if row else 0, "reports": row["reports"] if row else 0}
+
+
+async def get_autoteka_buyers(limit: int, offset: int):
+    # [{"user_id", "reports"}] по убыванию числа купленных отчётов
+    return await (
+        _autoteka_purchases()
+        .annotate(reports=Count("id"))
+        .group_by("user_id")
+        .order_by("-reports", "user_id")
+        .limit(limit)
+        .offset(offset)
+        .values("user_id", "reports")
+    )
@@ -1,8 +1,14 @@
+import time
+from collections import OrderedDict
 from datetime import datetime
 from decimal import Decimal
-from typing import Iterable, Optional, Dict, Any, List
-from uuid import uuid4
+from typing import Iterable, Optional, Dict, Any, List, Tuple
 
+from tortoise.transactions import in_transaction
+
+from app.services.invalidation import notify, on_invalidate
+
+from .crud_transaction import add_transaction
 from .models import (
     User,
     Referral, Transaction
@@ -29,35 +35,100 @@ async def get_or_create_user(
     if fullname and user.fullname != fullname:
         user.fullname = fullname
         changed = True
+    if user.bot_blocked:
+        # пользователь вернулся в бота - снова получает рассылки
+        user.bot_blocked = False
+        changed = True
 
     if changed:
         await user.save()
     if created:
         is_new = True
+        # до регистрации в кэше мог лежать промах
+        invalidate_user_access(user_id)
 
     return user, is_new
 
 
+# Кэш статуса и роли пользователя для StatusCheckMiddleware: проверка бана идёт
+# на каждое обновление. Смена роли или бана сбрасывает запись через
+# invalidate_user_access, TTL страхует от изменений в обход него.
+# Неизвестных пользователей тоже запоминаем (None), но ненадолго.
+USER_ACCESS_TTL = 300
+USER_ACCESS_MISS_TTL = 30
+USER_ACCESS_CACHE_SIZE = 50000
+
+_user_access_cache: "OrderedDict[int, Tuple[float, Optional[Tuple[str, str]]]]" = OrderedDict()
+
+
+def invalidate_user_access(user_id: int):
+    _user_access_cache.pop(user_id, None)
+
+
+async def user_access_changed(user_id: int):
+    # после смены роли или статуса: сброс у себя и в остальных процессах
+    invalidate_user_access(user_id)
+    await notify("user_access", user_id=user_id)
+
+
+async def _on_user_access_changed(payload):
+    if "user_id" in payload:
+        invalidate_user_access(payload["user_id"])
+    else:
+        _user_access_cache.clear()
+
+
+on_invalidate("user_access", _on_user_access_changed)
+
+
+async def get_user_access(user_id: int) -> Optional[Tuple[str, str]]:
+    # (status, role) или None, если пользователя нет
+    now = time.monotonic()
+    entry = _user_access_cache.get(user_id)
+    if entry and entry[0] > now:
+        _user_access_cache.move_to_end(user_id)
+        return entry[1]
+
+    row = await User.filter(id=user_id).values_list("status", "role")
+    access = tuple(row[0]) if row else None
+
+    ttl = USER_ACCESS_TTL if access else USER_ACCESS_MISS_TTL
+    _user_access_cache[user_id] = (now + ttl, access)
+    _user_access_cache.move_to_end(user_id)
+    while len(_user_access_cache) > USER_ACCESS_CACHE_SIZE:
+        _user_access_cache.popitem(last=False)
+
+    return access
+
+
 async def get_user(user_id: int):
     return await User.get_or_none(id=user_id)
 
 
-async def topup_user_balance(user_id: int, amount: float):
-    user = await User.get(id=user_id)
+async def topup_user_balance(user_id: int, amount: float, type: Optional[str] = None):
+    # type - записать движение в транзакции (покупки с баланса); пополнение
+    # после оплаты уже записано create_transaction
     amount_decimal = Decimal(str(amount))
-
-    user.balance += amount_decimal
-    await user.save()
+    async with in_transaction() as conn:
+        user = await User.get(id=user_id).using_db(conn)
+        user.balance += amount_decimal
+        await user.save(using_db=conn, update_fields=["balance"])
+        if type:
+            await add_transaction(user, amount_decimal, type, conn)
 
     return user
 
 
-async def down_user_balance(user_id: int, amount: float):
-    user = await User.get(id=user_id)
+async def down_user_balance(user_id: int, amount: float, type: Optional[str] = None):
+    # type - записать движение в транзакции (покупки с баланса); пополнение
+    # после оплаты уже записано create_transaction
     amount_decimal = Decimal(str(amount))
-
-    user.balance -= amount_decimal
-    await user.save()
+    async with in_transaction() as conn:
+        user = await User.get(id=user_id).using_db(conn)
+        user.balance -= amount_decimal
+        await user.save(using_db=conn, update_fields=["balance"])
+        if type:
+            await add_transaction(user, -amount_decimal, type, conn)
 
     return user
 
@@ -116,15 +187,10 @@ async def award_referral_bonus(referred_user_id: int, payment_amount: float):
         bonus_amount = payment_amount * float(referrer.ref_percent) / 100
 
 
-        referrer.balance += Decimal(str(bonus_amount))
-        await referrer.save()
-
-        await Transaction.create(
-            user=referrer,
-            payment_id=uuid4(),
-            amount=bonus_amount,
-            payment_type="referral_bonus"
-        )
+        async with in_transaction() as conn:
+            referrer.balance += Decimal(str(bonus_amount))
+            await referrer.save(using_db=conn, update_fields=["balance"])
+            await add_transaction(referrer, Decimal(str(bonus_amount)), "referral_bonus", conn)
 
         return {
             "referrer_id": referrer.id,
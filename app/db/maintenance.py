@@ -0,0 +1,143 @@
+"""
+Служебные команды для базы данных.
+
+    python -m app.db.maintenance init-schema
+    python -m app.db.maintenance backfill-car-keys
+    python -m app.db.maintenance backfill-city-ids
+    python -m app.db.maintenance rebuild-daily-revenue
+
+Ключи марки и города при деплое заполняют миграции 3 и 8 (fill_car_keys,
+fill_city_ids) - один раз. Команды backfill-* - для ручного повтора, например
+после пополнения справочника городов или марок.
+"""
+import argparse
+import asyncio
+from typing import Optional, Tuple
+
+from tortoise import BaseDBAsyncClient, Tortoise
+
+from app.config import TORTOISE_ORM
+from app.db.crud_transaction import rebuild_daily_revenue as _rebuild_daily_revenue
+from app.db.models import Advert, SearchFilter
+from app.services.cars_data import car_name_keys
+from app.services.cities import normalize_city
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+async def _table_exists(table: str) -> bool:
+    conn = Tortoise.get_connection("default")
+    try:
+        await conn.execute_query(f'SELECT 1 FROM "{table}" LIMIT 1')
+    except Exception:
+        return False
+    return True
+
+
+async def init_schema():
+    # Пустая база: создаём таблицы по моделям, дальше её ведут миграции aerich.
+    # На существующей базе ничего не делаем - новые колонки добавят миграции.
+    if await _table_exists("adverts"):
+        print("Схема уже существует, пропускаем")
+        return
+
+    await Tortoise.generate_schemas()
+    print("Схема создана")
+
+
+async def fill_car_keys(using_db: Optional[BaseDBAsyncClient] = None) -> int:
+    # объявления, созданные до появления brand_key/model_key; идём по id пачками
+    last_id = 0
+    updated = 0
+    while True:
+        adverts = await Advert.filter(id__gt=last_id, brand_key__isnull=True).order_by("id").limit(
+            BACKFILL_BATCH_SIZE
+        ).only("id", "name", "brand_key", "model_key").using_db(using_db)
+        if not adverts:
+            break
+
+        changed = []
+        for advert in adverts:
+            advert.brand_key, advert.model_key = car_name_keys(advert.name)
+            if advert.brand_key:
+                changed.append(advert)
+
+        if changed:
+            await Advert.bulk_update(changed, fields=["brand_key", "model_key"], using_db=using_db)
+        updated += len(changed)
+        last_id = adverts[-1].id
+
+    return updated
+
+
+async def backfill_car_keys():
+    print(f"Заполнено ключей марки и модели: {await fill_car_keys()}")
+
+
+async def _fill_city_ids(model, using_db: Optional[BaseDBAsyncClient]) -> int:
+    # город приводим к названию из справочника, id проставляем; неизвестные города не трогаем
+    last_id = 0
+    updated = 0
+    while True:
+        rows = await model.filter(id__gt=last_id, city_id__isnull=True, city__isnull=False).order_by("id").limit(
+            BACKFILL_BATCH_SIZE
+        ).only("id", "city", "city_id").using_db(using_db)
+        if not rows:
+            break
+
+        changed = []
+        for row in rows:
+            city_id, city = normalize_city(row.city)
+            if city_id:
+                row.city_id, row.city = city_id, city
+                changed.append(row)
+
+        if changed:
+            await model.bulk_update(changed, fields=["city", "city_id"], using_db=using_db)
+        updated += len(changed)
+        last_id = rows[-1].id
+
+    return updated
+
+
+async def fill_city_ids(using_db: Optional[BaseDBAsyncClient] = None) -> Tuple[int, int]:
+    # (объявлений, фильтров)
+    return await _fill_city_ids(Advert, using_db), await _fill_city_ids(SearchFilter, using_db)
+
+
+async def backfill_city_ids():
+    adverts, filters = await fill_city_ids()
+    print(f"Заполнено id городов: объявлений {adverts}, фильтров {filters}")
+
+
+async def rebuild_daily_revenue():
+    # сводка ведётся при каждой транзакции; пересчёт - после ручных правок transactions
+    rows = await _rebuild_daily_revenue()
+    print(f"Сводка daily_revenue пересчитана: строк {rows}")
+
+
+COMMANDS = {
+    "init-schema": init_schema,
+    "backfill-car-keys": backfill_car_keys,
+    "backfill-city-ids": backfill_city_ids,
+    "rebuild-daily-revenue": rebuild_daily_revenue,
+}
+
+
+async def run(command: str):
+    await Tortoise.init(config=TORTOISE_ORM)
+    try:
+        await COMMANDS[command]()
+    finally:
+        await Tortoise.close_connections()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Служебные команды для базы данных")
+    parser.add_argument("command", choices=sorted(COMMANDS))
+    args = parser.parse_args()
+    asyncio.run(run(args.command))
+
+
+if __name__ == "__main__":
+    main()
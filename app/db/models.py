@@ -1,4 +1,7 @@
+import random
+
 from tortoise import Model, fields
+from tortoise.indexes import Index, PartialIndex
 
 
 class User(Model):
@@ -17,11 +20,17 @@ class User(Model):
         max_length=16,
         default="active",  # active / banned / shadow_ban
     )
+    # Telegram ответил Forbidden при рассылке; сбрасывается на /start
+    bot_blocked = fields.BooleanField(default=False)
 
     created_at = fields.DatetimeField(auto_now_add=True)
 
     class Meta:
         table = "users"
+        indexes = (
+            # постраничный список пользователей в админке
+            Index(fields=("created_at", "id"), name="idx_users_created_id"),
+        )
 
 
 class UserCoupon(Model):
@@ -62,11 +71,16 @@ class Advert(Model):
     )
 
     name = fields.CharField(max_length=255)  # марка + модель
+    # нормализованные марка и модель для точного поиска, см. cars_data.car_name_keys
+    brand_key = fields.CharField(max_length=64, null=True)
+    model_key = fields.CharField(max_length=128, null=True)
     year = fields.IntField()
     mileage = fields.IntField()  # км
     condition = fields.CharField(max_length=32)  # Отличное / Хорошее / Требует ремонта
     fuel_type = fields.CharField(max_length=16)  # Бензин / Дизель / Газ
     engine_volume = fields.CharField(max_length=16)  # "1.6", "2.0"
+    # объём в литрах для фильтра "не больше", разбирается из engine_volume
+    engine_volume_liters = fields.DecimalField(max_digits=4, decimal_places=1, null=True)
     transmission = fields.CharField(max_length=16)  # Механика / Автомат / ...
     body_type = fields.CharField(max_length=32)  # Седан / SUV / ...
     color = fields.CharField(max_length=32)
@@ -76,6 +90,8 @@ class Advert(Model):
 
     contacts = fields.CharField(max_length=255)
     city = fields.CharField(max_length=128)
+    # id из справочника services/cities.py, None - города нет в справочнике
+    city_id = fields.IntField(null=True)
 
     description = fields.TextField()
     price = fields.DecimalField(max_digits=18, decimal_places=2)
@@ -87,11 +103,50 @@ class Advert(Model):
 
     autoteka_purchased = fields.BooleanField(default=False)
 
+    # случайный ключ для выборки случайного объявления по индексу
+    random_key = fields.FloatField(default=random.random)
+
     created_at = fields.DatetimeField(auto_now_add=True)
     updated_at = fields.DatetimeField(auto_now=True)
 
     class Meta:
         table = "adverts"
+        indexes = (
+            PartialIndex(fields=("random_key",), condition={"status": "active"}, name="idx_adverts_active_random"),
+            # фильтры ленты по активным объявлениям; для городов вне справочника
+            # есть ещё индекс по UPPER(city) в миграции, как сравнивает city__iexact
+            PartialIndex(
+                fields=("city_id", "random_key"), condition={"status": "active"}, name="idx_adverts_active_city_id"
+            ),
+            PartialIndex(fields=("year",), condition={"status": "active"}, name="idx_adverts_active_year"),
+            # (поле, id) - ещё и под постраничные списки по цене, пробегу и дате
+            PartialIndex(fields=("price", "id"), condition={"status": "active"}, name="idx_adverts_active_price_id"),
+            PartialIndex(
+                fields=("mileage", "id"), condition={"status": "active"}, name="idx_adverts_active_mileage_id"
+            ),
+            PartialIndex(
+                fields=("created_at", "id"), condition={"status": "active"}, name="idx_adverts_active_created_id"
+            ),
+            PartialIndex(
+                fields=("engine_volume_liters",),
+                condition={"status": "active"},
+                name="idx_adverts_active_engine_volume",
+            ),
+            PartialIndex(
+                fields=("fuel_type", "transmission", "body_type"),
+                condition={"status": "active"},
+                name="idx_adverts_active_specs",
+            ),
+            PartialIndex(
+                fields=("brand_key", "model_key", "random_key"),
+                condition={"status": "active"},
+                name="idx_adverts_active_brand_model",
+            ),
+            # сегмент рассылки "город": авторы объявлений в городе, в любом статусе
+            Index(fields=("city_id", "owner_id"), name="idx_adverts_city_owner"),
+            # списки модерации и админки
+            Index(fields=("status", "created_at"), name="idx_adverts_status_created"),
+        )
 
 
 class AdvertPhoto(Model):
@@ -136,6 +191,7 @@ class SearchFilter(Model):
     )
 
     city = fields.CharField(max_length=128, null=True)
+    city_id = fields.IntField(null=True, db_index=True)
     name = fields.CharField(max_length=255, null=True)
     year = fields.IntField(null=True)
     condition = fields.CharField(max_length=32, null=True)
@@ -156,13 +212,20 @@ class SearchFilter(Model):
     body_type = fields.CharField(max_length=32, null=True)
     color = fields.CharField(max_length=32, null=True)
 
+    # is_default - текущий фильтр ленты (один на пользователя),
+    # остальные строки - сохранённые поиски
     is_default = fields.BooleanField(default=False)
+    title = fields.CharField(max_length=128, null=True)
+    alerts_enabled = fields.BooleanField(default=False)
 
     created_at = fields.DatetimeField(auto_now_add=True)
     updated_at = fields.DatetimeField(auto_now=True)
 
     class Meta:
         table = "search_filters"
+        indexes = (
+            Index(fields=("user_id", "is_default"), name="idx_search_filters_user_default"),
+        )
 
 
 class AutotekaReport(Model):
@@ -196,6 +259,9 @@ class UserSubscription(Model):
 
     class Meta:
         table = "user_subscriptions"
+        indexes = (
+            Index(fields=("user_id", "expires_at"), name="idx_user_subscriptions_user_expires"),
+        )
 
 
 class Coupon(Model):
@@ -230,12 +296,37 @@ class Transaction(Model):
 
     type = fields.CharField(
         max_length=32,
-        default="other",  # autoteka / autoteka2 / topup / advert_publish / subscription / referral_bonus
+        default="other",  # autoteka / autoteka2 / topup / advert / subscription / referral_bonus
     )
     created_at = fields.DatetimeField(auto_now_add=True)
 
     class Meta:
         table = "transactions"
+        indexes = (
+            # рейтинг покупателей автотеки в админке
+            Index(fields=("type", "user_id"), name="idx_transactions_type_user"),
+            # история транзакций пользователя в админке
+            Index(fields=("user_id", "created_at"), name="idx_transactions_user_created"),
+        )
+
+
+class DailyRevenue(Model):
+    # транзакции, сведённые по дням и типам, для статистики в админке.
+    # Ведётся вместе с транзакциями (crud_transaction.create_transaction),
+    # пересобирается python -m app.db.maintenance rebuild-daily-revenue
+    id = fields.IntField(pk=True)
+    day = fields.DateField()
+    type = fields.CharField(max_length=32)
+    count = fields.IntField(default=0)
+    total = fields.DecimalField(max_digits=18, decimal_places=2, default=0)
+    positive_sum = fields.DecimalField(max_digits=18, decimal_places=2, default=0)
+    # списания: сумма по модулю и количество
+    negative_sum = fields.DecimalField(max_digits=18, decimal_places=2, default=0)
+    negative_count = fields.IntField(default=0)
+
+    class Meta:
+        table = "daily_revenue"
+        unique_together = (("day", "type"),)
 
 
 class Broadcast(Model):
@@ -253,13 +344,51 @@ class Broadcast(Model):
         null=True,
     )  # photo / document / None
     media_file_id = fields.CharField(max_length=255, null=True)
+    # условия отбора получателей, см. services/broadcast_segments.py; None - все
+    segment = fields.JSONField(null=True)
+
+    status = fields.CharField(
+        max_length=16,
+        default="pending",  # pending / running / done
+    )
+    # последний id пользователя, по которому результаты уже записаны
+    last_user_id = fields.BigIntField(default=0)
+    total = fields.IntField(default=0)
+    sent = fields.IntField(default=0)
+    blocked = fields.IntField(default=0)
+    failed = fields.IntField(default=0)
+    # процесс, который ведёт рассылку, продлевает аренду на каждой контрольной точке
+    locked_until = fields.DatetimeField(null=True)
+    # сообщение админа с прогрессом
+    progress_chat_id = fields.BigIntField(null=True)
+    progress_message_id = fields.IntField(null=True)
 
     created_at = fields.DatetimeField(auto_now_add=True)
+    finished_at = fields.DatetimeField(null=True)
 
     class Meta:
         table = "broadcasts"
 
 
+class BroadcastDelivery(Model):
+    id = fields.BigIntField(pk=True)
+    broadcast = fields.ForeignKeyField(
+        "models.Broadcast",
+        related_name="deliveries",
+        on_delete=fields.CASCADE,
+    )
+    user_id = fields.BigIntField()
+    status = fields.CharField(
+        max_length=16,
+    )  # sent / blocked / failed / retry
+    error = fields.CharField(max_length=255, null=True)
+    updated_at = fields.DatetimeField(auto_now=True)
+
+    class Meta:
+        table = "broadcast_deliveries"
+        unique_together = (("broadcast", "user_id"),)
+
+
 class AutotekaBalance(Model):
     id = fields.IntField(pk=True)
     remaining_reports = fields.IntField(default=0)
@@ -276,4 +405,14 @@ class Settings(Model):
     subscription_price = fields.DecimalField(max_digits=18, decimal_places=2, default=250)
 
     class Meta:
-        table = "settings"
\ No newline at end of file
+        table = "settings"
+
+class FsmRecord(Model):
+    # состояние и данные FSM aiogram, см. services/fsm_storage.py
+    key = fields.CharField(max_length=255, pk=True)
+    state = fields.CharField(max_length=255, null=True)
+    data = fields.JSONField(default=dict)
+    updated_at = fields.DatetimeField(auto_now=True)
+
+    class Meta:
+        table = "fsm_storage"
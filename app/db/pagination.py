@@ -0,0 +1,104 @@
+"""
+Постраничные списки админки без загрузки всей таблицы.
+
+paginate(key, query, page, fields) выбирает из базы только строки страницы:
+.values() с нужными полями, LIMIT по размеру страницы. Кнопки "вперёд/назад"
+по-прежнему передают номер страницы, а ключи сортировки последней строки
+каждой показанной страницы запоминаются - соседняя страница читается keyset
+запросом (WHERE (created_at, id) < (...)) вместо OFFSET. На страницу, до
+которой ещё не доходили, идём через OFFSET.
+
+COUNT для "Страница N/M" считается при открытии списка (страница 0) и
+кэшируется по key на PAGE_COUNT_TTL секунд вместе с границами страниц, так что
+листание не пересчитывает таблицу. Изменения сбрасывают кэш через
+invalidate_pages(prefix). Ключи строятся как "раздел:уточнение"
+("adverts:pending", "user_adverts:42").
+"""
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+from tortoise.expressions import Q
+from tortoise.queryset import QuerySet
+
+PAGE_SIZE = 5
+PAGE_COUNT_TTL = 60
+PAGE_CACHE_SIZE = 1000
+
+
+@dataclass
+class _CacheEntry:
+    expires: float
+    total: int
+    order: Sequence[str]
+    boundaries: Dict[int, tuple]
+
+
+_page_cache: Dict[str, _CacheEntry] = {}
+
+
+@dataclass
+class Page:
+    items: List[Dict[str, Any]]
+    total: int
+    current_page: int
+    total_pages: int
+
+    def get_page_info(self) -> str:
+        return f"Страница {self.current_page + 1}/{self.total_pages}"
+
+
+def invalidate_pages(prefix: str = ""):
+    for key in [key for key in _page_cache if key.startswith(prefix)]:
+        del _page_cache[key]
+
+
+def _keyset_filter(order: Sequence[str], boundary: tuple) -> Q:
+    # (a, b) после (x, y) в порядке сортировки: a за x ИЛИ (a = x И b за y)
+    conditions = []
+    for i, field in enumerate(order):
+        name = field.lstrip("-")
+        lookup = "lt" if field.startswith("-") else "gt"
+        equal = {order[j].lstrip("-"): boundary[j] for j in range(i)}
+        conditions.append(Q(**equal, **{f"{name}__{lookup}": boundary[i]}))
+    return Q(*conditions, join_type="OR")
+
+
+async def _entry(key: str, query: QuerySet, order: Sequence[str], fresh: bool) -> _CacheEntry:
+    now = time.monotonic()
+    entry = _page_cache.get(key)
+    if entry and not fresh and entry.expires > now and tuple(entry.order) == tuple(order):
+        return entry
+
+    if len(_page_cache) >= PAGE_CACHE_SIZE:
+        _page_cache.clear()
+    entry = _CacheEntry(now + PAGE_COUNT_TTL, await query.count(), order, {})
+    _page_cache[key] = entry
+    return entry
+
+
+async def paginate(key: str, query: QuerySet, page: int, fields: Sequence[str],
+                   order: Sequence[str] = ("-created_at", "-id"), page_size: int = PAGE_SIZE,
+                   _recount: bool = True) -> Page:
+    entry = await _entry(key, query, order, fresh=page <= 0)
+    total_pages = max(1, (entry.total + page_size - 1) // page_size)
+    page = max(0, min(page, total_pages - 1))
+
+    sort_fields = [field.lstrip("-") for field in order]
+    values = list(dict.fromkeys([*fields, *sort_fields]))
+    boundary: Optional[tuple] = entry.boundaries.get(page - 1) if page else None
+
+    if boundary is not None:
+        page_query = query.filter(_keyset_filter(order, boundary))
+    else:
+        page_query = query.offset(page * page_size)
+    items = await page_query.order_by(*order).limit(page_size).values(*values)
+
+    if not items and page and _recount:
+        # строки удалили, а COUNT в кэше старый - пересчитываем один раз
+        _page_cache.pop(key, None)
+        return await paginate(key, query, page, fields, order, page_size, _recount=False)
+
+    if items:
+        entry.boundaries[page] = tuple(items[-1][field] for field in sort_fields)
+    return Page(items, entry.total, page, total_pages)
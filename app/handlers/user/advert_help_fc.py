@@ -5,7 +5,7 @@ from aiogram.types import InputMediaPhoto, Message
 from aiogram.types import CallbackQuery
 from aiogram.fsm.context import FSMContext
 
-from app.db.crud_advert import create_advert_from_state
+from app.db.crud_advert import create_advert_from_state, get_advert_card
 from app.db.crud_autoteka import save_autoteka_report
 from app.db.crud_transaction import check_active_subscription
 from app.other import _format_price
@@ -187,9 +187,8 @@ async def notify_moderators_about_new_advert(bot, advert_id: int):
 
     moderator = random.choice(moderators)
 
-    advert = await Advert.get(id=advert_id).prefetch_related('owner')
-    photos = await AdvertPhoto.filter(advert=advert).order_by("position").all()
-    photo_ids = [photo.file_id for photo in photos]
+    advert = await get_advert_card(advert_id)
+    photo_ids = advert.photo_ids
 
     text = f"📝 <b>Модерация объявления #{advert.id}</b>\n\n"
     text += f"🚗 <b>{advert.name}</b>\n"
@@ -206,7 +205,7 @@ async def notify_moderators_about_new_advert(bot, advert_id: int):
     text += f"🚘 Гос номер: {advert.license_plate}\n"
     text += f"🌍 Город: {advert.city}\n"
     text += f"📞 Контакты: {advert.contacts}\n"
-    text += f"👤 Владелец: {advert.owner.fullname or 'Не указано'} (ID: {advert.owner.id})\n"
+    text += f"👤 Владелец: {advert.owner_fullname or 'Не указано'} (ID: {advert.owner_id})\n"
     text += f"📅 Дата подачи: {advert.created_at.strftime('%d.%m.%Y %H:%M')}\n\n"
     text += f"📝 <b>Описание:</b>\n{advert.description}\n"
 
@@ -21,6 +21,7 @@ from app.db.crud_user import get_user, topup_user_balance, down_user_balance
 from app.other import _format_price
 from app.services.cars_data import parse_car_input, get_models_for_brand_cached,  \
     validate_car_name
+from app.services.cities import normalize_city
 from rapidfuzz import fuzz, process
 
 from app.db.crud_advert import save_or_update_user_filter
@@ -51,7 +52,8 @@ async def restart_advert(callback: CallbackQuery, state: FSMContext):
 
 @router.message(AdvertStates.waiting_city, F.text)
 async def process_city(message: Message, state: FSMContext):
-    await state.update_data(city=message.text)
+    city_id, city = normalize_city(message.text)
+    await state.update_data(city=city or message.text.strip(), city_id=city_id)
     await proceed_to_next_step(
         message,
         state,
@@ -369,7 +371,7 @@ async def process_autoteka_decision(callback: CallbackQuery, state: FSMContext):
     user_balance = user.balance
     if callback.data == "autoteka_yes":
         if user_balance >= settings.autoteka_price:
-            await down_user_balance(callback.from_user.id, settings.autoteka_price)
+            await down_user_balance(callback.from_user.id, settings.autoteka_price, type="autoteka2")
             await handle_autoteka_from_creating(callback, state)
             return
         else:
@@ -558,7 +560,7 @@ async def ad_publish(callback: CallbackQuery, state: FSMContext):
         return
 
     settings = await get_settings()
-    await down_user_balance(callback.from_user.id, settings.advert_publish_price)
+    await down_user_balance(callback.from_user.id, settings.advert_publish_price, type="advert")
 
     await publish_ad(callback, state)
 
@@ -1,7 +1,7 @@
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
-from app.db.crud_advert import get_user_favorites, get_advert_by_id ,remove_from_favorites
+from app.db.crud_advert import get_user_favorites, get_advert_by_id, get_advert_card, remove_from_favorites
 
 from app.keyboards.builders import liked_car_kb, main_menu_kb
 from app.keyboards.helpers import quick_inline
@@ -30,7 +30,7 @@ async def show_favorite_advert(
         advert_index = 0
 
     favorite = favorites[advert_index]
-    advert = await get_advert_by_id(favorite.advert_id)
+    advert = await get_advert_card(favorite.advert_id)
 
     if not advert:
         await favorite.delete()
@@ -54,8 +54,6 @@ async def _show_favorite_advert_detail(
         total_count: int
 ):
 
-    photos = await advert.photos.all().order_by("position")
-
     autoteka_text = "✅ Есть отчёт Автотеки" if advert.autoteka_purchased else "❌ Нет отчёта"
 
     text = (
@@ -77,9 +75,9 @@ async def _show_favorite_advert_detail(
         f"📝 Описание:\n{advert.description}"
     ).replace(",", " ")
 
-    if photos:
+    if advert.photo_ids:
         await message.answer_photo(
-            photos[0].file_id,
+            advert.photo_ids[0],
             caption=text,
             reply_markup=liked_car_kb(advert.id, current_index, total_count),
         )
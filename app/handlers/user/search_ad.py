@@ -11,15 +11,27 @@ from app.keyboards.builders import (
     color_kb,
     _filters_menu_kb,
     main_menu_kb,
-    back_from_filter_kb, get_filter_suggestions_inline_kb
+    back_from_filter_kb, get_filter_suggestions_inline_kb,
+    advert_list_sort_kb
 )
 from app.keyboards.helpers import quick_reply
 from app.db.crud_advert import (
     add_favorite_advert,
-    save_or_update_user_filter, delete_user_filter
+    save_or_update_user_filter, delete_user_filter,
+    MAX_SAVED_SEARCHES, save_current_search, apply_saved_search,
+    toggle_saved_search_alerts, delete_saved_search, get_user_filter
+)
+from .search_help_fc import (
+    _format_filters_text,
+    _show_random_advert,
+    _show_full_advert,
+    _start_advert_list,
+    _show_advert_list,
+    _saved_search_title,
+    _show_saved_searches,
 )
-from .search_help_fc import _format_filters_text, _show_random_advert, _show_full_advert
 from app.services.cars_data import validate_car_name
+from app.services.cities import normalize_city
 
 router = Router(name=__name__)
 
@@ -54,13 +66,14 @@ async def filters_city_start(message: Message, state: FSMContext):
 
 @router.message(SearchAdStates.waiting_filter_city, F.text != "⬅️ Назад к поиску")
 async def filters_city_set(message: Message, state: FSMContext):
-    city = message.text
+    city_id, city = normalize_city(message.text)
+    city = city or message.text.strip()
     await save_or_update_user_filter(
         user_id=message.from_user.id,
-        update_fields={"city": city}
+        update_fields={"city": city, "city_id": city_id}
     )
 
-    await message.answer("Город обновлён.\n\n", reply_markup=search_filters_kb())
+    await message.answer(f"Город обновлён: {city}.\n\n", reply_markup=search_filters_kb())
     await _show_random_advert(message, state, message.from_user.id)
     await state.set_state(None)
 
@@ -478,6 +491,125 @@ async def filters_reset(message: Message, state: FSMContext):
         await message.answer("Фильтров и так не было.\n\n" + text, reply_markup=_filters_menu_kb())
 
 
+@router.message(F.text == "🔎 Поиск по словам")
+async def words_search_start(message: Message, state: FSMContext):
+    await message.answer(
+        "Введите слова для поиска, например: один владелец не бит",
+        reply_markup=back_from_filter_kb()
+    )
+    await state.set_state(SearchAdStates.waiting_words_query)
+
+
+@router.message(SearchAdStates.waiting_words_query, F.text)
+async def words_search_set(message: Message, state: FSMContext):
+    query = message.text.strip()
+    if len(query) < 2:
+        await message.answer("❌ Слишком короткий запрос")
+        return
+
+    await state.set_state(None)
+    await message.answer("Результаты с учётом текущих фильтров:", reply_markup=_filters_menu_kb())
+    await _start_advert_list(message, state, message.from_user.id, kind="words", query=query)
+
+
+@router.message(F.text == "📂 Мои поиски")
+async def saved_searches_menu(message: Message, state: FSMContext):
+    await _show_saved_searches(message, message.from_user.id)
+
+
+@router.callback_query(F.data == "saved_add")
+async def saved_search_add(callback: CallbackQuery):
+    user_id = callback.from_user.id
+    filter_data = await get_user_filter(user_id)
+    if not filter_data:
+        await callback.answer("Сначала задайте фильтры", show_alert=True)
+        return
+
+    saved = await save_current_search(user_id, _saved_search_title(filter_data))
+    if not saved:
+        await callback.answer(f"Можно сохранить не больше {MAX_SAVED_SEARCHES} поисков", show_alert=True)
+        return
+
+    await _show_saved_searches(callback.message, user_id, edit=True)
+    await callback.answer("Поиск сохранён, оповещения включены")
+
+
+@router.callback_query(F.data.startswith("saved_apply_"))
+async def saved_search_apply(callback: CallbackQuery, state: FSMContext):
+    search_id = int(callback.data.replace("saved_apply_", ""))
+    if not await apply_saved_search(callback.from_user.id, search_id):
+        await callback.answer("Поиск не найден", show_alert=True)
+        return
+
+    await callback.answer("Фильтры применены")
+    text = await _format_filters_text(callback.from_user.id)
+    await callback.message.answer(text, reply_markup=_filters_menu_kb())
+
+
+@router.callback_query(F.data.startswith("saved_alerts_"))
+async def saved_search_toggle_alerts(callback: CallbackQuery):
+    search_id = int(callback.data.replace("saved_alerts_", ""))
+    enabled = await toggle_saved_search_alerts(callback.from_user.id, search_id)
+    if enabled is None:
+        await callback.answer("Поиск не найден", show_alert=True)
+        return
+
+    await _show_saved_searches(callback.message, callback.from_user.id, edit=True)
+    await callback.answer("Оповещения включены" if enabled else "Оповещения выключены")
+
+
+@router.callback_query(F.data.startswith("saved_delete_"))
+async def saved_search_delete(callback: CallbackQuery):
+    search_id = int(callback.data.replace("saved_delete_", ""))
+    await delete_saved_search(callback.from_user.id, search_id)
+    await _show_saved_searches(callback.message, callback.from_user.id, edit=True)
+    await callback.answer("Поиск удалён")
+
+
+@router.message(F.text == "📋 Списком")
+async def sorted_list_start(message: Message, state: FSMContext):
+    await message.answer("Как отсортировать объявления?", reply_markup=advert_list_sort_kb())
+
+
+@router.callback_query(F.data.in_({"list_sort_cheap", "list_sort_new", "list_sort_mileage"}))
+async def sorted_list_show(callback: CallbackQuery, state: FSMContext):
+    sort = callback.data.replace("list_sort_", "")
+    await _start_advert_list(callback.message, state, callback.from_user.id, kind="sorted", sort=sort)
+    await callback.answer()
+
+
+@router.callback_query(F.data == "list_next")
+async def advert_list_next(callback: CallbackQuery, state: FSMContext):
+    data = await state.get_data()
+    advert_list = data.get("advert_list")
+    if advert_list and advert_list.get("next_cursor"):
+        advert_list["cursors"].append(advert_list["next_cursor"])
+        await state.update_data(advert_list=advert_list)
+
+    await _show_advert_list(callback.message, state, callback.from_user.id, edit=True)
+    await callback.answer()
+
+
+@router.callback_query(F.data == "list_prev")
+async def advert_list_prev(callback: CallbackQuery, state: FSMContext):
+    data = await state.get_data()
+    advert_list = data.get("advert_list")
+    if advert_list and len(advert_list["cursors"]) > 1:
+        advert_list["cursors"].pop()
+        await state.update_data(advert_list=advert_list)
+
+    await _show_advert_list(callback.message, state, callback.from_user.id, edit=True)
+    await callback.answer()
+
+
+@router.callback_query(F.data.startswith("list_open_"))
+async def advert_list_open(callback: CallbackQuery, state: FSMContext):
+    advert_id = int(callback.data.replace("list_open_", ""))
+    await state.update_data(current_advert_id=advert_id)
+    await _show_full_advert(callback.message, advert_id)
+    await callback.answer()
+
+
 @router.message(F.text == "⬅️ Назад к поиску")
 async def filters_back_to_search(message: Message, state: FSMContext):
     await state.set_state(None)
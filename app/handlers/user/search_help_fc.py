@@ -1,17 +1,27 @@
+import asyncio
+from typing import Dict, Optional, Tuple
+
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
 from app.keyboards.builders import (
+    advert_list_kb,
+    saved_searches_kb,
     search_filters_kb,
     now_liked_car_kb,
     _filters_menu_kb
 )
 from app.db.crud_advert import (
-    get_random_advert_with_filters,
-    get_advert_by_id,
+    filters_signature,
+    get_advert_card,
+    get_advert_summaries,
+    get_saved_searches,
+    get_sorted_advert_page,
     get_user_filter,
+    search_adverts_by_words,
 )
 from app.other import _format_price
+from app.services.feed_deck import next_advert_id
 
 router = Router(name=__name__)
 
@@ -24,12 +34,85 @@ async def _get_filters_from_db(user_id: int) -> dict:
     return filter_data
 
 
+# Следующая карточка ленты: её id достаётся из колоды в обработчике, сразу
+# после показа текущей, и лежит в данных FSM (feed_next) вместе с подписью
+# фильтров. В фоне грузятся только данные этой карточки - в колоду и FSM фон
+# не пишет. Загрузка живёт в памяти процесса; если её нет, карточка читается
+# при показе.
+# user_id -> (id объявления, задача загрузки карточки)
+_prefetched: Dict[int, Tuple[int, asyncio.Task]] = {}
+
+
+async def _load_card(advert_id: int) -> Optional[dict]:
+    # объявление могли снять с публикации после сборки колоды
+    advert = await get_advert_card(advert_id, status="active")
+    if not advert:
+        return None
+
+    caption = (
+        f"🚗 {advert.name}\n"
+        f"📍 Город: {advert.city}\n"
+        f"📏 Пробег: {advert.mileage:,} км\n"
+        f"💰 Цена: {int(advert.price):,} ₽".replace(",", " ")
+    )
+    return {
+        "advert_id": advert.id,
+        "caption": caption,
+        "photo": advert.photo_ids[0] if advert.photo_ids else None,
+    }
+
+
+async def _next_card(state: FSMContext, user_id: int, filters: dict) -> Optional[dict]:
+    while True:
+        advert_id = await next_advert_id(state, user_id, filters)
+        if advert_id is None:
+            return None
+        card = await _load_card(advert_id)
+        if card:
+            return card
+
+
+def _start_prefetch(user_id: int, advert_id: int):
+    _drop_prefetched(user_id)
+    _prefetched[user_id] = (advert_id, asyncio.create_task(_load_card(advert_id)))
+
+
+def _drop_prefetched(user_id: int):
+    pending = _prefetched.pop(user_id, None)
+    if pending:
+        pending[1].cancel()
+
+
+async def _take_upcoming(state: FSMContext, user_id: int, signature: str) -> Optional[dict]:
+    data = await state.get_data()
+    upcoming = data.get("feed_next")
+    if not upcoming or upcoming.get("signature") != signature:
+        # фильтры поменялись - отложенная карточка не подходит, колода пересоберётся
+        _drop_prefetched(user_id)
+        return None
+
+    await state.update_data(feed_next=None)
+    pending = _prefetched.pop(user_id, None)
+    if pending and pending[0] == upcoming["advert_id"]:
+        try:
+            return await pending[1]
+        except Exception as e:
+            print(f"Ошибка подготовки карточки: {e}")
+    elif pending:
+        pending[1].cancel()
+    return await _load_card(upcoming["advert_id"])
+
+
 async def _show_random_advert(chat_obj, state: FSMContext, user_id: int):
 
     filters = await _get_filters_from_db(user_id)
+    signature = filters_signature(filters)
 
-    advert = await get_random_advert_with_filters(filters, exclude_ids=[])
-    if not advert:
+    card = await _take_upcoming(state, user_id, signature)
+    if not card:
+        card = await _next_card(state, user_id, filters)
+
+    if not card:
         text = "По текущим фильтрам объявлений не найдено.\n\nГлавное меню - /start"
         if hasattr(chat_obj, "message"):  # CallbackQuery
             await chat_obj.message.answer(text, reply_markup=_filters_menu_kb())
@@ -37,42 +120,39 @@ async def _show_random_advert(chat_obj, state: FSMContext, user_id: int):
             await chat_obj.answer(text, reply_markup=_filters_menu_kb())
         return
 
-    await state.update_data(current_advert_id=advert.id)
-
-    photos = await advert.photos.all()
-    caption = (
-        f"🚗 {advert.name}\n"
-        f"📍 Город: {advert.city}\n"
-        f"📏 Пробег: {advert.mileage:,} км\n"
-        f"💰 Цена: {int(advert.price):,} ₽".replace(",", " ")
-    )
+    await state.update_data(current_advert_id=card["advert_id"])
 
     if hasattr(chat_obj, "message"):  # CallbackQuery
         send_obj = chat_obj.message
     else:  # Message
         send_obj = chat_obj
 
-    if photos:
+    if card["photo"]:
         await send_obj.answer_photo(
-            photos[0].file_id,
-            caption=caption,
+            card["photo"],
+            caption=card["caption"],
             reply_markup=search_filters_kb(),
         )
     else:
         await send_obj.answer(
-            caption,
+            card["caption"],
             reply_markup=search_filters_kb(),
         )
 
+    # пока пользователь смотрит карточку, готовим следующую
+    next_id = await next_advert_id(state, user_id, filters)
+    if next_id is not None:
+        await state.update_data(feed_next={"signature": signature, "advert_id": next_id})
+        _start_prefetch(user_id, next_id)
+
 
 async def _show_full_advert(message: Message, advert_id: int):
-    advert = await get_advert_by_id(advert_id)
+    # кнопки оповещений и списков живут в чате дольше самого объявления
+    advert = await get_advert_card(advert_id, status="active")
     if not advert:
-        await message.answer("Это объявление больше недоступно.")
+        await message.answer("Это объявление снято с публикации.")
         return
 
-    photos = await advert.photos.all()
-
     autoteka_text = "Есть отчёт" if advert.autoteka_purchased else "Нет"
 
     text = (
@@ -94,9 +174,9 @@ async def _show_full_advert(message: Message, advert_id: int):
         f"📝 Описание:\n{advert.description}"
     ).replace(",", " ")
 
-    if photos:
+    if advert.photo_ids:
         await message.answer_photo(
-            photos[0].file_id,
+            advert.photo_ids[0],
             caption=text,
             reply_markup=now_liked_car_kb(),
         )
@@ -107,6 +187,81 @@ async def _show_full_advert(message: Message, advert_id: int):
         )
 
 
+LIST_PAGE_SIZE = 10
+
+
+async def _words_page(user_id: int, advert_list: dict, cursor) -> list:
+    filters = await _get_filters_from_db(user_id)
+    rows = await search_adverts_by_words(
+        advert_list["query"], filters, after=tuple(cursor) if cursor else None, limit=LIST_PAGE_SIZE + 1
+    )
+    # курсор следующей страницы - (rank, id) последней строки
+    return [(advert_id, [rank, advert_id]) for advert_id, rank in rows]
+
+
+async def _sorted_page(user_id: int, advert_list: dict, cursor) -> list:
+    filters = await _get_filters_from_db(user_id)
+    return await get_sorted_advert_page(
+        filters, advert_list["sort"], after=tuple(cursor) if cursor else None, limit=LIST_PAGE_SIZE + 1
+    )
+
+
+LIST_SORT_TITLES = {
+    "cheap": "💰 Сначала дешевле",
+    "new": "🆕 Сначала новые",
+    "mileage": "📏 Сначала с меньшим пробегом",
+}
+
+# вид списка -> (загрузка страницы [(id, курсор)], заголовок)
+_LIST_KINDS = {
+    "words": (_words_page, lambda advert_list: f"🔎 Поиск: «{advert_list['query']}»"),
+    "sorted": (_sorted_page, lambda advert_list: LIST_SORT_TITLES[advert_list["sort"]]),
+}
+
+
+async def _start_advert_list(message: Message, state: FSMContext, user_id: int, **params):
+    await state.update_data(advert_list=dict(params, cursors=[None], next_cursor=None))
+    await _show_advert_list(message, state, user_id)
+
+
+async def _show_advert_list(message: Message, state: FSMContext, user_id: int, edit: bool = False):
+    data = await state.get_data()
+    advert_list = data.get("advert_list")
+    if not advert_list:
+        await message.answer("Список устарел, откройте поиск заново.")
+        return
+
+    load_page, title = _LIST_KINDS[advert_list["kind"]]
+    rows = await load_page(user_id, advert_list, advert_list["cursors"][-1])
+    has_next = len(rows) > LIST_PAGE_SIZE
+    rows = rows[:LIST_PAGE_SIZE]
+
+    advert_list["next_cursor"] = rows[-1][1] if has_next else None
+    await state.update_data(advert_list=advert_list)
+
+    page = len(advert_list["cursors"])
+    text = f"{title(advert_list)}\nСтраница {page}\n\n"
+
+    summaries = await get_advert_summaries([advert_id for advert_id, _ in rows])
+    if not summaries:
+        text += "Ничего не найдено."
+    for number, advert in enumerate(summaries, start=1):
+        mileage = f"{advert['mileage']:,}".replace(",", " ")
+        text += (
+            f"{number}. 🚗 {advert['name']}, {advert['year']} — {_format_price(advert['price'])} ₽\n"
+            f"    📍 {advert['city']}, {mileage} км\n"
+        )
+
+    keyboard = advert_list_kb([advert["id"] for advert in summaries], page > 1, has_next)
+    if edit:
+        try:
+            await message.edit_text(text, reply_markup=keyboard)
+            return
+        except Exception:
+            pass
+    await message.answer(text, reply_markup=keyboard)
+
+
 async def _format_filters_text(user_id: int) -> str:
 
     filter_data = await get_user_filter(user_id)
@@ -192,3 +347,34 @@ async def _format_filters_text(user_id: int) -> str:
         f"🎨 Цвет: {color}\n\n"
         "Выберите, что изменить:"
     )
+
+
+def _saved_search_title(filter_data: dict) -> str:
+    parts = [
+        filter_data.get(field) for field in
+        ("city", "name", "year", "fuel_type", "transmission", "body_type", "color")
+    ]
+    if filter_data.get("price_to") is not None:
+        parts.append(f"до {_format_price(filter_data['price_to'])} ₽")
+    title = ", ".join(str(part) for part in parts if part)
+    return title[:128] or "Все объявления"
+
+
+async def _show_saved_searches(message: Message, user_id: int, edit: bool = False):
+    searches = await get_saved_searches(user_id)
+
+    text = "📂 Сохранённые поиски\n\n"
+    if not searches:
+        text += "Пока пусто. Сохраните текущие фильтры, чтобы получать новые объявления по ним.\n"
+    for number, search in enumerate(searches, start=1):
+        text += f"{number}. {'🔔' if search.alerts_enabled else '🔕'} {search.title}\n"
+    text += "\n▶️ - применить, 🔔/🔕 - оповещения о новых объявлениях, ❌ - удалить"
+
+    keyboard = saved_searches_kb(searches)
+    if edit:
+        try:
+            await message.edit_text(text, reply_markup=keyboard)
+            return
+        except Exception:
+            pass
+    await message.answer(text, reply_markup=keyboard)
@@ -51,7 +51,8 @@ def search_filters_kb():
         "❤️",
         "⚙️ Фильтры",
         "👎",
-        "🏠 Главное меню"
+        "🏠 Главное меню",
+        "📋 Списком"
     ], row_width=3, first_single=False)
 
 
@@ -231,6 +232,8 @@ def _filters_menu_kb():
             "🪛 КПП",
             "🚙 Кузов",
             "🎨 Цвет",
+            "🔎 Поиск по словам",
+            "📂 Мои поиски",
             "♻️ Сбросить фильтры",
             "⬅️ Назад к поиску",
         ],
@@ -238,6 +241,46 @@ def _filters_menu_kb():
         first_single=False,
     )
 
+def advert_list_kb(advert_ids: list, has_prev: bool, has_next: bool):
+    builder = InlineKeyboardBuilder()
+    for number, advert_id in enumerate(advert_ids, start=1):
+        builder.add(InlineKeyboardButton(text=str(number), callback_data=f"list_open_{advert_id}"))
+    builder.adjust(5)
+
+    nav_buttons = []
+    if has_prev:
+        nav_buttons.append(InlineKeyboardButton(text="⬅️", callback_data="list_prev"))
+    if has_next:
+        nav_buttons.append(InlineKeyboardButton(text="➡️", callback_data="list_next"))
+    if nav_buttons:
+        builder.row(*nav_buttons)
+
+    return builder.as_markup()
+
+
+def advert_list_sort_kb():
+    return quick_inline([
+        ("💰 Дешевле", "list_sort_cheap"),
+        ("🆕 Новее", "list_sort_new"),
+        ("📏 Меньше пробег", "list_sort_mileage"),
+    ], row_width=3, first_single=False)
+
+
+def saved_searches_kb(searches: list):
+    builder = InlineKeyboardBuilder()
+    for number, search in enumerate(searches, start=1):
+        builder.row(
+            InlineKeyboardButton(text=f"▶️ {number}", callback_data=f"saved_apply_{search.id}"),
+            InlineKeyboardButton(
+                text="🔔" if search.alerts_enabled else "🔕",
+                callback_data=f"saved_alerts_{search.id}"
+            ),
+            InlineKeyboardButton(text="❌", callback_data=f"saved_delete_{search.id}"),
+        )
+    builder.row(InlineKeyboardButton(text="💾 Сохранить текущий", callback_data="saved_add"))
+    return builder.as_markup()
+
+
 def back_from_filter_kb():
     return quick_reply([
         "⬅️ Отмена"
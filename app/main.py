@@ -3,14 +3,22 @@ import logging
 
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
+from aiogram.fsm.storage.memory import MemoryStorage
 
 from app.db import init_db
+from app.db.crud_admin import load_settings
+from app.services.advert_index import load_advert_index
+from app.services.broadcast import resume_broadcasts
+from app.services.fsm_storage import DbStorage
+from app.services.invalidation import start_invalidation_listener
+from app.supervisor import run_supervisor, run_worker
+from app.webhook import run_webhook
 from handlers import routers
 from admin_panel.handlers import admin_routers
 from handlers.error import register_error_handlers
 from middleware import StatusCheckMiddleware
 
-from config import BOT_TOKEN
+from config import BOT_MODE, BOT_TOKEN, FSM_STORAGE, WORKER_PROCESSES
 
 logging.basicConfig(
     level=logging.ERROR,
@@ -21,7 +29,7 @@ dispatcher_logger = logging.getLogger('aiogram.dispatcher')
 dispatcher_logger.setLevel(logging.INFO)
 
 bot = Bot(token=BOT_TOKEN, default=DefaultBotProperties(parse_mode="HTML"))
-dp = Dispatcher()
+dp = Dispatcher(storage=DbStorage() if FSM_STORAGE == "db" else MemoryStorage())
 
 dp.update.middleware(StatusCheckMiddleware())
 
@@ -33,8 +41,36 @@ for router in admin_routers:
 
 register_error_handlers(dp)
 
+async def start_worker(socket_path: str):
+    await init_db()
+    await load_settings()
+    await start_invalidation_listener()
+    await load_advert_index()
+    resume_broadcasts(bot)
+    await run_worker(dp, bot, socket_path)
+
+
+def worker_process(socket_path: str):
+    # точка входа процесса-воркера, см. app/supervisor.py
+    asyncio.run(start_worker(socket_path))
+
+
 async def main():
+    if WORKER_PROCESSES > 1:
+        await run_supervisor(worker_process, bot)
+        return
+
     await init_db()
+    await load_settings()
+    await start_invalidation_listener()
+    await load_advert_index()
+    resume_broadcasts(bot)
+    if BOT_MODE == "webhook":
+        await run_webhook(dp, bot)
+        return
+
+    # после работы через вебхук getUpdates не работает, пока вебхук не снят
+    await bot.delete_webhook()
     await dp.start_polling(bot, skip_updates=True)
 
 
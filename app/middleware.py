@@ -24,13 +24,17 @@ class StatusCheckMiddleware(BaseMiddleware):
         if not user_id:
             return await handler(event, data)
 
-        from app.db.models import User
-        user = await User.get_or_none(id=user_id)
+        from app.db.crud_user import get_user_access
+        access = await get_user_access(user_id)
 
-        if not user:
+        if not access:
             return await handler(event, data)
 
-        if user.status == "banned":
+        status, role = access
+        data["user_status"] = status
+        data["user_role"] = role
+
+        if status == "banned":
             if event.message:
                 await event.message.answer("🚫 Ваш аккаунт заблокирован")
             elif event.callback_query:
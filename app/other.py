@@ -1,4 +1,6 @@
-from decimal import Decimal
+import re
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Optional
 
 def _format_price(value):
     if value is None:
@@ -21,4 +23,27 @@ def _format_price(value):
             return str(value)
 
     except (ValueError, TypeError):
-        return str(value)
\ No newline at end of file
+        return str(value)
+
+
+# правдоподобный объём двигателя легковой машины, литры
+ENGINE_VOLUME_MIN = Decimal("0.5")
+ENGINE_VOLUME_MAX = Decimal("10")
+
+
+def parse_engine_volume(value) -> Optional[Decimal]:
+    # "1.6", "2,0" -> литры; "1600" считаем кубическими сантиметрами.
+    # Диапазоны ("25-50") и опечатки вне ENGINE_VOLUME_MIN..MAX -> None.
+    # Та же логика в миграции 4_..._advert_engine_volume_liters.
+    text = str(value or "").replace(",", ".").strip()
+    if not re.match(r'^\d+(\.\d*)?$', text):
+        return None
+
+    volume = Decimal(text.rstrip("."))
+    if volume > 20:
+        volume /= 1000
+
+    volume = volume.quantize(Decimal("0.1"), rounding=ROUND_HALF_UP)
+    if not ENGINE_VOLUME_MIN <= volume <= ENGINE_VOLUME_MAX:
+        return None
+    return volume
@@ -0,0 +1,54 @@
+"""
+Реакция на смену статуса объявления.
+
+Обработчики модерации после сохранения статуса вызывают advert_status_changed,
+чтобы индекс ленты в памяти, кэш выборок по фильтрам и счётчики страниц
+админки не показывали снятые объявления и видели новые. При одобрении нового
+объявления advert_approved дополнительно рассылает оповещения по сохранённым
+поискам.
+
+Всё это живёт в памяти процесса, поэтому смена статуса уходит остальным
+процессам через notify("adverts", ...): они перечитывают объявление из базы
+и применяют те же изменения у себя.
+"""
+from aiogram import Bot
+
+from app.db.crud_advert import invalidate_filter_cache
+from app.db.models import Advert
+from app.db.pagination import invalidate_pages
+from app.services.advert_index import apply_advert_status, load_advert_index
+from app.services.invalidation import notify, on_invalidate
+from app.services.search_alerts import notify_saved_searches
+
+
+def _apply_locally(advert: Advert):
+    apply_advert_status(advert)
+    invalidate_filter_cache()
+    invalidate_pages("adverts:")
+    invalidate_pages(f"user_adverts:{advert.owner_id}")
+
+
+async def advert_status_changed(advert: Advert):
+    _apply_locally(advert)
+    await notify("adverts", advert_id=advert.id, status=advert.status)
+
+
+async def _on_adverts_changed(payload):
+    if "advert_id" not in payload:
+        # сообщения потеряны - пересобираем всё
+        await load_advert_index()
+        invalidate_filter_cache()
+        invalidate_pages()
+        return
+
+    advert = await Advert.get_or_none(id=payload["advert_id"])
+    if advert:
+        _apply_locally(advert)
+
+
+on_invalidate("adverts", _on_adverts_changed)
+
+
+async def advert_approved(bot: Bot, advert: Advert):
+    await advert_status_changed(advert)
+    await notify_saved_searches(bot, advert)
@@ -0,0 +1,220 @@
+"""
+Индекс активных объявлений в памяти процесса.
+
+Активные объявления меняются только при модерации, поэтому лента может
+выбирать подходящие id без похода в базу: поля объявлений лежат в массивах
+NumPy, строки закодированы числами, а фильтры считаются векторными масками.
+Индекс включается переменной окружения ADVERT_INDEX=1 и только если установлен
+numpy; иначе лента работает через SQL. Смену статуса объявления индекс
+получает через services/advert_events.py.
+"""
+from typing import Any, Dict, Iterable, List, Optional
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from app.config import ADVERT_INDEX_ENABLED
+from app.db.crud_advert import _normalize_filters
+from app.db.models import Advert
+from app.other import parse_engine_volume
+from app.services.cars_data import car_name_keys
+
+NUMERIC_FIELDS = {
+    "year": "int32",
+    "mileage": "int64",
+    "price": "float64",
+    "random_key": "float64",
+    "engine_volume_liters": "float64",  # None -> NaN, под фильтр не попадает
+}
+# city храним в верхнем регистре - в SQL он сравнивается через iexact
+CODED_FIELDS = (
+    "city", "name", "brand_key", "model_key", "condition", "fuel_type",
+    "transmission", "body_type", "color",
+)
+
+
+def _cast(cast, value):
+    # те же преобразования, что и в crud_advert._build_adverts_queryset
+    if value is None:
+        return None
+    try:
+        return cast(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def _as_year(value) -> int:
+    return int(str(value).strip())
+
+
+class ActiveAdvertIndex:
+    def __init__(self):
+        self.ready = False
+        self._vocab: Dict[str, Dict[str, int]] = {field: {} for field in CODED_FIELDS}
+        self._reset()
+
+    def _reset(self):
+        self.ids = np.zeros(0, dtype="int64")
+        self._columns = {field: np.zeros(0, dtype=dtype) for field, dtype in NUMERIC_FIELDS.items()}
+        self._columns.update({field: np.zeros(0, dtype="int32") for field in CODED_FIELDS})
+        self._positions: Dict[int, int] = {}
+
+    def __len__(self):
+        return len(self.ids)
+
+    @staticmethod
+    def _value(row: Dict[str, Any], field: str):
+        value = row.get(field)
+        if field == "city" and value:
+            return value.upper()
+        return value
+
+    def _encode(self, field: str, value) -> int:
+        if value is None:
+            return -1
+        vocab = self._vocab[field]
+        code = vocab.get(value)
+        if code is None:
+            code = vocab[value] = len(vocab)
+        return code
+
+    def _code(self, field: str, value) -> int:
+        # код существующего значения; -2 не совпадает ни с одной строкой
+        return self._vocab[field].get(value, -2)
+
+    def _codes_containing(self, field: str, needle: str):
+        needle = needle.lower()
+        return [code for value, code in self._vocab[field].items() if needle in value.lower()]
+
+    def _append(self, rows: List[Dict[str, Any]]):
+        if not rows:
+            return
+        start = len(self.ids)
+        self.ids = np.concatenate([self.ids, np.array([row["id"] for row in rows], dtype="int64")])
+        for field, dtype in NUMERIC_FIELDS.items():
+            column = np.array([self._value(row, field) for row in rows], dtype=dtype)
+            self._columns[field] = np.concatenate([self._columns[field], column])
+        for field in CODED_FIELDS:
+            column = np.array([self._encode(field, self._value(row, field)) for row in rows], dtype="int32")
+            self._columns[field] = np.concatenate([self._columns[field], column])
+        for offset, row in enumerate(rows):
+            self._positions[row["id"]] = start + offset
+
+    def _remove(self, advert_id: int):
+        position = self._positions.pop(advert_id, None)
+        if position is None:
+            return
+        self.ids = np.delete(self.ids, position)
+        for field in self._columns:
+            self._columns[field] = np.delete(self._columns[field], position)
+        self._positions = {int(value): i for i, value in enumerate(self.ids)}
+
+    async def load(self):
+        rows = await Advert.filter(status="active").values("id", *NUMERIC_FIELDS, *CODED_FIELDS)
+        self._reset()
+        self._append(rows)
+        self.ready = True
+
+    def apply(self, advert: Advert):
+        self._remove(advert.id)
+        if advert.status == "active":
+            self._append([{field: getattr(advert, field) for field in ("id", *NUMERIC_FIELDS, *CODED_FIELDS)}])
+
+    def mask(self, filters: Dict[str, Any], exclude_ids: Optional[Iterable[int]] = None):
+        filters = _normalize_filters(filters)
+        columns = self._columns
+        mask = np.ones(len(self.ids), dtype=bool)
+
+        city = filters.get("city")
+        if city:
+            mask &= columns["city"] == self._code("city", city.upper())
+
+        name = filters.get("name")
+        if name:
+            brand_key, model_key = car_name_keys(name)
+            if brand_key:
+                mask &= columns["brand_key"] == self._code("brand_key", brand_key)
+                if model_key:
+                    mask &= columns["model_key"] == self._code("model_key", model_key)
+            else:
+                mask &= np.isin(columns["name"], self._codes_containing("name", name.strip()))
+
+        if 'year' in filters:
+            year = _cast(_as_year, filters.get("year") or None)
+            if year is not None:
+                mask &= columns["year"] == year
+        else:
+            year_from = _cast(_as_year, filters.get("year_from"))
+            year_to = _cast(_as_year, filters.get("year_to"))
+            if year_from is not None:
+                mask &= columns["year"] >= year_from
+            if year_to is not None:
+                mask &= columns["year"] <= year_to
+
+        for field in ("condition", "fuel_type", "transmission", "body_type", "color"):
+            value = filters.get(field)
+            if value:
+                mask &= columns[field] == self._code(field, value)
+
+        for field, cast in (("mileage", int), ("price", float)):
+            low = _cast(cast, filters.get(f"{field}_from"))
+            high = _cast(cast, filters.get(f"{field}_to"))
+            if low is not None:
+                mask &= columns[field] >= low
+            if high is not None:
+                mask &= columns[field] <= high
+
+        engine_volume_max = parse_engine_volume(filters.get("engine_volume_max"))
+        if engine_volume_max:
+            mask &= columns["engine_volume_liters"] <= float(engine_volume_max)
+
+        if exclude_ids:
+            mask &= ~np.isin(self.ids, list(exclude_ids))
+
+        return mask
+
+    def ids_batch(self, filters: Dict[str, Any], after_key: Optional[float] = None,
+                  before_key: Optional[float] = None, limit: int = 50) -> List[tuple]:
+        # то же, что crud_advert.get_advert_ids_batch, но без запроса в базу
+        keys = self._columns["random_key"]
+        mask = self.mask(filters)
+        if after_key is not None:
+            mask &= keys > after_key
+        if before_key is not None:
+            mask &= keys < before_key
+
+        found = np.flatnonzero(mask)
+        if len(found) > limit:
+            found = found[np.argpartition(keys[found], limit - 1)[:limit]]
+        found = found[np.argsort(keys[found], kind="stable")]
+        return [(int(self.ids[i]), float(keys[i])) for i in found]
+
+    def count(self, filters: Dict[str, Any]) -> int:
+        return int(self.mask(filters).sum())
+
+
+advert_index: Optional[ActiveAdvertIndex] = (
+    ActiveAdvertIndex() if ADVERT_INDEX_ENABLED and np is not None else None
+)
+
+
+async def load_advert_index():
+    if advert_index is None:
+        if ADVERT_INDEX_ENABLED:
+            print("ADVERT_INDEX включён, но numpy не установлен - лента работает через SQL")
+        return
+    await advert_index.load()
+
+
+def apply_advert_status(advert: Advert):
+    if advert_index is not None and advert_index.ready:
+        advert_index.apply(advert)
+
+
+def index_ids_batch(filters: Dict[str, Any], after_key: Optional[float] = None,
+                    before_key: Optional[float] = None, limit: int = 50) -> Optional[List[tuple]]:
+    if advert_index is None or not advert_index.ready:
+        return None
+    return advert_index.ids_batch(filters, after_key=after_key, before_key=before_key, limit=limit)
@@ -0,0 +1,394 @@
+"""
+Рассылка сообщений пользователям.
+
+Рассылка - это запись Broadcast, которую ведёт один процесс. Получатели
+(сегмент, см. broadcast_segments.py) идут порциями по возрастанию id; после каждой порции одной транзакцией
+пишутся результаты по получателям (broadcast_deliveries, bulk insert),
+отметки bot_blocked и контрольная точка last_user_id. После перезапуска
+рассылка продолжается с контрольной точки: заново могут уйти сообщения
+только из порции, которая не успела записаться. Кто ведёт рассылку, решает
+аренда locked_until - пока рассылка идёт, включая повторный проход, её раз
+в BROADCAST_LEASE / 3 секунд продлевает отдельная задача, а resume_broadcasts
+подбирает рассылки с истёкшей арендой.
+Получатели с временной ошибкой (сеть, 5xx, RetryAfter сверх попыток)
+получают статус retry и ещё раз обходятся после основного прохода.
+
+Получатели читаются из базы порциями по id (keyset, без OFFSET) и
+складываются в ограниченную очередь, из неё отправляют BROADCAST_CONCURRENCY
+задач. Общий темп держит RateLimiter - не чаще BROADCAST_RATE сообщений в
+секунду на бота (лимит Telegram - около 30). Каждому чату уходит одно
+сообщение, а повтор после сетевой ошибки идёт не раньше чем через секунду,
+так что лимит в одно сообщение в секунду на чат не нарушается.
+На TelegramRetryAfter пауза ставится для всей рассылки, а не для одной
+задачи: флуд-контроль Telegram считает сообщения бота целиком.
+"""
+import asyncio
+import time
+from datetime import timedelta
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramNetworkError,
+    TelegramRetryAfter,
+    TelegramServerError,
+)
+
+from tortoise import timezone
+from tortoise.expressions import F, Q
+from tortoise.transactions import in_transaction
+
+from app.config import BROADCAST_RATE
+from app.db.models import Broadcast, BroadcastDelivery, User
+from app.services.broadcast_segments import count_segment, iter_segment_ids
+
+BROADCAST_CONCURRENCY = 20
+# порция получателей между контрольными точками: ~20 секунд при 25 сообщениях в секунду
+BROADCAST_CHUNK_SIZE = 500
+BROADCAST_LEASE = 60
+# сколько раз повторять отправку после сетевой ошибки или RetryAfter
+BROADCAST_ATTEMPTS = 3
+PROGRESS_INTERVAL = 5.0
+
+
+class RateLimiter:
+    def __init__(self, rate: float):
+        self.interval = 1 / rate
+        self._next = 0.0
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds: float):
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def wait(self):
+        async with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next, self._paused_until)
+            self._next = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class BroadcastSender:
+    def __init__(
+            self,
+            bot: Bot,
+            text: Optional[str],
+            media_type: Optional[str] = None,
+            media_file_id: Optional[str] = None,
+            rate: float = BROADCAST_RATE,
+            concurrency: int = BROADCAST_CONCURRENCY,
+    ):
+        self.bot = bot
+        self.text = text
+        self.media_type = media_type
+        self.media_file_id = media_file_id
+        self.concurrency = concurrency
+        self.limiter = RateLimiter(rate)
+        self.sent = 0
+        self.blocked = 0
+        self.failed = 0
+
+    @property
+    def done(self) -> int:
+        return self.sent + self.blocked + self.failed
+
+    async def _send(self, chat_id: int):
+        if self.media_type == "photo":
+            await self.bot.send_photo(chat_id, self.media_file_id, caption=self.text)
+        elif self.media_type == "document":
+            await self.bot.send_document(chat_id, self.media_file_id, caption=self.text)
+        else:
+            await self.bot.send_message(chat_id, self.text)
+
+    async def deliver(self, chat_id: int) -> Tuple[str, Optional[str]]:
+        # (sent / blocked / failed / retry, текст ошибки)
+        error = None
+        for attempt in range(1, BROADCAST_ATTEMPTS + 1):
+            await self.limiter.wait()
+            try:
+                await self._send(chat_id)
+                return "sent", None
+            except TelegramRetryAfter as e:
+                error = str(e)
+                self.limiter.pause(e.retry_after)
+            except TelegramForbiddenError as e:
+                return "blocked", str(e)
+            except TelegramBadRequest as e:
+                return "failed", str(e)
+            except (TelegramNetworkError, TelegramServerError) as e:
+                error = str(e)
+                if attempt < BROADCAST_ATTEMPTS:
+                    await asyncio.sleep(attempt)
+            except Exception as e:
+                print(f"Рассылка: не отправлено {chat_id}: {e}")
+                return "failed", str(e)
+        return "retry", error
+
+    async def _worker(self, queue: asyncio.Queue, results: Optional[Dict[int, Tuple[str, Optional[str]]]]):
+        while True:
+            chat_id = await queue.get()
+            try:
+                status, error = await self.deliver(chat_id)
+                if results is not None:
+                    results[chat_id] = (status, error)
+                if status == "sent":
+                    self.sent += 1
+                elif status == "blocked":
+                    self.blocked += 1
+                else:
+                    self.failed += 1
+            finally:
+                queue.task_done()
+
+    async def run(
+            self,
+            chunks: AsyncIterator[List[int]],
+            on_progress: Optional[Callable[["BroadcastSender"], Awaitable[None]]] = None,
+            on_chunk: Optional[Callable[[Dict[int, Tuple[str, Optional[str]]]], Awaitable[None]]] = None,
+    ):
+        # on_chunk(results) вызывается, когда вся порция отправлена, - точка для записи результатов
+        queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        results: Optional[Dict[int, Tuple[str, Optional[str]]]] = {} if on_chunk else None
+        tasks = [asyncio.create_task(self._worker(queue, results)) for _ in range(self.concurrency)]
+        if on_progress:
+            tasks.append(asyncio.create_task(self._report(on_progress)))
+        try:
+            async for chunk in chunks:
+                for chat_id in chunk:
+                    await queue.put(chat_id)
+                if on_chunk:
+                    await queue.join()
+                    await on_chunk(dict(results))
+                    results.clear()
+            await queue.join()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _report(self, on_progress):
+        # прогресс по времени, а не по числу отправок: правка сообщения - тоже запрос к API
+        while True:
+            await asyncio.sleep(PROGRESS_INTERVAL)
+            try:
+                await on_progress(self)
+            except Exception as e:
+                print(f"Рассылка: ошибка обновления прогресса: {e}")
+
+
+_tasks: Set[asyncio.Task] = set()
+
+
+def _spawn(coro):
+    task = asyncio.create_task(coro)
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
+
+def broadcast_progress_text(broadcast: Broadcast, sender: Optional[BroadcastSender] = None) -> str:
+    sent, blocked, failed = broadcast.sent, broadcast.blocked, broadcast.failed
+    if sender:
+        sent, blocked, failed = sender.sent, sender.blocked, sender.failed
+    done = sent + blocked + failed
+    stats = f"Успешно: {sent}, заблокировали бота: {blocked}, ошибок: {failed}"
+    if broadcast.status == "done":
+        return f"✅ Рассылка завершена\n{stats}"
+    return f"📤 Рассылка... {done}/{max(broadcast.total, done)}\n{stats}"
+
+
+async def _edit_progress(bot: Bot, broadcast: Broadcast, text: str):
+    if not broadcast.progress_message_id:
+        return
+    try:
+        await bot.edit_message_text(
+            text, chat_id=broadcast.progress_chat_id, message_id=broadcast.progress_message_id
+        )
+    except TelegramBadRequest:
+        # message is not modified или сообщение удалено
+        pass
+
+
+async def _claim(broadcast_id: int) -> bool:
+    now = timezone.now()
+    claimed = await Broadcast.filter(
+        Q(locked_until__isnull=True) | Q(locked_until__lt=now),
+        id=broadcast_id,
+        status__in=["pending", "running"],
+    ).update(status="running", locked_until=now + timedelta(seconds=BROADCAST_LEASE))
+    return claimed > 0
+
+
+async def _extend_lease(broadcast_id: int):
+    await Broadcast.filter(id=broadcast_id).update(
+        locked_until=timezone.now() + timedelta(seconds=BROADCAST_LEASE)
+    )
+
+
+async def _keep_lease(broadcast_id: int):
+    # продление не зависит от отправок: пауза RetryAfter может быть дольше аренды
+    while True:
+        await asyncio.sleep(BROADCAST_LEASE / 3)
+        try:
+            await _extend_lease(broadcast_id)
+        except Exception as e:
+            print(f"Рассылка {broadcast_id}: не удалось продлить аренду: {e}")
+
+
+async def _save_results(broadcast: Broadcast, results: Dict[int, Tuple[str, Optional[str]]]):
+    if not results:
+        return
+    counts = {"sent": 0, "blocked": 0, "failed": 0}
+    for status, _ in results.values():
+        counts["failed" if status == "retry" else status] += 1
+    blocked_ids = [user_id for user_id, (status, _) in results.items() if status == "blocked"]
+
+    async with in_transaction():
+        await BroadcastDelivery.bulk_create(
+            [
+                BroadcastDelivery(
+                    broadcast_id=broadcast.id,
+                    user_id=user_id,
+                    status=status,
+                    error=error[:255] if error else None,
+                )
+                for user_id, (status, error) in results.items()
+            ],
+            ignore_conflicts=True,
+        )
+        if blocked_ids:
+            await User.filter(id__in=blocked_ids).update(bot_blocked=True)
+        await Broadcast.filter(id=broadcast.id).update(
+            last_user_id=max(results),
+            sent=F("sent") + counts["sent"],
+            blocked=F("blocked") + counts["blocked"],
+            failed=F("failed") + counts["failed"],
+            locked_until=timezone.now() + timedelta(seconds=BROADCAST_LEASE),
+        )
+
+
+async def _retry_deliveries(sender: BroadcastSender, broadcast: Broadcast):
+    # второй проход по временным ошибкам основного прохода
+    last_id = 0
+    while True:
+        rows = await (
+            BroadcastDelivery.filter(broadcast_id=broadcast.id, status="retry", id__gt=last_id)
+            .order_by("id")
+            .limit(BROADCAST_CHUNK_SIZE)
+            .values_list("id", "user_id")
+        )
+        if not rows:
+            return
+        last_id = rows[-1][0]
+
+        results: Dict[int, Tuple[str, Optional[str]]] = {}
+
+        async def deliver(user_id: int):
+            results[user_id] = await sender.deliver(user_id)
+
+        for start in range(0, len(rows), sender.concurrency):
+            await asyncio.gather(*(deliver(user_id) for _, user_id in rows[start:start + sender.concurrency]))
+
+        by_status: Dict[str, List[int]] = {}
+        for user_id, (status, _) in results.items():
+            by_status.setdefault("failed" if status == "retry" else status, []).append(user_id)
+        async with in_transaction():
+            for status, user_ids in by_status.items():
+                await BroadcastDelivery.filter(broadcast_id=broadcast.id, user_id__in=user_ids).update(status=status)
+            if by_status.get("blocked"):
+                await User.filter(id__in=by_status["blocked"]).update(bot_blocked=True)
+            recovered = len(results) - len(by_status.get("failed", []))
+            await Broadcast.filter(id=broadcast.id).update(
+                sent=F("sent") + len(by_status.get("sent", [])),
+                blocked=F("blocked") + len(by_status.get("blocked", [])),
+                failed=F("failed") - recovered,
+                locked_until=timezone.now() + timedelta(seconds=BROADCAST_LEASE),
+            )
+        sender.sent += len(by_status.get("sent", []))
+        sender.blocked += len(by_status.get("blocked", []))
+        sender.failed -= recovered
+
+
+async def _run_broadcast(bot: Bot, broadcast_id: int):
+    broadcast = await Broadcast.get(id=broadcast_id)
+    sender = BroadcastSender(
+        bot,
+        broadcast.text,
+        media_type=broadcast.media_type,
+        media_file_id=broadcast.media_file_id,
+    )
+    # после перезапуска счётчики продолжаются с записанных
+    sender.sent, sender.blocked, sender.failed = broadcast.sent, broadcast.blocked, broadcast.failed
+
+    async def on_progress(sender: BroadcastSender):
+        await _edit_progress(bot, broadcast, broadcast_progress_text(broadcast, sender))
+
+    async def on_chunk(results):
+        await _save_results(broadcast, results)
+
+    lease = asyncio.create_task(_keep_lease(broadcast.id))
+    try:
+        chunks = iter_segment_ids(broadcast.segment, broadcast.last_user_id, BROADCAST_CHUNK_SIZE)
+        await sender.run(chunks, on_progress, on_chunk)
+        await _retry_deliveries(sender, broadcast)
+    except Exception as e:
+        # аренда истечёт, и рассылку продолжит resume_broadcasts
+        print(f"Рассылка {broadcast.id} прервана: {e}")
+        return
+    finally:
+        lease.cancel()
+        await asyncio.gather(lease, return_exceptions=True)
+
+    await Broadcast.filter(id=broadcast.id).update(status="done", finished_at=timezone.now(), locked_until=None)
+    await broadcast.refresh_from_db()
+    await _edit_progress(bot, broadcast, broadcast_progress_text(broadcast))
+
+
+async def start_broadcast(
+        bot: Bot,
+        created_by_id: Optional[int],
+        text: Optional[str],
+        media_type: Optional[str],
+        media_file_id: Optional[str],
+        progress_chat_id: Optional[int] = None,
+        progress_message_id: Optional[int] = None,
+        segment: Optional[dict] = None,
+) -> Broadcast:
+    broadcast = await Broadcast.create(
+        created_by_id=created_by_id,
+        text=text,
+        media_type=media_type,
+        media_file_id=media_file_id,
+        segment=segment or None,
+        total=await count_segment(segment),
+        progress_chat_id=progress_chat_id,
+        progress_message_id=progress_message_id,
+    )
+    if await _claim(broadcast.id):
+        _spawn(_run_broadcast(bot, broadcast.id))
+    return broadcast
+
+
+async def _resume_loop(bot: Bot):
+    while True:
+        try:
+            now = timezone.now()
+            ids = await Broadcast.filter(
+                Q(locked_until__isnull=True) | Q(locked_until__lt=now),
+                status__in=["pending", "running"],
+            ).values_list("id", flat=True)
+            for broadcast_id in ids:
+                if await _claim(broadcast_id):
+                    print(f"Продолжаем рассылку {broadcast_id}")
+                    _spawn(_run_broadcast(bot, broadcast_id))
+        except Exception as e:
+            print(f"Ошибка поиска незавершённых рассылок: {e}")
+        await asyncio.sleep(BROADCAST_LEASE)
+
+
+def resume_broadcasts(bot: Bot):
+    # при старте и дальше раз в BROADCAST_LEASE подбирает рассылки, которые никто не ведёт
+    _spawn(_resume_loop(bot))
@@ -0,0 +1,137 @@
+"""
+Аудитория рассылки.
+
+Сегмент - словарь условий, все условия объединяются через И:
+    city_id          - есть объявление или фильтр поиска в этом городе
+    subscription     - "active" (есть действующая подписка) / "none" (нет)
+    role             - роль пользователя
+    registered_from  - дата регистрации не раньше (ISO, "2026-01-01")
+    registered_to    - дата регистрации раньше
+    has_favorites    - есть хотя бы одно объявление в избранном
+Пустой сегмент - все пользователи. Заблокировавшие бота не попадают никуда.
+
+Сегмент превращается в один SQL запрос с EXISTS по связанным таблицам,
+получатели идут по возрастанию id порциями (keyset по u.id, WHERE u.id > ...
+LIMIT). Каждая порция - отдельный короткий запрос: рассылка идёт около часа,
+и держать всё это время открытую транзакцию или соединение из пула нельзя -
+это мешает vacuum. Поэтому аудитория не фиксируется на момент старта:
+пользователь, попавший в сегмент до того, как рассылка дошла до его id,
+её тоже получит.
+"""
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from tortoise import Tortoise
+
+from app.services.cities import CITY_NAMES
+
+SEGMENT_ROLES = {
+    "user": "👤 Пользователи",
+    "moderator": "🛡️ Модераторы",
+    "admin": "⚡ Админы",
+    "owner": "👑 Владельцы",
+}
+
+
+def _dialect() -> str:
+    return Tortoise.get_connection("default").capabilities.dialect
+
+
+def _segment_where(segment: Optional[Dict[str, Any]], dialect: str, params: List[Any]) -> str:
+    def param(value) -> str:
+        if dialect == "sqlite" and isinstance(value, datetime):
+            # в SQLite даты лежат строками, сравниваем так же
+            value = value.isoformat(" ")
+        params.append(value)
+        return f"${len(params)}" if dialect == "postgres" else "?"
+
+    segment = segment or {}
+    conditions = ["NOT u.bot_blocked"]
+
+    if segment.get("city_id") is not None:
+        conditions.append(
+            f"(EXISTS (SELECT 1 FROM adverts a WHERE a.owner_id = u.id AND a.city_id = {param(segment['city_id'])})"
+            " OR EXISTS (SELECT 1 FROM search_filters sf"
+            f" WHERE sf.user_id = u.id AND sf.city_id = {param(segment['city_id'])}))"
+        )
+
+    if segment.get("subscription") in ("active", "none"):
+        exists = (
+            "EXISTS (SELECT 1 FROM user_subscriptions s WHERE s.user_id = u.id"
+            f" AND s.is_active AND s.expires_at > {param(datetime.now())})"
+        )
+        conditions.append(exists if segment["subscription"] == "active" else f"NOT {exists}")
+
+    if segment.get("role"):
+        conditions.append(f"u.role = {param(segment['role'])}")
+
+    if segment.get("registered_from"):
+        conditions.append(f"u.created_at >= {param(datetime.fromisoformat(segment['registered_from']))}")
+    if segment.get("registered_to"):
+        conditions.append(f"u.created_at < {param(datetime.fromisoformat(segment['registered_to']))}")
+
+    if segment.get("has_favorites"):
+        conditions.append("EXISTS (SELECT 1 FROM favorite_adverts f WHERE f.user_id = u.id)")
+
+    return " AND ".join(conditions)
+
+
+def segment_query(segment: Optional[Dict[str, Any]], after_id: int, limit: Optional[int] = None,
+                  dialect: Optional[str] = None) -> Tuple[str, List[Any]]:
+    dialect = dialect or _dialect()
+    params: List[Any] = []
+    where = _segment_where(segment, dialect, params)
+    params.append(after_id)
+    after = f"${len(params)}" if dialect == "postgres" else "?"
+    sql = f"SELECT u.id FROM users u WHERE {where} AND u.id > {after} ORDER BY u.id"
+    if limit:
+        sql += f" LIMIT {int(limit)}"
+    return sql, params
+
+
+async def count_segment(segment: Optional[Dict[str, Any]]) -> int:
+    dialect = _dialect()
+    params: List[Any] = []
+    where = _segment_where(segment, dialect, params)
+    rows = await Tortoise.get_connection("default").execute_query_dict(
+        f"SELECT COUNT(*) AS total FROM users u WHERE {where}", params
+    )
+    return rows[0]["total"]
+
+
+async def iter_segment_ids(segment: Optional[Dict[str, Any]], after_id: int = 0,
+                          chunk_size: int = 500) -> AsyncIterator[List[int]]:
+    connection = Tortoise.get_connection("default")
+    while True:
+        sql, params = segment_query(segment, after_id, chunk_size)
+        _, rows = await connection.execute_query(sql, params)
+        if not rows:
+            return
+        ids = [row[0] for row in rows]
+        yield ids
+        after_id = ids[-1]
+
+
+def describe_segment(segment: Optional[Dict[str, Any]]) -> str:
+    segment = segment or {}
+    parts = []
+    if segment.get("city_id") is not None:
+        parts.append(f"город: {CITY_NAMES.get(segment['city_id'], segment['city_id'])}")
+    if segment.get("subscription") == "active":
+        parts.append("с активной подпиской")
+    elif segment.get("subscription") == "none":
+        parts.append("без подписки")
+    if segment.get("role"):
+        parts.append(f"роль: {SEGMENT_ROLES.get(segment['role'], segment['role'])}")
+    if segment.get("registered_from") or segment.get("registered_to"):
+        date_from = segment.get("registered_from")
+        date_to = segment.get("registered_to")
+        period = []
+        if date_from:
+            period.append(f"с {datetime.fromisoformat(date_from).strftime('%d.%m.%Y')}")
+        if date_to:
+            period.append(f"до {datetime.fromisoformat(date_to).strftime('%d.%m.%Y')}")
+        parts.append("регистрация " + " ".join(period))
+    if segment.get("has_favorites"):
+        parts.append("есть избранное")
+    return ", ".join(parts) if parts else "все пользователи"
@@ -5,6 +5,8 @@ from rapidfuzz import fuzz, process
 from functools import lru_cache
 import asyncio
 
+from app.services.car_generation import BRAND_TRANSLATIONS, MODEL_TRANSLATIONS
+
 POPULAR_BRANDS = [
     'Toyota', 'Honda', 'Nissan', 'Mazda', 'Subaru', 'Mitsubishi', 'Lexus', 'Infiniti', 'Suzuki', 'Daihatsu',
     'BMW', 'Audi', 'Mercedes-Benz', 'Volkswagen', 'Opel', 'Porsche', 'Smart', 'Mini', 'Maybach', 'MAN',
@@ -297,6 +299,51 @@ def translate_model(model: str, to_english: bool = True) -> str:
         return RUSSIAN_MODELS.get(model_norm, model)
 
 
+# ключи для точного поиска по марке и модели
+BRAND_KEY_ALIASES = {'MERCEDES': 'MERCEDES-BENZ', 'VAZ': 'LADA', 'ЛАДА': 'LADA', 'ВАЗ': 'LADA'}
+# в MODEL_TRANSLATIONS переводы в обе стороны, нужны только русские названия
+_MODEL_TRANSLATIONS_NORM = {
+    normalize_for_search(k): v for k, v in MODEL_TRANSLATIONS.items()
+    if re.search('[а-яА-ЯёЁ]', k)
+}
+
+
+def brand_key(brand: str) -> str:
+    key = normalize_for_search(translate_brand(brand, to_english=True))
+    return BRAND_KEY_ALIASES.get(key, key)
+
+
+def model_key(model: str) -> str:
+    model_norm = normalize_for_search(model)
+    model = _MODEL_TRANSLATIONS_NORM.get(model_norm, model)
+    return normalize_for_search(translate_model(model, to_english=True))
+
+
+@lru_cache(maxsize=1)
+def _known_brand_keys() -> dict:
+    names = POPULAR_BRANDS + list(RUSSIAN_NAMES) + list(RUSSIAN_NAMES.values()) + list(BRAND_TRANSLATIONS)
+    return {normalize_for_search(name): brand_key(name) for name in names}
+
+
+@lru_cache(maxsize=4096)
+def car_name_keys(name: str) -> Tuple[Optional[str], Optional[str]]:
+    words = normalize_for_search(name or '').split()
+    if not words:
+        return None, None
+
+    known = _known_brand_keys()
+    for size in (3, 2, 1):
+        prefix = ' '.join(words[:size])
+        if len(words) >= size and prefix in known:
+            rest = ' '.join(words[size:])
+            return known[prefix], model_key(rest) if rest else None
+
+    # неизвестная марка: одно слово может оказаться моделью, ключей не даём
+    if len(words) < 2:
+        return None, None
+    return brand_key(words[0]), model_key(' '.join(words[1:]))
+
+
 async def get_all_car_brands() -> List[str]:
     try:
         url = 'https://vpic.nhtsa.dot.gov/api/vehicles/GetAllMakes?format=json'
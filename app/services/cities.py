@@ -0,0 +1,193 @@
+"""
+Справочник городов.
+
+Город раньше хранился как введённый текст, поэтому "Москва", "москва " и "Msk"
+считались разными городами. Здесь лежит встроенный список городов с
+постоянными id и вариантами написания, а normalize_city приводит ввод
+пользователя к каноническому названию: сначала точное совпадение по
+названию или алиасу, затем нечёткое через rapidfuzz.
+"""
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from rapidfuzz import fuzz, process
+
+# id не меняются и не переиспользуются - они лежат в базе
+CITIES: List[Tuple[int, str, Tuple[str, ...]]] = [
+    (1, "Москва", ("мск", "moscow", "moskva", "msk")),
+    (2, "Санкт-Петербург", ("спб", "питер", "петербург", "санкт петербург", "saint petersburg", "spb", "piter")),
+    (3, "Новосибирск", ("нск", "новосиб", "novosibirsk", "nsk")),
+    (4, "Екатеринбург", ("екб", "ебург", "екат", "ekaterinburg", "yekaterinburg", "ekb")),
+    (5, "Казань", ("kazan",)),
+    (6, "Нижний Новгород", ("нн", "нижний", "н новгород", "nizhny novgorod", "nn")),
+    (7, "Челябинск", ("челяба", "chelyabinsk")),
+    (8, "Красноярск", ("крск", "krasnoyarsk")),
+    (9, "Самара", ("samara",)),
+    (10, "Уфа", ("ufa",)),
+    (11, "Ростов-на-Дону", ("ростов", "рнд", "ростов на дону", "rostov", "rostov-on-don")),
+    (12, "Омск", ("omsk",)),
+    (13, "Краснодар", ("крд", "krasnodar")),
+    (14, "Воронеж", ("voronezh",)),
+    (15, "Пермь", ("perm",)),
+    (16, "Волгоград", ("volgograd",)),
+    (17, "Саратов", ("saratov",)),
+    (18, "Тюмень", ("tyumen",)),
+    (19, "Тольятти", ("тлт", "togliatti", "tolyatti")),
+    (20, "Ижевск", ("izhevsk",)),
+    (21, "Барнаул", ("barnaul",)),
+    (22, "Ульяновск", ("ulyanovsk",)),
+    (23, "Иркутск", ("irkutsk",)),
+    (24, "Хабаровск", ("khabarovsk",)),
+    (25, "Махачкала", ("махач", "makhachkala")),
+    (26, "Ярославль", ("yaroslavl",)),
+    (27, "Владивосток", ("влад", "vladivostok")),
+    (28, "Оренбург", ("orenburg",)),
+    (29, "Томск", ("tomsk",)),
+    (30, "Кемерово", ("kemerovo",)),
+    (31, "Новокузнецк", ("novokuznetsk",)),
+    (32, "Рязань", ("ryazan",)),
+    (33, "Набережные Челны", ("челны", "наб челны", "naberezhnye chelny")),
+    (34, "Астрахань", ("astrakhan",)),
+    (35, "Киров", ("kirov",)),
+    (36, "Пенза", ("penza",)),
+    (37, "Балашиха", ("balashikha",)),
+    (38, "Липецк", ("lipetsk",)),
+    (39, "Чебоксары", ("cheboksary",)),
+    (40, "Калининград", ("kaliningrad",)),
+    (41, "Тула", ("tula",)),
+    (42, "Ставрополь", ("stavropol",)),
+    (43, "Курск", ("kursk",)),
+    (44, "Улан-Удэ", ("улан удэ", "ulan-ude")),
+    (45, "Сочи", ("sochi",)),
+    (46, "Тверь", ("tver",)),
+    (47, "Магнитогорск", ("магнитка", "magnitogorsk")),
+    (48, "Иваново", ("ivanovo",)),
+    (49, "Брянск", ("bryansk",)),
+    (50, "Белгород", ("belgorod",)),
+    (51, "Сургут", ("surgut",)),
+    (52, "Владимир", ("vladimir",)),
+    (53, "Чита", ("chita",)),
+    (54, "Архангельск", ("arkhangelsk",)),
+    (55, "Нижний Тагил", ("тагил", "nizhny tagil")),
+    (56, "Симферополь", ("simferopol",)),
+    (57, "Калуга", ("kaluga",)),
+    (58, "Якутск", ("yakutsk",)),
+    (59, "Грозный", ("grozny",)),
+    (60, "Волжский", ("volzhsky",)),
+    (61, "Смоленск", ("smolensk",)),
+    (62, "Саранск", ("saransk",)),
+    (63, "Череповец", ("cherepovets",)),
+    (64, "Курган", ("kurgan",)),
+    (65, "Вологда", ("vologda",)),
+    (66, "Орёл", ("орел", "orel", "oryol")),
+    (67, "Владикавказ", ("vladikavkaz",)),
+    (68, "Подольск", ("podolsk",)),
+    (69, "Мурманск", ("murmansk",)),
+    (70, "Тамбов", ("tambov",)),
+    (71, "Стерлитамак", ("sterlitamak",)),
+    (72, "Петрозаводск", ("petrozavodsk",)),
+    (73, "Кострома", ("kostroma",)),
+    (74, "Нижневартовск", ("nizhnevartovsk",)),
+    (75, "Новороссийск", ("novorossiysk",)),
+    (76, "Йошкар-Ола", ("йошкар ола", "yoshkar-ola")),
+    (77, "Химки", ("khimki",)),
+    (78, "Таганрог", ("taganrog",)),
+    (79, "Сыктывкар", ("syktyvkar",)),
+    (80, "Нальчик", ("nalchik",)),
+    (81, "Шахты", ("shakhty",)),
+    (82, "Дзержинск", ("dzerzhinsk",)),
+    (83, "Братск", ("bratsk",)),
+    (84, "Орск", ("orsk",)),
+    (85, "Ангарск", ("angarsk",)),
+    (86, "Благовещенск", ("blagoveshchensk",)),
+    (87, "Энгельс", ("engels",)),
+    (88, "Великий Новгород", ("новгород", "veliky novgorod")),
+    (89, "Старый Оскол", ("оскол", "stary oskol")),
+    (90, "Королёв", ("королев", "korolyov")),
+    (91, "Псков", ("pskov",)),
+    (92, "Мытищи", ("mytishchi",)),
+    (93, "Бийск", ("biysk",)),
+    (94, "Люберцы", ("lyubertsy",)),
+    (95, "Южно-Сахалинск", ("южно сахалинск", "сахалинск", "yuzhno-sakhalinsk")),
+    (96, "Армавир", ("armavir",)),
+    (97, "Балаково", ("balakovo",)),
+    (98, "Северодвинск", ("severodvinsk",)),
+    (99, "Петропавловск-Камчатский", ("петропавловск", "камчатка", "petropavlovsk-kamchatsky")),
+    (100, "Норильск", ("norilsk",)),
+    (101, "Абакан", ("abakan",)),
+    (102, "Уссурийск", ("ussuriysk",)),
+    (103, "Сызрань", ("syzran",)),
+    (104, "Каменск-Уральский", ("каменск уральский", "kamensk-uralsky")),
+    (105, "Новочеркасск", ("novocherkassk",)),
+    (106, "Златоуст", ("zlatoust",)),
+    (107, "Альметьевск", ("almetyevsk",)),
+    (108, "Электросталь", ("elektrostal",)),
+    (109, "Керчь", ("kerch",)),
+    (110, "Севастополь", ("sevastopol",)),
+    (111, "Миасс", ("miass",)),
+    (112, "Находка", ("nakhodka",)),
+    (113, "Пятигорск", ("pyatigorsk",)),
+    (114, "Копейск", ("kopeysk",)),
+    (115, "Березники", ("berezniki",)),
+    (116, "Рыбинск", ("rybinsk",)),
+    (117, "Новомосковск", ("novomoskovsk",)),
+    (118, "Хасавюрт", ("khasavyurt",)),
+    (119, "Нефтеюганск", ("nefteyugansk",)),
+    (120, "Новый Уренгой", ("уренгой", "novy urengoy")),
+    (121, "Ноябрьск", ("noyabrsk",)),
+    (122, "Ханты-Мансийск", ("ханты мансийск", "khanty-mansiysk")),
+    (123, "Обнинск", ("obninsk",)),
+    (124, "Евпатория", ("evpatoria",)),
+    (125, "Каспийск", ("kaspiysk",)),
+]
+
+# ниже этого порога нечёткое совпадение не считаем городом
+CITY_MATCH_CUTOFF = 80
+
+CITY_NAMES: Dict[int, str] = {city_id: name for city_id, name, _ in CITIES}
+
+
+def _norm(text: str) -> str:
+    text = text.lower().replace("ё", "е").strip()
+    text = re.sub(r"^(г\.|г |город )", "", text).strip()
+    return re.sub(r"[\s\-]+", " ", text)
+
+
+@lru_cache(maxsize=1)
+def _aliases() -> Dict[str, int]:
+    aliases = {}
+    for city_id, name, variants in CITIES:
+        for variant in (name, *variants):
+            aliases[_norm(variant)] = city_id
+    return aliases
+
+
+@lru_cache(maxsize=4096)
+def normalize_city(text: Optional[str]) -> Tuple[Optional[int], Optional[str]]:
+    # (id, каноническое название) или (None, None), если города нет в справочнике
+    if not text:
+        return None, None
+    key = _norm(text)
+    if not key:
+        return None, None
+
+    aliases = _aliases()
+    city_id = aliases.get(key)
+    if city_id is None and len(key) >= 4:
+        # короткие алиасы вроде "нн" нечётко не сравниваем - слишком много ложных совпадений
+        match = process.extractOne(key, aliases.keys(), scorer=fuzz.ratio, score_cutoff=CITY_MATCH_CUTOFF)
+        if match:
+            city_id = aliases[match[0]]
+
+    if city_id is None:
+        return None, None
+    return city_id, CITY_NAMES[city_id]
+
+
+@lru_cache(maxsize=4096)
+def city_id_by_name(name: Optional[str]) -> Optional[int]:
+    # только точное совпадение - для сохранённых значений, без нечёткого поиска
+    if not name:
+        return None
+    return _aliases().get(_norm(name))
@@ -0,0 +1,134 @@
+"""
+Колода ленты объявлений.
+
+Для каждого пользователя хранится перемешанная пачка id подходящих объявлений.
+Пачки идут по random_key от случайной точки по кругу, поэтому объявление
+не повторяется, пока пользователь не пролистает все подходящие. Колода лежит
+в данных FSM и пересобирается при смене фильтров, а следующая пачка
+догружается в фоне, когда в колоде остаётся мало карточек.
+"""
+import asyncio
+import random
+from typing import Any, Dict, Optional, Tuple
+
+from aiogram.fsm.context import FSMContext
+
+from app.db.crud_advert import filters_signature, get_advert_ids_batch
+from app.services.advert_index import index_ids_batch
+
+DECK_BATCH_SIZE = 50
+DECK_LOW_WATERMARK = 10
+
+# user_id -> (подпись фильтров, задача догрузки)
+_refills: Dict[int, Tuple[str, asyncio.Task]] = {}
+
+
+def _new_deck(signature: str) -> Dict[str, Any]:
+    pivot = random.random()
+    return {
+        "signature": signature,
+        "pivot": pivot,
+        "cursor": pivot,
+        "wrapped": False,
+        "done": False,
+        "ids": [],
+    }
+
+
+async def _ids_batch(filters: Dict[str, Any], **kwargs):
+    rows = index_ids_batch(filters, **kwargs)
+    if rows is None:
+        rows = await get_advert_ids_batch(filters, **kwargs)
+    return rows
+
+
+async def _load_batch(filters: Dict[str, Any], deck: Dict[str, Any]) -> Dict[str, Any]:
+    deck = dict(deck, ids=[])
+
+    while len(deck["ids"]) < DECK_BATCH_SIZE and not deck["done"]:
+        limit = DECK_BATCH_SIZE - len(deck["ids"])
+
+        if not deck["wrapped"]:
+            rows = await _ids_batch(filters, after_key=deck["cursor"], limit=limit)
+        else:
+            rows = await _ids_batch(
+                filters, after_key=deck["cursor"], before_key=deck["pivot"], limit=limit
+            )
+
+        if rows:
+            deck["cursor"] = rows[-1][1]
+            deck["ids"].extend(row[0] for row in rows)
+
+        if len(rows) < limit:
+            if deck["wrapped"]:
+                deck["done"] = True
+            else:
+                deck["wrapped"] = True
+                deck["cursor"] = None
+
+    random.shuffle(deck["ids"])
+    return deck
+
+
+def _merge(deck: Dict[str, Any], loaded: Dict[str, Any]) -> Dict[str, Any]:
+    return dict(loaded, ids=deck["ids"] + loaded["ids"])
+
+
+def _cancel_refill(user_id: int):
+    pending = _refills.pop(user_id, None)
+    if pending:
+        pending[1].cancel()
+
+
+async def _take_refill(user_id: int, deck: Dict[str, Any], wait: bool) -> Dict[str, Any]:
+    pending = _refills.get(user_id)
+    if not pending:
+        return deck
+
+    signature, task = pending
+    if signature != deck["signature"]:
+        _cancel_refill(user_id)
+        return deck
+
+    if not task.done() and not wait:
+        return deck
+
+    _refills.pop(user_id, None)
+    try:
+        loaded = await task
+    except Exception as e:
+        print(f"Ошибка догрузки колоды: {e}")
+        return deck
+
+    return _merge(deck, loaded)
+
+
+async def next_advert_id(state: FSMContext, user_id: int, filters: Dict[str, Any]) -> Optional[int]:
+    data = await state.get_data()
+    deck = data.get("feed_deck")
+    signature = filters_signature(filters)
+
+    if not deck or deck.get("signature") != signature:
+        _cancel_refill(user_id)
+        deck = _new_deck(signature)
+
+    deck = await _take_refill(user_id, deck, wait=not deck["ids"])
+
+    if not deck["ids"]:
+        if deck["done"]:
+            # все подходящие объявления просмотрены - начинаем новый круг
+            deck = _new_deck(signature)
+        deck = _merge(deck, await _load_batch(filters, deck))
+
+    if not deck["ids"]:
+        await state.update_data(feed_deck=deck)
+        return None
+
+    advert_id = deck["ids"].pop(0)
+
+    if len(deck["ids"]) <= DECK_LOW_WATERMARK and not deck["done"] and user_id not in _refills:
+        task = asyncio.create_task(_load_batch(filters, deck))
+        _refills[user_id] = (signature, task)
+
+    await state.update_data(feed_deck=deck)
+    return advert_id
@@ -0,0 +1,197 @@
+"""
+Хранилище FSM aiogram в базе.
+
+Черновики объявлений, текущее объявление ленты и данные оплаты живут в FSM,
+поэтому в памяти процесса они терялись при перезапуске. DbStorage держит
+записи в таблице fsm_storage, а чтобы каждый свайп не стоил запроса:
+- последние записи лежат в кэше процесса, чтения идут из него;
+- изменения только помечают ключ, через FSM_FLUSH_INTERVAL все помеченные
+  ключи пишутся одним пакетным upsert, так что серия update_data по одному
+  пользователю превращается в одну запись.
+Кэш процесса не знает об изменениях из других процессов, поэтому
+пользователь должен обрабатываться одним процессом (см. роутинг по user_id).
+При остановке диспетчер закрывает хранилище, и close дописывает всё в базу.
+
+Данные пишутся как JSON. Decimal, datetime и date сохраняются с пометкой
+типа и читаются обратно тем же типом, остальные не-JSON значения set_data
+отклоняет с TypeError сразу, а не при фоновой записи.
+"""
+import asyncio
+import json
+from collections import OrderedDict
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Mapping, Optional, Set
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, StateType, StorageKey
+from tortoise import Tortoise
+
+from app.db.models import FsmRecord
+
+FSM_CACHE_SIZE = 10000
+FSM_FLUSH_INTERVAL = 0.5
+
+_UPSERT_SQL = {
+    "postgres": (
+        'INSERT INTO "fsm_storage" ("key", "state", "data", "updated_at") '
+        'VALUES ($1, $2, $3::jsonb, CURRENT_TIMESTAMP) '
+        'ON CONFLICT ("key") DO UPDATE SET "state" = EXCLUDED."state", '
+        '"data" = EXCLUDED."data", "updated_at" = EXCLUDED."updated_at"'
+    ),
+    "sqlite": (
+        'INSERT INTO "fsm_storage" ("key", "state", "data", "updated_at") '
+        'VALUES (?, ?, ?, CURRENT_TIMESTAMP) '
+        'ON CONFLICT ("key") DO UPDATE SET "state" = excluded."state", '
+        '"data" = excluded."data", "updated_at" = excluded."updated_at"'
+    ),
+}
+
+
+def _encode(value):
+    if isinstance(value, Decimal):
+        return {"__decimal__": str(value)}
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    if isinstance(value, date):
+        return {"__date__": value.isoformat()}
+    raise TypeError(f"FSM: нельзя сохранить значение типа {type(value).__name__}")
+
+
+_DECODERS = {
+    "__decimal__": Decimal,
+    "__datetime__": datetime.fromisoformat,
+    "__date__": date.fromisoformat,
+}
+
+
+def _decode(value):
+    if isinstance(value, dict):
+        if len(value) == 1:
+            (tag, raw), = value.items()
+            if tag in _DECODERS:
+                return _DECODERS[tag](raw)
+        return {key: _decode(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_decode(item) for item in value]
+    return value
+
+
+def _dumps(data: Dict[str, Any]) -> str:
+    return json.dumps(data, ensure_ascii=False, default=_encode)
+
+
+class _Record:
+    __slots__ = ("state", "data")
+
+    def __init__(self, state: Optional[str] = None, data: Optional[Dict[str, Any]] = None):
+        self.state = state
+        self.data = data or {}
+
+
+class DbStorage(BaseStorage):
+    def __init__(self, cache_size: int = FSM_CACHE_SIZE, flush_interval: float = FSM_FLUSH_INTERVAL):
+        self.cache_size = cache_size
+        self.flush_interval = flush_interval
+        self.key_builder = DefaultKeyBuilder(with_bot_id=True, with_destiny=True)
+
+        self._cache: "OrderedDict[str, _Record]" = OrderedDict()
+        self._dirty: Set[str] = set()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        # счётчики для бенчмарка и отладки
+        self.reads = 0
+        self.writes = 0
+
+    def _remember(self, key: str, record: _Record):
+        self._cache[key] = record
+        self._cache.move_to_end(key)
+        if len(self._cache) <= self.cache_size:
+            return
+        # несохранённые записи не вытесняем - они уйдут в базу при ближайшей записи
+        for old_key in list(self._cache):
+            if len(self._cache) <= self.cache_size:
+                break
+            if old_key not in self._dirty:
+                del self._cache[old_key]
+
+    async def _record(self, key: StorageKey) -> _Record:
+        raw_key = self.key_builder.build(key)
+        record = self._cache.get(raw_key)
+        if record is not None:
+            self._cache.move_to_end(raw_key)
+            return record
+
+        self.reads += 1
+        row = await FsmRecord.get_or_none(key=raw_key)
+        # пока шёл запрос, запись могли изменить - тогда в кэше уже свежее значение
+        record = self._cache.get(raw_key)
+        if record is None:
+            record = _Record(row.state, _decode(row.data)) if row else _Record()
+            self._remember(raw_key, record)
+        return record
+
+    def _mark_dirty(self, key: StorageKey):
+        self._dirty.add(self.key_builder.build(key))
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.flush_interval)
+        self._flush_task = None
+        await self.flush()
+
+    async def flush(self):
+        async with self._flush_lock:
+            if not self._dirty:
+                return
+            keys, self._dirty = self._dirty, set()
+
+            upserts: List[tuple] = []
+            deletes: List[str] = []
+            for key in keys:
+                record = self._cache.get(key)
+                if record is None or (record.state is None and not record.data):
+                    deletes.append(key)
+                else:
+                    try:
+                        upserts.append((key, record.state, _dumps(record.data)))
+                    except TypeError as e:
+                        # данные поменяли в обход set_data - повтор записи не поможет
+                        print(f"Ошибка записи FSM {key}: {e}")
+
+            try:
+                conn = Tortoise.get_connection("default")
+                if upserts:
+                    await conn.execute_many(_UPSERT_SQL[conn.capabilities.dialect], upserts)
+                if deletes:
+                    await FsmRecord.filter(key__in=deletes).delete()
+                self.writes += len(keys)
+            except Exception as e:
+                print(f"Ошибка записи FSM: {e}")
+                self._dirty |= keys
+                if self._flush_task is None:
+                    self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        record = await self._record(key)
+        record.state = state.state if isinstance(state, State) else state
+        self._mark_dirty(key)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return (await self._record(key)).state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        _dumps(data)  # TypeError здесь, в обработчике, а не при фоновой записи
+        record = await self._record(key)
+        record.data = dict(data)
+        self._mark_dirty(key)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        return (await self._record(key)).data.copy()
+
+    async def close(self) -> None:
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        await self.flush()
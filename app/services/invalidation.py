@@ -0,0 +1,105 @@
+"""
+Сброс кэшей во всех процессах бота.
+
+Кэши настроек, статусов пользователей и выборок живут в памяти процесса.
+Когда процессов несколько (WORKER_PROCESSES > 1 или несколько контейнеров),
+процесс, который что-то изменил, шлёт notify(kind, ...) через Postgres
+NOTIFY, а остальные слушают канал и вызывают обработчики, повешенные через
+on_invalidate. Собственные сообщения процесс пропускает - у себя он уже всё
+сбросил. После переподключения слушателя обработчики вызываются без данных,
+то есть со сбросом всего кэша: сообщения за время разрыва потеряны.
+На SQLite (разработка, один процесс) всё это ничего не делает.
+"""
+import asyncio
+import json
+import os
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from tortoise import Tortoise
+
+CHANNEL = "carbot_invalidate"
+RECONNECT_DELAY = 5
+
+_handlers: Dict[str, List[Callable[[Dict[str, Any]], Awaitable[Any]]]] = {}
+_listener: Optional[asyncio.Task] = None
+_tasks = set()
+
+
+def on_invalidate(kind: str, handler: Callable[[Dict[str, Any]], Awaitable[Any]]):
+    _handlers.setdefault(kind, []).append(handler)
+
+
+def _is_postgres() -> bool:
+    try:
+        return Tortoise.get_connection("default").capabilities.dialect == "postgres"
+    except Exception:
+        return False
+
+
+async def notify(kind: str, **payload):
+    if not _is_postgres():
+        return
+    message = json.dumps({"kind": kind, "pid": os.getpid(), **payload})
+    try:
+        await Tortoise.get_connection("default").execute_query(
+            "SELECT pg_notify($1, $2)", [CHANNEL, message]
+        )
+    except Exception as e:
+        print(f"Не удалось разослать сброс кэша {kind}: {e}")
+
+
+async def _run_handlers(kind: str, payload: Dict[str, Any]):
+    for handler in _handlers.get(kind, []):
+        try:
+            await handler(payload)
+        except Exception as e:
+            print(f"Ошибка сброса кэша {kind}: {e}")
+
+
+def _on_message(connection, pid, channel, raw: str):
+    try:
+        message = json.loads(raw)
+    except ValueError:
+        return
+    if message.pop("pid", None) == os.getpid():
+        return
+    task = asyncio.create_task(_run_handlers(message.pop("kind", ""), message))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
+
+async def _listen(dsn: str):
+    import asyncpg
+
+    first = True
+    while True:
+        try:
+            connection = await asyncpg.connect(dsn)
+        except Exception as e:
+            print(f"Слушатель сброса кэшей не подключился: {e}")
+            await asyncio.sleep(RECONNECT_DELAY)
+            continue
+
+        try:
+            await connection.add_listener(CHANNEL, _on_message)
+            if not first:
+                for kind in _handlers:
+                    await _run_handlers(kind, {})
+            first = False
+            while not connection.is_closed():
+                await asyncio.sleep(RECONNECT_DELAY)
+        except Exception as e:
+            print(f"Слушатель сброса кэшей отключился: {e}")
+        finally:
+            if not connection.is_closed():
+                await connection.close()
+        await asyncio.sleep(RECONNECT_DELAY)
+
+
+async def start_invalidation_listener():
+    global _listener
+    from app.config import DB_URL
+
+    if _listener is not None or not _is_postgres():
+        return
+    _listener = asyncio.create_task(_listen(DB_URL))
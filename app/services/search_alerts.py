@@ -0,0 +1,227 @@
+"""
+Оповещения по сохранённым поискам.
+
+Когда объявление одобрено, нужно найти всех, чей сохранённый поиск под него
+подходит. Вместо прогона каждого фильтра держим в памяти инвертированный
+индекс: для каждого точного поля (город, марка, топливо...) - какие поиски
+требуют такое значение, а под ключом None - какие поле не ограничивают.
+Кандидаты - пересечение по всем полям, диапазоны (год, пробег, цена, объём)
+досчитываются уже только для кандидатов. Индекс пересобирается лениво, когда
+меняется crud_advert.saved_searches_version - в том числе когда поиск сохранили
+в другом процессе (notify("saved_searches")).
+
+Оповещения получают только активные пользователи, не заблокировавшие бота.
+Отправка идёт порциями; на TelegramRetryAfter пауза ставится для всей
+рассылки, а не отправленные в порции уходят ещё раз.
+"""
+import asyncio
+from collections import defaultdict
+from typing import Any, Dict, Optional, Set
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramForbiddenError, TelegramRetryAfter
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+
+from app.db import crud_advert
+from app.db.crud_advert import _normalize_filters, get_alert_searches
+from app.db.models import Advert, User
+from app.other import _format_price, parse_engine_volume
+from app.services.cars_data import car_name_keys
+
+# поля с точным совпадением; city сравнивается без учёта регистра
+EXACT_FIELDS = (
+    "city", "brand_key", "model_key", "condition", "fuel_type",
+    "transmission", "body_type", "color",
+)
+
+ALERT_BATCH_SIZE = 25
+ALERT_BATCH_INTERVAL = 1.0
+
+_tasks: Set[asyncio.Task] = set()
+
+
+def _as_int(value) -> Optional[int]:
+    try:
+        return int(str(value).strip())
+    except (ValueError, TypeError):
+        return None
+
+
+def _as_float(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def _search_keys(search: Dict[str, Any]) -> Dict[str, Any]:
+    keys = {field: search.get(field) or None for field in EXACT_FIELDS}
+    if keys["city"]:
+        keys["city"] = keys["city"].upper()
+    if search.get("name"):
+        keys["brand_key"], keys["model_key"] = car_name_keys(search["name"])
+    return keys
+
+
+def _advert_keys(advert: Advert) -> Dict[str, Any]:
+    keys = {field: getattr(advert, field, None) for field in EXACT_FIELDS}
+    if keys["city"]:
+        keys["city"] = keys["city"].upper()
+    return keys
+
+
+def _matches(search: Dict[str, Any], advert: Advert) -> bool:
+    # остаток условий crud_advert._build_adverts_queryset, не покрытый индексом
+    filters = _normalize_filters({k: v for k, v in search.items() if v is not None})
+
+    name = filters.get("name")
+    if name and not car_name_keys(name)[0]:
+        if name.strip().lower() not in (advert.name or "").lower():
+            return False
+
+    if "year" in filters:
+        year = _as_int(filters.get("year") or None)
+        if year is not None and advert.year != year:
+            return False
+    else:
+        year_from = _as_int(filters.get("year_from"))
+        year_to = _as_int(filters.get("year_to"))
+        if year_from is not None and advert.year < year_from:
+            return False
+        if year_to is not None and advert.year > year_to:
+            return False
+
+    for field, cast in (("mileage", _as_int), ("price", _as_float)):
+        value = cast(getattr(advert, field))
+        low = cast(filters.get(f"{field}_from"))
+        high = cast(filters.get(f"{field}_to"))
+        if low is not None and (value is None or value < low):
+            return False
+        if high is not None and (value is None or value > high):
+            return False
+
+    engine_volume_max = parse_engine_volume(filters.get("engine_volume_max"))
+    if engine_volume_max:
+        if advert.engine_volume_liters is None or advert.engine_volume_liters > engine_volume_max:
+            return False
+
+    return True
+
+
+class SavedSearchIndex:
+    def __init__(self):
+        self.version = None
+        self._searches: Dict[int, Dict[str, Any]] = {}
+        self._postings: Dict[str, Dict[Any, Set[int]]] = {}
+
+    async def refresh(self):
+        version = crud_advert.saved_searches_version
+        if self.version == version:
+            return
+
+        searches = await get_alert_searches()
+        postings = {field: defaultdict(set) for field in EXACT_FIELDS}
+        for search in searches:
+            for field, value in _search_keys(search).items():
+                postings[field][value].add(search["id"])
+
+        self._searches = {search["id"]: search for search in searches}
+        self._postings = postings
+        self.version = version
+
+    def candidates(self, advert: Advert) -> Set[int]:
+        sets = []
+        for field, value in _advert_keys(advert).items():
+            field_postings = self._postings[field]
+            matched = field_postings.get(None, set())
+            if value is not None:
+                matched = matched | field_postings.get(value, set())
+            sets.append(matched)
+
+        if not sets:
+            return set()
+        sets.sort(key=len)
+        result = set(sets[0])
+        for matched in sets[1:]:
+            if not result:
+                break
+            result &= matched
+        return result
+
+    def match(self, advert: Advert) -> Dict[int, str]:
+        # user_id -> название первого подошедшего поиска
+        users: Dict[int, str] = {}
+        for search_id in sorted(self.candidates(advert)):
+            search = self._searches[search_id]
+            if search["user_id"] == advert.owner_id or search["user_id"] in users:
+                continue
+            if _matches(search, advert):
+                users[search["user_id"]] = search["title"] or "Сохранённый поиск"
+        return users
+
+
+saved_search_index = SavedSearchIndex()
+
+
+def _alert_kb(advert_id: int):
+    builder = InlineKeyboardBuilder()
+    builder.button(text="Открыть", callback_data=f"list_open_{advert_id}")
+    return builder.as_markup()
+
+
+async def _send_alert(bot: Bot, user_id: int, text: str, advert_id: int) -> float:
+    # 0 - готово, иначе сколько ждать перед повтором (RetryAfter)
+    try:
+        await bot.send_message(user_id, text, reply_markup=_alert_kb(advert_id))
+    except TelegramRetryAfter as e:
+        return e.retry_after
+    except TelegramForbiddenError:
+        await User.filter(id=user_id).update(bot_blocked=True)
+    except Exception as e:
+        print(f"Не удалось отправить оповещение {user_id}: {e}")
+    return 0
+
+
+async def _send_alerts(bot: Bot, advert: Advert, users: Dict[int, str]):
+    pending = list(users.items())
+    retried: Set[int] = set()
+    while pending:
+        batch, pending = pending[:ALERT_BATCH_SIZE], pending[ALERT_BATCH_SIZE:]
+        pauses = await asyncio.gather(*(
+            _send_alert(
+                bot,
+                user_id,
+                f"🔔 Новое объявление по поиску «{title}»:\n\n"
+                f"{advert.name}, {advert.year} г.\n"
+                f"📍 {advert.city}\n"
+                f"💰 {_format_price(advert.price)} ₽",
+                advert.id,
+            )
+            for user_id, title in batch
+        ))
+        # флуд-контроль считает сообщения бота целиком - ждём всей порцией
+        retry = [item for item, pause in zip(batch, pauses) if pause and item[0] not in retried]
+        retried.update(user_id for user_id, _ in retry)
+        pending = retry + pending
+        if pending:
+            await asyncio.sleep(max(ALERT_BATCH_INTERVAL, *pauses))
+
+
+async def notify_saved_searches(bot: Bot, advert: Advert) -> int:
+    try:
+        await saved_search_index.refresh()
+        users = saved_search_index.match(advert)
+        if users:
+            recipients = await User.filter(
+                id__in=list(users), status="active", bot_blocked=False
+            ).values_list("id", flat=True)
+            users = {user_id: users[user_id] for user_id in recipients}
+    except Exception as e:
+        print(f"Ошибка подбора оповещений: {e}")
+        return 0
+
+    if users:
+        task = asyncio.create_task(_send_alerts(bot, advert, users))
+        _tasks.add(task)
+        task.add_done_callback(_tasks.discard)
+    return len(users)
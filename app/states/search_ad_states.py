@@ -13,6 +13,4 @@ class SearchAdStates(StatesGroup):
     waiting_filter_transmission = State()
     waiting_filter_body_type = State()
     waiting_filter_color = State()
-
-
-
+    waiting_words_query = State()
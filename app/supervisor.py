@@ -0,0 +1,204 @@
+"""
+Несколько процессов-обработчиков (WORKER_PROCESSES > 1).
+
+Главный процесс только принимает обновления - вебхуком (BOT_MODE=webhook)
+или одним поллером getUpdates - и раздаёт их воркерам по crc32 от id
+пользователя (webhook.shard_for). Все обновления одного пользователя
+попадают в один процесс и в нём идут по порядку, поэтому кэши FSM и
+фильтров пользователя живут только в его процессе.
+
+Связь с воркерами - unix-сокет на каждый процесс, обновления идут строками
+JSON. Воркер обрабатывает их через ту же UpdatePipeline, что и вебхук.
+Когда главный процесс останавливается, он закрывает сокеты, воркеры
+дообрабатывают принятое и завершаются. Если воркер упал, останавливается
+вся группа - перезапуск остаётся за docker.
+"""
+import asyncio
+import json
+import multiprocessing
+import os
+import signal
+import tempfile
+from typing import Any, Callable, Dict, List, Optional
+
+from aiogram import Bot, Dispatcher
+
+from app.config import BOT_MODE, IPC_DIR, WEBHOOK_DRAIN_TIMEOUT, WORKER_PROCESSES
+from app.webhook import UpdatePipeline, shard_for, start_webhook_server, stop_event
+
+POLLING_TIMEOUT = 30
+CONNECT_TIMEOUT = 60
+
+
+class WorkerPool:
+    def __init__(self, paths: List[str]):
+        self.paths = paths
+        self.draining = False
+        self._writers: List[asyncio.StreamWriter] = []
+
+    async def connect(self):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + CONNECT_TIMEOUT
+        for path in self.paths:
+            while True:
+                try:
+                    _, writer = await asyncio.open_unix_connection(path)
+                    break
+                except (FileNotFoundError, ConnectionRefusedError):
+                    if loop.time() > deadline:
+                        raise
+                    await asyncio.sleep(0.2)
+            self._writers.append(writer)
+
+    async def submit(self, raw: Dict[str, Any]) -> bool:
+        if self.draining:
+            return False
+        writer = self._writers[shard_for(raw, len(self._writers))]
+        try:
+            writer.write(json.dumps(raw, ensure_ascii=False).encode() + b"\n")
+            # очередь воркера заполнена - ждём, пока он разберёт сокет
+            await writer.drain()
+        except ConnectionError as e:
+            print(f"Воркер недоступен: {e}")
+            return False
+        return True
+
+    async def drain(self):
+        self.draining = True
+        for writer in self._writers:
+            writer.close()
+        await asyncio.gather(*(writer.wait_closed() for writer in self._writers), return_exceptions=True)
+
+
+async def _poll(bot: Bot, pool: WorkerPool):
+    offset: Optional[int] = None
+    try:
+        while True:
+            try:
+                updates = await bot.get_updates(offset=offset, timeout=POLLING_TIMEOUT)
+            except Exception as e:
+                print(f"Ошибка getUpdates: {e}")
+                await asyncio.sleep(1)
+                continue
+
+            for update in updates:
+                raw = update.model_dump(mode="json", exclude_unset=True, by_alias=True)
+                if not await pool.submit(raw):
+                    # не принято - offset не двигаем, Telegram отдаст обновление снова
+                    if pool.draining:
+                        return
+                    await asyncio.sleep(1)
+                    break
+                offset = update.update_id + 1
+    finally:
+        if offset is not None:
+            # подтверждаем Telegram уже разосланные обновления, иначе после перезапуска придут снова
+            try:
+                await bot.get_updates(offset=offset, timeout=0, limit=1)
+            except Exception as e:
+                print(f"Ошибка getUpdates: {e}")
+
+
+async def _watch(processes: List[multiprocessing.Process], stop: asyncio.Event):
+    while not stop.is_set():
+        dead = [process for process in processes if not process.is_alive()]
+        if dead:
+            print(f"Воркер {dead[0].name} завершился с кодом {dead[0].exitcode}, останавливаемся")
+            stop.set()
+            return
+        await asyncio.sleep(1)
+
+
+async def run_supervisor(worker_target: Callable[[str], None], bot: Bot):
+    # worker_target(socket_path) запускается в отдельном процессе и обрабатывает обновления из сокета
+    ipc_dir = IPC_DIR or tempfile.mkdtemp(prefix="carbot-")
+    os.makedirs(ipc_dir, exist_ok=True)
+    paths = [os.path.join(ipc_dir, f"worker-{index}.sock") for index in range(WORKER_PROCESSES)]
+
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(target=worker_target, args=(path,), name=f"worker-{index}")
+        for index, path in enumerate(paths)
+    ]
+    for process in processes:
+        process.start()
+
+    pool = WorkerPool(paths)
+    await pool.connect()
+    print(f"Запущено воркеров: {len(processes)}")
+
+    stop = stop_event()
+    watcher = asyncio.create_task(_watch(processes, stop))
+    runner = None
+    poller = None
+    try:
+        if BOT_MODE == "webhook":
+            runner = await start_webhook_server(pool, bot)
+        else:
+            await bot.delete_webhook()
+            poller = asyncio.create_task(_poll(bot, pool))
+        await stop.wait()
+    finally:
+        print("Остановка: воркеры дообрабатывают принятые обновления")
+        if poller is not None:
+            poller.cancel()
+            await asyncio.gather(poller, return_exceptions=True)
+        await pool.drain()
+        if runner is not None:
+            await runner.cleanup()
+        watcher.cancel()
+
+        for process in processes:
+            await asyncio.to_thread(process.join, WEBHOOK_DRAIN_TIMEOUT + 5)
+            if process.is_alive():
+                process.terminate()
+        await bot.session.close()
+
+
+async def _watch_parent(parent_pid: int, closed: asyncio.Event):
+    while os.getppid() == parent_pid:
+        await asyncio.sleep(1)
+    print("Главный процесс завершился, останавливаем воркер")
+    closed.set()
+
+
+async def run_worker(dp: Dispatcher, bot: Bot, socket_path: str):
+    async def handle(raw: Dict[str, Any]):
+        await dp.feed_raw_update(bot, raw)
+
+    pipeline = UpdatePipeline(handle)
+    pipeline.start()
+    closed = asyncio.Event()
+
+    async def on_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            await pipeline.submit(json.loads(line), timeout=None)
+        writer.close()
+        closed.set()
+
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    server = await asyncio.start_unix_server(on_connection, socket_path, limit=2 ** 22)
+
+    workflow_data = {"dispatcher": dp, "bot": bot, **dp.workflow_data}
+    await dp.emit_startup(**workflow_data)
+
+    # SIGINT из терминала приходит всей группе процессов - его пропускаем и ждём,
+    # пока главный процесс закроет сокет; SIGTERM или смерть главного процесса - выходим
+    loop = asyncio.get_running_loop()
+    loop.add_signal_handler(signal.SIGINT, lambda: None)
+    loop.add_signal_handler(signal.SIGTERM, closed.set)
+    watcher = asyncio.create_task(_watch_parent(os.getppid(), closed))
+    try:
+        await closed.wait()
+    finally:
+        watcher.cancel()
+        server.close()
+        await pipeline.drain()
+        await dp.emit_shutdown(**workflow_data)
+        await bot.session.close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
@@ -0,0 +1,175 @@
+"""
+Приём обновлений через вебхук (BOT_MODE=webhook).
+
+aiohttp сервер принимает POST от Telegram и кладёт обновление в очередь
+UpdatePipeline, ответ уходит сразу, не дожидаясь обработки. Очередей
+WEBHOOK_WORKERS, у каждой свой обработчик, а очередь выбирается по id
+пользователя - так обновления одного пользователя идут строго по порядку,
+разные пользователи обрабатываются параллельно, а общее число одновременно
+обрабатываемых обновлений ограничено. Когда очереди заполнены, сервер
+отвечает 503 и Telegram повторит доставку позже.
+
+При остановке (SIGTERM/SIGINT) сервер перестаёт принимать обновления,
+дожидается обработки уже принятых (не дольше WEBHOOK_DRAIN_TIMEOUT) и только
+потом закрывает хранилище FSM и сессию бота. Вебхук при этом не снимается:
+пока бот перезапускается, Telegram копит обновления у себя.
+
+Без WEBHOOK_URL setWebhook не вызывается - сервер можно поднять локально
+и отправлять ему записанные обновления (benchmarks/replay_updates.py).
+"""
+import asyncio
+import signal
+import zlib
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from aiogram import Bot, Dispatcher
+from aiohttp import web
+
+from app.config import (
+    WEBHOOK_DRAIN_TIMEOUT,
+    WEBHOOK_HOST,
+    WEBHOOK_PATH,
+    WEBHOOK_PORT,
+    WEBHOOK_QUEUE_SIZE,
+    WEBHOOK_SECRET,
+    WEBHOOK_URL,
+    WEBHOOK_WORKERS,
+)
+
+# сколько ждать места в очереди, прежде чем ответить 503
+ENQUEUE_TIMEOUT = 5
+
+
+def update_shard_key(raw: Dict[str, Any]) -> int:
+    # id пользователя из любого типа обновления, без разбора в модели aiogram
+    for name, event in raw.items():
+        if name == "update_id" or not isinstance(event, dict):
+            continue
+        sender = event.get("from") or event.get("user") or event.get("chat")
+        if isinstance(sender, dict) and sender.get("id") is not None:
+            return int(sender["id"])
+    return int(raw.get("update_id", 0))
+
+
+def shard_for(raw: Dict[str, Any], shards: int) -> int:
+    # crc32, а не hash(): одинаковый результат во всех процессах
+    return zlib.crc32(str(update_shard_key(raw)).encode()) % shards
+
+
+class UpdatePipeline:
+    def __init__(
+            self,
+            handle: Callable[[Dict[str, Any]], Awaitable[Any]],
+            workers: int = WEBHOOK_WORKERS,
+            queue_size: int = WEBHOOK_QUEUE_SIZE,
+    ):
+        self.handle = handle
+        self.draining = False
+        per_worker = max(1, queue_size // workers)
+        self._queues: List[asyncio.Queue] = [asyncio.Queue(maxsize=per_worker) for _ in range(workers)]
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self):
+        self._tasks = [asyncio.create_task(self._worker(queue)) for queue in self._queues]
+
+    def pending(self) -> int:
+        return sum(queue.qsize() for queue in self._queues)
+
+    async def submit(self, raw: Dict[str, Any], timeout: Optional[float] = ENQUEUE_TIMEOUT) -> bool:
+        if self.draining:
+            return False
+        queue = self._queues[shard_for(raw, len(self._queues))]
+        try:
+            await asyncio.wait_for(queue.put(raw), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    async def _worker(self, queue: asyncio.Queue):
+        while True:
+            raw = await queue.get()
+            try:
+                await self.handle(raw)
+            except Exception as e:
+                print(f"Ошибка обработки обновления {raw.get('update_id')}: {e}")
+            finally:
+                queue.task_done()
+
+    async def drain(self, timeout: float = WEBHOOK_DRAIN_TIMEOUT):
+        self.draining = True
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(queue.join() for queue in self._queues)), timeout
+            )
+        except asyncio.TimeoutError:
+            print(f"Не дождались обработки {self.pending()} обновлений")
+
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+def _webhook_handler(pipeline: UpdatePipeline):
+    async def handler(request: web.Request) -> web.Response:
+        if WEBHOOK_SECRET and request.headers.get("X-Telegram-Bot-Api-Secret-Token") != WEBHOOK_SECRET:
+            return web.Response(status=401)
+        if pipeline.draining:
+            return web.Response(status=503)
+
+        try:
+            raw = await request.json()
+        except ValueError:
+            return web.Response(status=400)
+
+        if not await pipeline.submit(raw):
+            return web.Response(status=503)
+        return web.Response()
+
+    return handler
+
+
+async def start_webhook_server(pipeline, bot: Bot, allowed_updates: Optional[List[str]] = None) -> web.AppRunner:
+    # pipeline - UpdatePipeline или любой объект с draining и submit(raw)
+    app = web.Application()
+    app.router.add_post(WEBHOOK_PATH, _webhook_handler(pipeline))
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, WEBHOOK_HOST, WEBHOOK_PORT).start()
+
+    if WEBHOOK_URL:
+        await bot.set_webhook(
+            WEBHOOK_URL.rstrip("/") + WEBHOOK_PATH,
+            secret_token=WEBHOOK_SECRET,
+            allowed_updates=allowed_updates,
+        )
+    print(f"Вебхук слушает {WEBHOOK_HOST}:{WEBHOOK_PORT}{WEBHOOK_PATH}")
+    return runner
+
+
+def stop_event() -> asyncio.Event:
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+    return stop
+
+
+async def run_webhook(dp: Dispatcher, bot: Bot):
+    async def handle(raw: Dict[str, Any]):
+        await dp.feed_raw_update(bot, raw)
+
+    pipeline = UpdatePipeline(handle)
+    pipeline.start()
+
+    workflow_data = {"dispatcher": dp, "bot": bot, **dp.workflow_data}
+    await dp.emit_startup(**workflow_data)
+    runner = await start_webhook_server(pipeline, bot, dp.resolve_used_update_types())
+
+    try:
+        await stop_event().wait()
+    finally:
+        print("Остановка: дожидаемся обработки принятых обновлений")
+        await pipeline.drain()
+        await runner.cleanup()
+        await dp.emit_shutdown(**workflow_data)
+        await bot.session.close()
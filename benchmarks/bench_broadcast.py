@@ -0,0 +1,99 @@
+"""
+Пропускная способность рассылки на подставном боте.
+
+    python -m benchmarks.bench_broadcast
+    python -m benchmarks.bench_broadcast --users 100000 --rate 30 --latency 0.15
+
+Бот не ходит в Telegram: каждая отправка ждёт --latency секунд, часть
+получателей "заблокировала бота", а на --flood-at отправке один раз приходит
+RetryAfter. Сравнивается старый цикл (по одному сообщению, с ожиданием
+ответа) и BroadcastSender с ограничением --rate сообщений в секунду.
+Для старого цикла меряются первые 200 получателей, время на всех
+досчитывается. Пользователи создаются во временной SQLite базе.
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+
+from aiogram.exceptions import TelegramForbiddenError, TelegramRetryAfter
+from aiogram.methods import SendMessage
+from tortoise import Tortoise
+
+from app.db.models import User
+from app.services.broadcast import BroadcastSender
+from app.services.broadcast_segments import iter_segment_ids
+
+
+class FakeBot:
+    def __init__(self, latency: float, blocked_every: int, flood_at: int):
+        self.latency = latency
+        self.blocked_every = blocked_every
+        self.flood_at = flood_at
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def send_message(self, chat_id: int, text: str):
+        self.calls += 1
+        method = SendMessage(chat_id=chat_id, text=text)
+        if self.calls == self.flood_at:
+            raise TelegramRetryAfter(method=method, message="Too Many Requests", retry_after=2)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.in_flight -= 1
+        if chat_id % self.blocked_every == 0:
+            raise TelegramForbiddenError(method=method, message="Forbidden: bot was blocked by the user")
+
+
+async def sequential(bot: FakeBot, user_ids) -> float:
+    started = time.perf_counter()
+    for user_id in user_ids:
+        try:
+            await bot.send_message(user_id, "test")
+        except Exception:
+            pass
+    return time.perf_counter() - started
+
+
+async def run(users: int, rate: float, latency: float, flood_at: int):
+    await Tortoise.init(db_url=f"sqlite://{tempfile.mkdtemp()}/bench.sqlite3", modules={"models": ["app.db.models"]})
+    await Tortoise.generate_schemas()
+    try:
+        await User.bulk_create([User(id=user_id) for user_id in range(1, users + 1)], batch_size=5000)
+
+        sample = min(users, 200)
+        old = await sequential(FakeBot(latency, 20, 0), range(1, sample + 1)) * users / sample
+
+        bot = FakeBot(latency, 20, flood_at)
+        sender = BroadcastSender(bot, "test", rate=rate)
+        started = time.perf_counter()
+        await sender.run(iter_segment_ids(None))
+        new = time.perf_counter() - started
+
+        print(f"получателей {users}, задержка ответа {latency * 1000:.0f} мс, лимит {rate:.0f} в секунду")
+        print(f"{'по одному':<18} | {old / 60:>8.1f} мин (оценка)")
+        print(f"{'BroadcastSender':<18} | {new / 60:>8.1f} мин, {users / new:.1f} в секунду")
+        print(
+            f"доставлено {sender.sent}, заблокировали {sender.blocked}, ошибок {sender.failed}, "
+            f"запросов {bot.calls}, одновременно до {bot.max_in_flight}"
+        )
+    finally:
+        await Tortoise.close_connections()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--rate", type=float, default=1000)
+    parser.add_argument("--latency", type=float, default=0.15)
+    parser.add_argument("--flood-at", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(run(args.users, args.rate, args.latency, args.flood_at))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Отправка записанных обновлений на локальный вебхук.
+
+    BOT_MODE=webhook python app/main.py
+    python -m benchmarks.replay_updates --file updates.jsonl
+    python -m benchmarks.replay_updates --synthetic 5000 --users 200 --concurrency 100
+
+В файле по одному обновлению Telegram (JSON) в строке. Без файла
+генерируются текстовые сообщения от --users пользователей. Скрипт
+показывает, сколько обновлений принято, коды ответов и время ответа
+вебхука - оно не включает обработку, та идёт в очереди на сервере.
+Если сервер запущен с WEBHOOK_SECRET, он же берётся из окружения.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from collections import Counter
+from typing import Any, Dict, List
+
+import aiohttp
+
+from app.config import WEBHOOK_PATH, WEBHOOK_PORT
+
+
+def load_updates(path: str) -> List[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def synthetic_updates(count: int, users: int) -> List[Dict[str, Any]]:
+    updates = []
+    for update_id in range(1, count + 1):
+        user_id = random.randint(1, users)
+        user = {"id": user_id, "is_bot": False, "first_name": f"user{user_id}"}
+        updates.append({
+            "update_id": update_id,
+            "message": {
+                "message_id": update_id,
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private", "first_name": user["first_name"]},
+                "from": user,
+                "text": "/start",
+            },
+        })
+    return updates
+
+
+async def replay(url: str, updates: List[Dict[str, Any]], concurrency: int):
+    headers = {}
+    if os.getenv("WEBHOOK_SECRET"):
+        headers["X-Telegram-Bot-Api-Secret-Token"] = os.getenv("WEBHOOK_SECRET")
+
+    statuses = Counter()
+    latencies = []
+    queue = asyncio.Queue()
+    for update in updates:
+        queue.put_nowait(update)
+
+    async def sender(session: aiohttp.ClientSession):
+        while not queue.empty():
+            update = queue.get_nowait()
+            started = time.perf_counter()
+            try:
+                async with session.post(url, json=update, headers=headers) as response:
+                    statuses[response.status] += 1
+            except aiohttp.ClientError as e:
+                statuses[type(e).__name__] += 1
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    async with aiohttp.ClientSession() as session:
+        await asyncio.gather(*(sender(session) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    print(f"отправлено {len(updates)} за {elapsed:.2f} с ({len(updates) / elapsed:.0f} в секунду)")
+    print("ответы: " + ", ".join(f"{status}: {count}" for status, count in sorted(statuses.items(), key=str)))
+    if latencies:
+        p50 = latencies[len(latencies) // 2]
+        p95 = latencies[int(len(latencies) * 0.95) - 1]
+        print(f"время ответа: p50 {p50:.1f} мс, p95 {p95:.1f} мс")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default=f"http://127.0.0.1:{WEBHOOK_PORT}{WEBHOOK_PATH}")
+    parser.add_argument("--file")
+    parser.add_argument("--synthetic", type=int, default=1000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    updates = load_updates(args.file) if args.file else synthetic_updates(args.synthetic, args.users)
+    asyncio.run(replay(args.url, updates, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -4,7 +4,7 @@ echo "Ожидание готовности базы данных..."
 sleep 5
 
 aerich init -t app.config.TORTOISE_ORM
-aerich init-db
+python -m app.db.maintenance init-schema
 aerich upgrade
 
 echo "Запуск бота..."
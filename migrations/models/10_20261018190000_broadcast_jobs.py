@@ -0,0 +1,45 @@
+from tortoise import BaseDBAsyncClient
+
+RUN_IN_TRANSACTION = True
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    # старые записи рассылок не продолжаем: им достаётся статус done
+    return """
+        ALTER TABLE "users" ADD COLUMN IF NOT EXISTS "bot_blocked" BOOL NOT NULL DEFAULT FALSE;
+        ALTER TABLE "broadcasts" ADD COLUMN IF NOT EXISTS "status" VARCHAR(16) NOT NULL DEFAULT 'done';
+        ALTER TABLE "broadcasts" ALTER COLUMN "status" SET DEFAULT 'pending';
+        ALTER TABLE "broadcasts" ADD COLUMN IF NOT EXISTS "last_user_id" BIGINT NOT NULL DEFAULT 0;
+        ALTER TABLE "broadcasts" ADD COLUMN IF NOT EXISTS "total" INT NOT NULL DEFAULT 0;
+        ALTER TABLE "broadcasts" ADD COLUMN IF NOT EXISTS "sent" INT NOT NULL DEFAULT 0;
+        ALTER TABLE "broadcasts" ADD COLUMN IF NOT EXISTS "blocked" INT NOT NULL DEFAULT 0;
+        ALTER TABLE "broadcasts" ADD COLUMN IF NOT EXISTS "failed" INT NOT NULL DEFAULT 0;
+        ALTER TABLE "broadcasts" ADD COLUMN IF NOT EXISTS "locked_until" TIMESTAMPTZ;
+        ALTER TABLE "broadcasts" ADD COLUMN IF NOT EXISTS "progress_chat_id" BIGINT;
+        ALTER TABLE "broadcasts" ADD COLUMN IF NOT EXISTS "progress_message_id" INT;
+        ALTER TABLE "broadcasts" ADD COLUMN IF NOT EXISTS "finished_at" TIMESTAMPTZ;
+        CREATE TABLE IF NOT EXISTS "broadcast_deliveries" (
+            "id" BIGSERIAL NOT NULL PRIMARY KEY,
+            "user_id" BIGINT NOT NULL,
+            "status" VARCHAR(16) NOT NULL,
+            "error" VARCHAR(255),
+            "updated_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            "broadcast_id" INT NOT NULL REFERENCES "broadcasts" ("id") ON DELETE CASCADE,
+            CONSTRAINT "uid_broadcast_d_broadca_86ea3c" UNIQUE ("broadcast_id", "user_id")
+        );"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP TABLE IF EXISTS "broadcast_deliveries";
+        ALTER TABLE "broadcasts" DROP COLUMN IF EXISTS "finished_at";
+        ALTER TABLE "broadcasts" DROP COLUMN IF EXISTS "progress_message_id";
+        ALTER TABLE "broadcasts" DROP COLUMN IF EXISTS "progress_chat_id";
+        ALTER TABLE "broadcasts" DROP COLUMN IF EXISTS "locked_until";
+        ALTER TABLE "broadcasts" DROP COLUMN IF EXISTS "failed";
+        ALTER TABLE "broadcasts" DROP COLUMN IF EXISTS "blocked";
+        ALTER TABLE "broadcasts" DROP COLUMN IF EXISTS "sent";
+        ALTER TABLE "broadcasts" DROP COLUMN IF EXISTS "total";
+        ALTER TABLE "broadcasts" DROP COLUMN IF EXISTS "last_user_id";
+        ALTER TABLE "broadcasts" DROP COLUMN IF EXISTS "status";
+        ALTER TABLE "users" DROP COLUMN IF EXISTS "bot_blocked";"""
@@ -0,0 +1,17 @@
+from tortoise import BaseDBAsyncClient
+
+RUN_IN_TRANSACTION = True
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "broadcasts" ADD COLUMN IF NOT EXISTS "segment" JSONB;
+        CREATE INDEX IF NOT EXISTS "idx_adverts_city_owner" ON "adverts" ("city_id", "owner_id");
+        CREATE INDEX IF NOT EXISTS "idx_user_subscriptions_user_expires" ON "user_subscriptions" ("user_id", "expires_at");"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP INDEX IF EXISTS "idx_user_subscriptions_user_expires";
+        DROP INDEX IF EXISTS "idx_adverts_city_owner";
+        ALTER TABLE "broadcasts" DROP COLUMN IF EXISTS "segment";"""
@@ -0,0 +1,32 @@
+from tortoise import BaseDBAsyncClient
+
+RUN_IN_TRANSACTION = True
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        CREATE TABLE IF NOT EXISTS "daily_revenue" (
+            "id" SERIAL NOT NULL PRIMARY KEY,
+            "day" DATE NOT NULL,
+            "type" VARCHAR(32) NOT NULL,
+            "count" INT NOT NULL DEFAULT 0,
+            "total" DECIMAL(18,2) NOT NULL DEFAULT 0,
+            "positive_sum" DECIMAL(18,2) NOT NULL DEFAULT 0,
+            "negative_sum" DECIMAL(18,2) NOT NULL DEFAULT 0,
+            "negative_count" INT NOT NULL DEFAULT 0,
+            CONSTRAINT "uid_daily_reven_day_7211a0" UNIQUE ("day", "type")
+        );
+        CREATE INDEX IF NOT EXISTS "idx_transactions_type_user" ON "transactions" ("type", "user_id");
+        DELETE FROM "daily_revenue";
+        INSERT INTO "daily_revenue" ("day", "type", "count", "total", "positive_sum", "negative_sum", "negative_count")
+        SELECT t.created_at::date, t.type, COUNT(*), SUM(t.amount),
+               SUM(CASE WHEN t.amount > 0 THEN t.amount ELSE 0 END),
+               SUM(CASE WHEN t.amount < 0 THEN -t.amount ELSE 0 END),
+               COUNT(*) FILTER (WHERE t.amount < 0)
+        FROM "transactions" t GROUP BY 1, 2;"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP INDEX IF EXISTS "idx_transactions_type_user";
+        DROP TABLE IF EXISTS "daily_revenue";"""
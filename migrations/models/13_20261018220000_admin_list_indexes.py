@@ -0,0 +1,15 @@
+from tortoise import BaseDBAsyncClient
+
+RUN_IN_TRANSACTION = True
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        CREATE INDEX IF NOT EXISTS "idx_users_created_id" ON "users" ("created_at", "id");
+        CREATE INDEX IF NOT EXISTS "idx_transactions_user_created" ON "transactions" ("user_id", "created_at");"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP INDEX IF EXISTS "idx_transactions_user_created";
+        DROP INDEX IF EXISTS "idx_users_created_id";"""
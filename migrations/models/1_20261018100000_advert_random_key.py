@@ -0,0 +1,15 @@
+from tortoise import BaseDBAsyncClient
+
+RUN_IN_TRANSACTION = True
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "adverts" ADD COLUMN IF NOT EXISTS "random_key" DOUBLE PRECISION NOT NULL DEFAULT random();
+        CREATE INDEX IF NOT EXISTS "idx_adverts_active_random" ON "adverts" ("random_key") WHERE status = 'active';"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP INDEX IF EXISTS "idx_adverts_active_random";
+        ALTER TABLE "adverts" DROP COLUMN IF EXISTS "random_key";"""
@@ -0,0 +1,23 @@
+from tortoise import BaseDBAsyncClient
+
+RUN_IN_TRANSACTION = True
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        CREATE INDEX IF NOT EXISTS "idx_adverts_active_city_random" ON "adverts" ((UPPER(CAST("city" AS VARCHAR))), "random_key") WHERE status = 'active';
+        CREATE INDEX IF NOT EXISTS "idx_adverts_active_year" ON "adverts" ("year") WHERE status = 'active';
+        CREATE INDEX IF NOT EXISTS "idx_adverts_active_price" ON "adverts" ("price") WHERE status = 'active';
+        CREATE INDEX IF NOT EXISTS "idx_adverts_active_mileage" ON "adverts" ("mileage") WHERE status = 'active';
+        CREATE INDEX IF NOT EXISTS "idx_adverts_active_specs" ON "adverts" ("fuel_type", "transmission", "body_type") WHERE status = 'active';
+        CREATE INDEX IF NOT EXISTS "idx_adverts_status_created" ON "adverts" ("status", "created_at");"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP INDEX IF EXISTS "idx_adverts_status_created";
+        DROP INDEX IF EXISTS "idx_adverts_active_specs";
+        DROP INDEX IF EXISTS "idx_adverts_active_mileage";
+        DROP INDEX IF EXISTS "idx_adverts_active_price";
+        DROP INDEX IF EXISTS "idx_adverts_active_year";
+        DROP INDEX IF EXISTS "idx_adverts_active_city_random";"""
@@ -0,0 +1,23 @@
+from tortoise import BaseDBAsyncClient
+
+from app.db.maintenance import fill_car_keys
+
+RUN_IN_TRANSACTION = True
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    # колонки добавляем сразу, чтобы в этой же транзакции один раз заполнить
+    # ключи для старых объявлений - их считает cars_data.car_name_keys
+    await db.execute_script("""
+        ALTER TABLE "adverts" ADD COLUMN IF NOT EXISTS "brand_key" VARCHAR(64);
+        ALTER TABLE "adverts" ADD COLUMN IF NOT EXISTS "model_key" VARCHAR(128);""")
+    await fill_car_keys(using_db=db)
+    return """
+        CREATE INDEX IF NOT EXISTS "idx_adverts_active_brand_model" ON "adverts" ("brand_key", "model_key", "random_key") WHERE status = 'active';"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP INDEX IF EXISTS "idx_adverts_active_brand_model";
+        ALTER TABLE "adverts" DROP COLUMN IF EXISTS "model_key";
+        ALTER TABLE "adverts" DROP COLUMN IF EXISTS "brand_key";"""
@@ -0,0 +1,30 @@
+from tortoise import BaseDBAsyncClient
+
+RUN_IN_TRANSACTION = True
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    # engine_volume вводился текстом: "1.6", "2,0", иногда "1600" в см³.
+    # Разбор совпадает с app.other.parse_engine_volume: мусор, диапазоны и
+    # объёмы вне 0.5-10 л остаются NULL.
+    return r"""
+        ALTER TABLE "adverts" ADD COLUMN IF NOT EXISTS "engine_volume_liters" NUMERIC(4,1);
+        UPDATE "adverts" SET "engine_volume_liters" = parsed.liters
+        FROM (
+            SELECT "id", ROUND(CASE WHEN volume > 20 THEN volume / 1000 ELSE volume END, 1) AS liters
+            FROM (
+                SELECT "id", CAST(RTRIM(REPLACE(TRIM("engine_volume"), ',', '.'), '.') AS NUMERIC) AS volume
+                FROM "adverts"
+                WHERE REPLACE(TRIM("engine_volume"), ',', '.') ~ '^[0-9]+(\.[0-9]*)?$'
+            ) AS raw
+        ) AS parsed
+        WHERE "adverts"."id" = parsed."id"
+          AND "adverts"."engine_volume_liters" IS NULL
+          AND parsed.liters BETWEEN 0.5 AND 10;
+        CREATE INDEX IF NOT EXISTS "idx_adverts_active_engine_volume" ON "adverts" ("engine_volume_liters") WHERE status = 'active';"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP INDEX IF EXISTS "idx_adverts_active_engine_volume";
+        ALTER TABLE "adverts" DROP COLUMN IF EXISTS "engine_volume_liters";"""
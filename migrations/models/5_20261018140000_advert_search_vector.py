@@ -0,0 +1,54 @@
+from tortoise import BaseDBAsyncClient
+
+RUN_IN_TRANSACTION = True
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    # car_russian - русская конфигурация со стеммингом, но без стоп-слов:
+    # иначе "не бит" и "один владелец" теряют "не" и "один".
+    return """
+        DO $$
+        BEGIN
+            IF NOT EXISTS (SELECT 1 FROM pg_ts_dict WHERE dictname = 'car_russian_stem') THEN
+                CREATE TEXT SEARCH DICTIONARY car_russian_stem (TEMPLATE = snowball, Language = russian);
+            END IF;
+            IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'car_russian') THEN
+                CREATE TEXT SEARCH CONFIGURATION car_russian (COPY = russian);
+                ALTER TEXT SEARCH CONFIGURATION car_russian
+                    ALTER MAPPING FOR word, hword, hword_part WITH car_russian_stem;
+            END IF;
+        END
+        $$;
+
+        ALTER TABLE "adverts" ADD COLUMN IF NOT EXISTS "search_vector" TSVECTOR;
+
+        CREATE OR REPLACE FUNCTION adverts_search_vector_update() RETURNS trigger AS $$
+        BEGIN
+            NEW.search_vector :=
+                setweight(to_tsvector('car_russian', coalesce(NEW.name, '')), 'A') ||
+                setweight(to_tsvector('car_russian', coalesce(NEW.description, '')), 'B') ||
+                setweight(to_tsvector('car_russian', concat_ws(' ',
+                    NEW.city, NEW.condition, NEW.fuel_type, NEW.transmission, NEW.body_type, NEW.color
+                )), 'C');
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql;
+
+        DROP TRIGGER IF EXISTS "adverts_search_vector_trg" ON "adverts";
+        CREATE TRIGGER "adverts_search_vector_trg"
+            BEFORE INSERT OR UPDATE OF name, description, city, condition, fuel_type, transmission, body_type, color
+            ON "adverts" FOR EACH ROW EXECUTE FUNCTION adverts_search_vector_update();
+
+        UPDATE "adverts" SET "name" = "name" WHERE "search_vector" IS NULL;
+
+        CREATE INDEX IF NOT EXISTS "idx_adverts_search_vector" ON "adverts" USING GIN ("search_vector") WHERE status = 'active';"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP INDEX IF EXISTS "idx_adverts_search_vector";
+        DROP TRIGGER IF EXISTS "adverts_search_vector_trg" ON "adverts";
+        DROP FUNCTION IF EXISTS adverts_search_vector_update();
+        ALTER TABLE "adverts" DROP COLUMN IF EXISTS "search_vector";
+        DROP TEXT SEARCH CONFIGURATION IF EXISTS car_russian;
+        DROP TEXT SEARCH DICTIONARY IF EXISTS car_russian_stem;"""
@@ -0,0 +1,22 @@
+from tortoise import BaseDBAsyncClient
+
+RUN_IN_TRANSACTION = True
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    # индексы по (поле, id) заменяют одиночные по price и mileage
+    return """
+        CREATE INDEX IF NOT EXISTS "idx_adverts_active_price_id" ON "adverts" ("price", "id") WHERE status = 'active';
+        CREATE INDEX IF NOT EXISTS "idx_adverts_active_mileage_id" ON "adverts" ("mileage", "id") WHERE status = 'active';
+        CREATE INDEX IF NOT EXISTS "idx_adverts_active_created_id" ON "adverts" ("created_at", "id") WHERE status = 'active';
+        DROP INDEX IF EXISTS "idx_adverts_active_price";
+        DROP INDEX IF EXISTS "idx_adverts_active_mileage";"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        CREATE INDEX IF NOT EXISTS "idx_adverts_active_price" ON "adverts" ("price") WHERE status = 'active';
+        CREATE INDEX IF NOT EXISTS "idx_adverts_active_mileage" ON "adverts" ("mileage") WHERE status = 'active';
+        DROP INDEX IF EXISTS "idx_adverts_active_created_id";
+        DROP INDEX IF EXISTS "idx_adverts_active_mileage_id";
+        DROP INDEX IF EXISTS "idx_adverts_active_price_id";"""
@@ -0,0 +1,20 @@
+from tortoise import BaseDBAsyncClient
+
+RUN_IN_TRANSACTION = True
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    # до этой миграции у пользователя был один фильтр - он и становится текущим
+    return """
+        ALTER TABLE "search_filters" ADD COLUMN IF NOT EXISTS "title" VARCHAR(128);
+        ALTER TABLE "search_filters" ADD COLUMN IF NOT EXISTS "alerts_enabled" BOOL NOT NULL DEFAULT FALSE;
+        UPDATE "search_filters" SET "is_default" = TRUE WHERE "title" IS NULL;
+        CREATE INDEX IF NOT EXISTS "idx_search_filters_user_default" ON "search_filters" ("user_id", "is_default");"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP INDEX IF EXISTS "idx_search_filters_user_default";
+        DELETE FROM "search_filters" WHERE "is_default" = FALSE;
+        ALTER TABLE "search_filters" DROP COLUMN IF EXISTS "alerts_enabled";
+        ALTER TABLE "search_filters" DROP COLUMN IF EXISTS "title";"""
@@ -0,0 +1,25 @@
+from tortoise import BaseDBAsyncClient
+
+from app.db.maintenance import fill_city_ids
+
+RUN_IN_TRANSACTION = True
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    # колонки добавляем сразу, чтобы в этой же транзакции один раз проставить
+    # city_id по справочнику app.services.cities
+    await db.execute_script("""
+        ALTER TABLE "adverts" ADD COLUMN IF NOT EXISTS "city_id" INT;
+        ALTER TABLE "search_filters" ADD COLUMN IF NOT EXISTS "city_id" INT;""")
+    await fill_city_ids(using_db=db)
+    return """
+        CREATE INDEX IF NOT EXISTS "idx_adverts_active_city_id" ON "adverts" ("city_id", "random_key") WHERE status = 'active';
+        CREATE INDEX IF NOT EXISTS "idx_search_filt_city_id_407502" ON "search_filters" ("city_id");"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP INDEX IF EXISTS "idx_search_filt_city_id_407502";
+        DROP INDEX IF EXISTS "idx_adverts_active_city_id";
+        ALTER TABLE "search_filters" DROP COLUMN IF EXISTS "city_id";
+        ALTER TABLE "adverts" DROP COLUMN IF EXISTS "city_id";"""
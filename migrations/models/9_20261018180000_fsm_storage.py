@@ -0,0 +1,18 @@
+from tortoise import BaseDBAsyncClient
+
+RUN_IN_TRANSACTION = True
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        CREATE TABLE IF NOT EXISTS "fsm_storage" (
+            "key" VARCHAR(255) NOT NULL PRIMARY KEY,
+            "state" VARCHAR(255),
+            "data" JSONB NOT NULL,
+            "updated_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+        );"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP TABLE IF EXISTS "fsm_storage";"""
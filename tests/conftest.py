@@ -0,0 +1,24 @@
+import asyncio
+
+import pytest
+from tortoise import Tortoise
+
+
+@pytest.fixture
+def run_db(tmp_path):
+    # run_db(test) - выполняет async test() на чистой SQLite базе со схемой моделей
+    def run(test):
+        async def wrapper():
+            await Tortoise.init(
+                db_url=f"sqlite://{tmp_path / 'test.db'}",
+                modules={"models": ["app.db.models"]},
+            )
+            try:
+                await Tortoise.generate_schemas()
+                return await test()
+            finally:
+                await Tortoise.close_connections()
+
+        return asyncio.run(wrapper())
+
+    return run
@@ -0,0 +1,20 @@
+from app.db.models import User
+from app.services.broadcast_segments import count_segment, iter_segment_ids
+
+
+async def _collect(segment, after_id=0, chunk_size=3):
+    return [chunk async for chunk in iter_segment_ids(segment, after_id, chunk_size)]
+
+
+def test_segment_is_read_in_id_order_by_chunks(run_db):
+    async def test():
+        for user_id in range(1, 11):
+            await User.create(id=user_id, role="admin" if user_id % 2 else "user", bot_blocked=user_id == 5)
+
+        assert await _collect({}) == [[1, 2, 3], [4, 6, 7], [8, 9, 10]]
+        assert await count_segment({}) == 9
+        # продолжение после перезапуска - с контрольной точки
+        assert await _collect({}, after_id=7) == [[8, 9, 10]]
+        assert await _collect({"role": "admin"}, chunk_size=2) == [[1, 3], [7, 9]]
+
+    run_db(test)
@@ -0,0 +1,26 @@
+import pytest
+
+from app.services.cars_data import car_name_keys
+
+
+@pytest.mark.parametrize("name", ["Toyota Camry", "тойота камри", "TOYOTA  camry"])
+def test_car_keys_ignore_language_case_and_spaces(name):
+    assert car_name_keys(name) == ("TOYOTA", "CAMRY")
+
+
+def test_brand_aliases():
+    assert car_name_keys("ВАЗ 2107") == car_name_keys("Lada 2107") == ("LADA", "2107")
+    assert car_name_keys("Mercedes E-Class")[0] == "MERCEDES-BENZ"
+
+
+def test_multi_word_brand():
+    assert car_name_keys("Land Rover Range Rover") == ("LAND ROVER", "RANGE ROVER")
+
+
+def test_brand_without_model():
+    assert car_name_keys("Haval") == ("HAVAL", None)
+
+
+@pytest.mark.parametrize("name", ["Camry", "", None])
+def test_no_keys_without_known_brand(name):
+    assert car_name_keys(name) == (None, None)
@@ -0,0 +1,32 @@
+import pytest
+
+from app.services.cities import city_id_by_name, normalize_city
+
+
+@pytest.mark.parametrize("text", ["Москва", "москва ", "г. Москва", "мск", "Msk"])
+def test_city_spellings_share_one_id(text):
+    assert normalize_city(text) == (1, "Москва")
+    assert city_id_by_name(text) == 1
+
+
+@pytest.mark.parametrize("text, city_id", [
+    ("Санкт Петербург", 2),
+    ("спб", 2),
+    ("Нижний  Новгород", 6),
+    ("нн", 6),
+    ("Ростов-на-Дону", 11),
+])
+def test_city_aliases(text, city_id):
+    assert normalize_city(text)[0] == city_id
+
+
+def test_city_typo_is_fuzzy_only_for_user_input():
+    assert normalize_city("Масква") == (1, "Москва")
+    # сохранённые значения сравниваются только точно
+    assert city_id_by_name("Масква") is None
+
+
+@pytest.mark.parametrize("text", ["Лондон", "", None])
+def test_unknown_city(text):
+    assert normalize_city(text) == (None, None)
+    assert city_id_by_name(text) is None
@@ -0,0 +1,125 @@
+import asyncio
+
+import pytest
+
+from app.db.crud_advert import filters_signature
+from app.services import feed_deck
+from app.services.feed_deck import DECK_BATCH_SIZE, _load_batch, _new_deck, next_advert_id
+
+
+class _State:
+    # данные FSM без хранилища
+    def __init__(self):
+        self.data = {}
+
+    async def get_data(self):
+        return dict(self.data)
+
+    async def update_data(self, **kwargs):
+        self.data.update(kwargs)
+
+
+@pytest.fixture
+def adverts(monkeypatch):
+    # подходящие объявления как (id, random_key) по возрастанию ключа
+    rows = []
+
+    async def ids_batch(filters, after_key=None, before_key=None, limit=50):
+        found = [
+            row for row in rows
+            if (after_key is None or row[1] > after_key) and (before_key is None or row[1] < before_key)
+        ]
+        return found[:limit]
+
+    def fill(count):
+        rows[:] = [(advert_id, (advert_id - 0.5) / count) for advert_id in range(1, count + 1)]
+        return [row[0] for row in rows]
+
+    monkeypatch.setattr(feed_deck, "_ids_batch", ids_batch)
+    return fill
+
+
+def _deck(pivot):
+    return dict(_new_deck("test"), pivot=pivot, cursor=pivot)
+
+
+def _load_all(deck):
+    # как next_advert_id: пачки до конца круга
+    async def load():
+        nonlocal deck
+        ids = []
+        for _ in range(100):
+            loaded = await _load_batch({}, dict(deck, ids=[]))
+            ids.extend(loaded["ids"])
+            deck = loaded
+            if deck["done"]:
+                return ids, deck
+        raise AssertionError("колода не закончилась")
+
+    return asyncio.run(load())
+
+
+def test_small_deck_wraps_in_one_batch(adverts):
+    ids = adverts(30)
+
+    deck = asyncio.run(_load_batch({}, _deck(0.6)))
+
+    assert sorted(deck["ids"]) == ids
+    assert deck["wrapped"] and deck["done"]
+
+
+@pytest.mark.parametrize("pivot", [0.0, 0.37, 0.999])
+def test_every_advert_once_per_round(adverts, pivot):
+    ids = adverts(3 * DECK_BATCH_SIZE + 7)
+
+    loaded, deck = _load_all(_deck(pivot))
+
+    assert sorted(loaded) == ids
+    assert len(loaded) == len(ids)
+
+
+def test_wrap_when_first_pass_ends_on_a_full_batch(adverts):
+    ids = adverts(2 * DECK_BATCH_SIZE)
+
+    # после точки ровно одна полная пачка: следующий запрос пустой и уводит на второй круг
+    first = asyncio.run(_load_batch({}, _deck(0.5)))
+    assert len(first["ids"]) == DECK_BATCH_SIZE and not first["wrapped"]
+
+    rest, deck = _load_all(first)
+    assert sorted(first["ids"] + rest) == ids
+
+
+def test_done_deck_loads_nothing(adverts):
+    adverts(10)
+
+    _, deck = _load_all(_deck(0.5))
+    again = asyncio.run(_load_batch({}, deck))
+
+    assert again["ids"] == [] and again["done"]
+
+
+def test_empty_filters_give_empty_deck(adverts):
+    adverts(0)
+
+    deck = asyncio.run(_load_batch({}, _deck(0.5)))
+
+    assert deck["ids"] == [] and deck["done"]
+
+
+def test_next_advert_id_starts_a_new_round(adverts):
+    ids = adverts(DECK_BATCH_SIZE + 20)
+    state = _State()
+
+    async def scroll(count):
+        return [await next_advert_id(state, 1, {}) for _ in range(count)]
+
+    async def two_rounds():
+        first = await scroll(len(ids))
+        second = await scroll(len(ids))
+        return first, second
+
+    first, second = asyncio.run(two_rounds())
+
+    assert sorted(first) == ids
+    assert sorted(second) == ids
+    assert state.data["feed_deck"]["signature"] == filters_signature({})
@@ -0,0 +1,43 @@
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+import pytest
+from aiogram.fsm.storage.base import StorageKey
+
+from app.services.fsm_storage import DbStorage
+
+KEY = StorageKey(bot_id=1, chat_id=42, user_id=42)
+
+
+def test_data_keeps_types_after_reload(run_db):
+    data = {
+        "current_balance": Decimal("1500.50"),
+        "expires_at": datetime(2026, 10, 18, 12, 30, tzinfo=timezone.utc),
+        "day": date(2026, 10, 18),
+        "feed_next": {"signature": "abc", "advert_id": 7},
+        "photos": ["a", "b"],
+    }
+
+    async def test():
+        storage = DbStorage()
+        await storage.set_state(KEY, "Users:balance")
+        await storage.set_data(KEY, data)
+        await storage.close()
+
+        # новый процесс - кэша нет, читаем из базы
+        reloaded = DbStorage()
+        assert await reloaded.get_state(KEY) == "Users:balance"
+        assert await reloaded.get_data(KEY) == data
+
+    run_db(test)
+
+
+def test_non_json_value_is_rejected_in_set_data(run_db):
+    async def test():
+        storage = DbStorage()
+        with pytest.raises(TypeError):
+            await storage.set_data(KEY, {"advert": object()})
+        assert await storage.get_data(KEY) == {}
+        await storage.close()
+
+    run_db(test)
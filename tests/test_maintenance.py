@@ -0,0 +1,40 @@
+from tortoise.transactions import in_transaction
+
+from app.db.maintenance import fill_car_keys, fill_city_ids
+from app.db.models import Advert, SearchFilter, User
+
+
+async def _advert(name, city):
+    advert = await Advert.create(
+        owner_id=1, name=name, year=2020, mileage=10000, condition="Хорошее", fuel_type="Бензин",
+        engine_volume="2.0", transmission="АКПП", body_type="Седан", color="Белый", vin="VIN",
+        license_plate="A000AA77", contacts="-", city=city, description="-", price=1000000,
+    )
+    # как до миграции - ключей нет
+    await Advert.filter(id=advert.id).update(brand_key=None, model_key=None, city_id=None)
+    return advert.id
+
+
+def test_backfill_inside_migration_transaction(run_db):
+    async def test():
+        await User.create(id=1)
+        camry = await _advert("Toyota Camry", "мск")
+        unknown = await _advert("Самоделка", "Лондон")
+        await SearchFilter.create(user_id=1, city="спб")
+
+        # миграции 3 и 8 передают соединение своей транзакции
+        async with in_transaction() as conn:
+            assert await fill_car_keys(using_db=conn) == 1
+            assert await fill_city_ids(using_db=conn) == (1, 1)
+
+        advert = await Advert.get(id=camry)
+        assert (advert.brand_key, advert.model_key) == ("TOYOTA", "CAMRY")
+        assert (advert.city_id, advert.city) == (1, "Москва")
+
+        advert = await Advert.get(id=unknown)
+        assert advert.brand_key is None and advert.city_id is None and advert.city == "Лондон"
+
+        search = await SearchFilter.get(user_id=1)
+        assert (search.city_id, search.city) == (2, "Санкт-Петербург")
+
+    run_db(test)
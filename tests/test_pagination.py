@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta, timezone
+
+from app.db.models import User
+from app.db import pagination
+from app.db.pagination import invalidate_pages, paginate
+
+
+async def _users(count):
+    # по три пользователя на одну отметку времени - порядок внутри решает id
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    for user_id in range(1, count + 1):
+        await User.create(id=user_id)
+        await User.filter(id=user_id).update(created_at=start + timedelta(minutes=user_id // 3))
+    rows = await User.all().order_by("-created_at", "-id").values_list("id", flat=True)
+    return list(rows)
+
+
+async def _ids(page_number, **kwargs):
+    page = await paginate("users", User.all(), page_number, ("id",), page_size=5, **kwargs)
+    return [item["id"] for item in page.items], page
+
+
+def test_pages_follow_order_across_equal_timestamps(run_db):
+    async def test():
+        invalidate_pages()
+        expected = await _users(12)
+
+        seen = []
+        for page_number in range(3):
+            ids, page = await _ids(page_number)
+            assert page.total == 12 and page.total_pages == 3
+            seen.extend(ids)
+        assert seen == expected
+
+        # назад по запомненным границам - те же страницы
+        ids, _ = await _ids(1)
+        assert ids == expected[5:10]
+
+    run_db(test)
+
+
+def test_keyset_and_offset_give_the_same_page(run_db):
+    async def test():
+        invalidate_pages()
+        expected = await _users(12)
+
+        # на страницу 2 без границы страницы 1 - через OFFSET
+        ids, _ = await _ids(0)
+        offset_ids, _ = await _ids(2)
+        assert offset_ids == expected[10:]
+
+        await _ids(1)
+        keyset_ids, _ = await _ids(2)
+        assert keyset_ids == offset_ids
+
+    run_db(test)
+
+
+def test_page_number_is_clamped(run_db):
+    async def test():
+        invalidate_pages()
+        expected = await _users(7)
+
+        await _ids(0)
+        ids, page = await _ids(10)
+        assert page.current_page == 1
+        assert ids == expected[5:]
+
+        ids, page = await _ids(-3)
+        assert page.current_page == 0
+        assert ids == expected[:5]
+
+    run_db(test)
+
+
+def test_stale_count_is_recounted_when_rows_are_gone(run_db):
+    async def test():
+        invalidate_pages()
+        expected = await _users(7)
+
+        await _ids(0)
+        await User.filter(id__in=expected[5:]).delete()
+
+        # COUNT в кэше ещё 7, но второй страницы уже нет
+        ids, page = await _ids(1)
+        assert page.total == 5 and page.total_pages == 1
+        assert ids == expected[:5]
+        assert pagination._page_cache["users"].total == 5
+
+    run_db(test)
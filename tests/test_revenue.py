@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from app.db.crud_transaction import (
+    create_transaction,
+    get_autoteka_buyers,
+    get_autoteka_totals,
+    get_income_stats,
+    rebuild_daily_revenue,
+)
+from app.db.models import DailyRevenue, Transaction, User
+
+
+async def _transactions():
+    await User.create(id=1)
+    for number, (amount, type_) in enumerate([
+        (100.5, "topup"),
+        (200, "topup"),
+        (-50, "autoteka"),
+        (-50, "autoteka"),
+        (300, "subscription"),
+    ]):
+        await create_transaction(1, f"p{number}", amount, None, type_)
+
+
+async def _rows():
+    rows = await DailyRevenue.all().order_by("day", "type").values(
+        "day", "type", "count", "total", "positive_sum", "negative_sum", "negative_count"
+    )
+    return [{key: Decimal(str(value)) if key.endswith(("total", "sum")) else value
+             for key, value in row.items()} for row in rows]
+
+
+def test_transactions_are_summed_per_day_and_type(run_db):
+    async def test():
+        await _transactions()
+
+        rows = {row["type"]: row for row in await _rows()}
+        assert set(rows) == {"topup", "autoteka", "subscription"}
+        assert rows["topup"]["count"] == 2
+        assert rows["topup"]["total"] == Decimal("300.5")
+        assert rows["autoteka"]["total"] == Decimal("-100")
+        assert rows["autoteka"]["positive_sum"] == 0
+        assert rows["autoteka"]["negative_sum"] == Decimal("100")
+        assert rows["autoteka"]["negative_count"] == 2
+
+    run_db(test)
+
+
+def test_income_stats_split_current_month(run_db):
+    async def test():
+        await _transactions()
+        # одно пополнение в прошлом месяце - сводку пересобираем по транзакциям
+        old = await Transaction.get(payment_id="p1")
+        await Transaction.filter(id=old.id).update(
+            created_at=datetime.now(timezone.utc) - timedelta(days=40)
+        )
+        await rebuild_daily_revenue()
+
+        stats = await get_income_stats()
+        assert stats["all"]["topup"]["income"] == Decimal("300.50")
+        assert stats["month"]["topup"]["income"] == Decimal("100.50")
+        assert stats["all"]["autoteka"]["spent"] == Decimal("100.00")
+        assert stats["all"]["autoteka"]["reports"] == 2
+        assert stats["month"]["subscription"]["income"] == Decimal("300.00")
+        assert stats["all"]["advert"] == {"income": Decimal("0"), "spent": Decimal("0"), "reports": 0}
+
+    run_db(test)
+
+
+def test_rebuild_matches_incremental_rollup(run_db):
+    async def test():
+        await _transactions()
+        incremental = await _rows()
+
+        assert await rebuild_daily_revenue() == len(incremental)
+        assert await _rows() == incremental
+
+        # повторный пересчёт не удваивает суммы
+        await rebuild_daily_revenue()
+        assert await _rows() == incremental
+
+    run_db(test)
+
+
+def test_autoteka_totals_match_buyer_rows(run_db):
+    async def test():
+        await _transactions()
+        await User.create(id=2)
+        # оплата отчёта картой - положительная сумма
+        await create_transaction(2, "card", 150, None, "autoteka2")
+
+        totals = await get_autoteka_totals()
+        buyers = await get_autoteka_buyers(limit=10, offset=0)
+        assert buyers == [{"user_id": 1, "reports": 2}, {"user_id": 2, "reports": 1}]
+        assert totals == {"buyers": 2, "reports": 3}
+
+    run_db(test)
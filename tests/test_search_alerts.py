@@ -0,0 +1,80 @@
+import asyncio
+from types import SimpleNamespace
+
+from aiogram.exceptions import TelegramForbiddenError, TelegramRetryAfter
+from aiogram.methods import SendMessage
+
+from app.db.models import User
+from app.services import search_alerts
+
+ADVERT = SimpleNamespace(id=7, name="Toyota Camry", year=2020, city="Москва", price=2000000)
+
+
+class _Bot:
+    # send_message падает по сценарию: user_id -> список исключений по очереди
+    def __init__(self, errors=None):
+        self.errors = errors or {}
+        self.sent = []
+
+    async def send_message(self, chat_id, text, reply_markup=None):
+        errors = self.errors.get(chat_id)
+        if errors:
+            raise errors.pop(0)
+        self.sent.append(chat_id)
+
+
+def _retry_after(seconds):
+    return TelegramRetryAfter(SendMessage(chat_id=1, text="x"), "flood", seconds)
+
+
+def test_retry_after_pauses_the_whole_batch(monkeypatch):
+    pauses = []
+
+    async def sleep(seconds):
+        pauses.append(seconds)
+
+    monkeypatch.setattr(search_alerts.asyncio, "sleep", sleep)
+    monkeypatch.setattr(search_alerts, "ALERT_BATCH_SIZE", 2)
+    bot = _Bot({2: [_retry_after(5)]})
+
+    asyncio.run(search_alerts._send_alerts(bot, ADVERT, {1: "a", 2: "b", 3: "c"}))
+
+    # пауза RetryAfter перед следующей порцией, повтор 2 идёт первым
+    assert pauses[0] == 5
+    assert bot.sent == [1, 2, 3]
+
+
+def test_alerts_skip_banned_and_blocked_users(run_db, monkeypatch):
+    captured = {}
+
+    async def refresh():
+        pass
+
+    async def send_alerts(bot, advert, users):
+        captured.update(users)
+
+    monkeypatch.setattr(search_alerts.saved_search_index, "refresh", refresh)
+    monkeypatch.setattr(search_alerts.saved_search_index, "match", lambda advert: {1: "a", 2: "b", 3: "c"})
+    monkeypatch.setattr(search_alerts, "_send_alerts", send_alerts)
+
+    async def test():
+        await User.create(id=1)
+        await User.create(id=2, status="banned")
+        await User.create(id=3, bot_blocked=True)
+
+        assert await search_alerts.notify_saved_searches(_Bot(), ADVERT) == 1
+        await asyncio.gather(*search_alerts._tasks)
+
+    run_db(test)
+    assert captured == {1: "a"}
+
+
+def test_blocked_chat_is_marked(run_db):
+    async def test():
+        await User.create(id=1)
+        bot = _Bot({1: [TelegramForbiddenError(SendMessage(chat_id=1, text="x"), "blocked")]})
+
+        assert await search_alerts._send_alert(bot, 1, "text", ADVERT.id) == 0
+        assert (await User.get(id=1)).bot_blocked
+
+    run_db(test)